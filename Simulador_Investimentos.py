@@ -2,7 +2,22 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 import db_manager 
+from simulador import instrumentacao
+from simulador.cache_simulacao import calcular_ativo_cache, calcular_poupanca_cache, estatisticas_cache
+from simulador.calendario import CONVENCAO_CORRIDOS, CONVENCAO_UTEIS
+from simulador.curvas_juros import curva_mensal
+from simulador.dados_mercado import BENCHMARK_CDI, BENCHMARK_POUPANCA, BENCHMARK_PRE, snapshot_atual
+from simulador.equivalencia import prazo_equilibrio_lote, taxa_equivalente_lote
+from simulador.formatacao import format_br, parse_br_currency
+from simulador.reamostragem import reduzir_pontos
+from simulador.monte_carlo import simular_monte_carlo, N_TRAJETORIAS_PADRAO, VOLATILIDADE_PADRAO
+from simulador.tarefas import CONCLUIDA, ERRO, LimiteTarefasExcedido, executor_padrao, limite_por_usuario
+
+# Instrumentação (desligada por padrão; SIMULADOR_INSTRUMENTACAO=1): cada rerun do script é uma execução
+instrumentacao.iniciar_execucao()
+instrumentacao.etapa("inicializacao")
 
 # Iniciando o Banco de Dados
 db_manager.initialize_db()
@@ -81,117 +96,164 @@ def render_login_page():
 # 2. FUNÇÕES AUXILIARES E CÁLCULOS
 # ==========================================
 
-def parse_br_currency(text_input):
-    """Converte string BR (ex: 1.000,00) para float."""
-    try:
-        cleaned_text = text_input.replace(".", "").replace(",", ".")
-        return float(cleaned_text)
-    except:
-        return 0.0
-
-def format_br(value):
-    """Formata float para R$"""
-    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-def calcular_poupanca(valor_inicial, dias):
-    # Taxa da Poupança (TR + 0.5% a.a. ou 70% da Selic)
-    # Aqui, usamos uma simplificação de 0.5% ao mês + TR ~ 6.17% a.a. para benchmark.
-    taxa_anual = 0.0617
-    fator_diario = (1 + taxa_anual)**(1 / 365.0)
-    data = []
-    montante = valor_inicial
-    for d in range(0, dias + 1):
-        if d > 0: montante *= fator_diario
-        rendimento = montante - valor_inicial
-        data.append((d, montante, rendimento))
-    df_poupanca = pd.DataFrame(data, columns=["Dia", "Montante Líquido", "Rendimento Líquido"])
-    montante_final = df_poupanca["Montante Líquido"].iloc[-1]
-    rendimento_final = montante_final - valor_inicial
-    return {
-        "df": df_poupanca.rename(columns={"Montante Líquido": "Montante Líquido"}),
-        "montante_liquido": montante_final,
-        "rendimento_liquido": rendimento_final,
-        "rendimento_bruto": rendimento_final,
-        "ir_devido": 0.0,
-        "aliquota": 0.0,
-        "taxa_nominal_aa": 6.17
-    }
-
-def calcular_ativo_geral(valor_inicial, dias, tipo_rentabilidade, params, is_isento):
-    """Calcula a rentabilidade bruta, IR e resultado líquido para diferentes tipos de ativos."""
-    taxa_anual_nominal = 0.0
-    
-    if tipo_rentabilidade == "PRÉ":
-        taxa_anual_nominal = params['taxa_fixa'] / 100.0
-    elif tipo_rentabilidade == "PÓS":
-        taxa_referencia = params['taxa_ref'] / 100.0
-        percentual = params['percentual'] / 100.0
-        taxa_anual_nominal = taxa_referencia * percentual
-    elif tipo_rentabilidade == "IPCA":
-        ipca = params['ipca_proj'] / 100.0
-        juro_real = params['taxa_fixa'] / 100.0
-        # Fórmula de Fisher para rentabilidade nominal (aproximada)
-        taxa_anual_nominal = ((1 + ipca) * (1 + juro_real)) - 1
-        
-    fator_diario = (1 + taxa_anual_nominal)**(1 / 365.0)
-    data = []
-    montante = valor_inicial
-    aliquota_ir_fixa = 0.0
-    
-    # Tabela Regressiva de IR (Válida para Renda Fixa Não Isenta)
-    if not is_isento:
-        if dias <= 180: aliquota_ir_fixa = 22.5
-        elif dias <= 360: aliquota_ir_fixa = 20.0
-        elif dias <= 720: aliquota_ir_fixa = 17.5
-        else: aliquota_ir_fixa = 15.0
-
-    for d in range(0, dias + 1):
-        if d > 0: montante *= fator_diario
-        rendimento_total = montante - valor_inicial
-        
-        # Simula o montante líquido apenas para exibição no gráfico de linha
-        montante_liquido_simples = montante
-        if not is_isento:
-             # O cálculo líquido final é feito no final, mas aqui simulamos uma progressão
-             ir_parcial = rendimento_total * (aliquota_ir_fixa/100.0)
-             montante_liquido_simples = valor_inicial + (rendimento_total - ir_parcial)
-        
-        data.append((d, montante, rendimento_total, montante_liquido_simples))
-        
-    df = pd.DataFrame(data, columns=["Dia", "Montante Bruto", "Rendimento Bruto", "Montante Líquido"])
-    
-    # Cálculo Final do Resultado Líquido (Baseado no Montante Bruto Final)
-    bruto_final = df["Montante Bruto"].iloc[-1]
-    rendimento_bruto_final = bruto_final - valor_inicial
-    aliquota_ir = aliquota_ir_fixa
-    ir_devido = 0.0
-    
-    if not is_isento:
-        ir_devido = rendimento_bruto_final * (aliquota_ir / 100.0)
-        
-    rendimento_liquido = rendimento_bruto_final - ir_devido
-    
-    return {
-        "df": df,
-        "montante_liquido": valor_inicial + rendimento_liquido,
-        "rendimento_liquido": rendimento_liquido,
-        "rendimento_bruto": rendimento_bruto_final,
-        "ir_devido": ir_devido,
-        "aliquota": aliquota_ir,
-        "taxa_nominal_aa": taxa_anual_nominal * 100
-    }
+# As funções de cálculo (calcular_ativo_geral, calcular_poupanca) e de formatação
+# (parse_br_currency, format_br) ficam no pacote 'simulador', sem dependência do Streamlit.
+
+def calcular_cenario(tarefa, cenario):
+    """Cálculos do painel, executados em segundo plano pelo executor de tarefas (sem chamadas ao Streamlit).
+
+    'tarefa.progredir' informa o andamento e interrompe o cálculo se o usuário
+    cancelar ou mudar os parâmetros.
+    """
+    valor_inicial, dias, convencao = cenario['valor_inicial'], cenario['dias'], cenario['convencao']
+    tipo_rentabilidade, params, is_isento = cenario['tipo_rentabilidade'], cenario['params'], cenario['is_isento']
+    nome_ativo = cenario['nome_ativo']
+    final_results = {}
+
+    def comparativo(benchmark, calcular, *args):
+        # Comparativo com as projeções do snapshot de mercado: fatores pré-calculados no servidor
+        if benchmark in cenario['comparativos_mercado']:
+            resultado = cenario['mercado'].resultado(benchmark, valor_inicial, dias, convencao)
+            if resultado is not None:
+                return resultado
+        return calcular(*args)
+
+    tarefa.progredir(0.0, "Ativo principal")
+    with instrumentacao.medir("calculo.ativo_principal"):
+        try:
+            final_results[nome_ativo] = calcular_ativo_cache(valor_inicial, dias, tipo_rentabilidade, params, is_isento,
+                                                             cenario['curva_ativo'], convencao)
+        except Exception as e:
+            raise ValueError(f"Erro nos parâmetros de cálculo do Ativo Principal: {e}") from e
+
+    # Cálculos de Benchmarks
+    tarefa.progredir(0.1, "Comparativos")
+    with instrumentacao.medir("calculo.benchmarks"):
+        if "Poupança (Benchmark)" in cenario['comparativos']:
+            final_results["Poupança (Benchmark)"] = comparativo(BENCHMARK_POUPANCA, calcular_poupanca_cache, valor_inicial, dias)
+        if "CDB 100% CDI (Pós - Projeção)" in cenario['comparativos']:
+            params_cdb_100 = {'taxa_ref': cenario['taxa_cdi_proj'], 'percentual': 100} 
+            final_results["CDB 100% CDI (Pós - Projeção)"] = comparativo(BENCHMARK_CDI, calcular_ativo_cache, valor_inicial, dias, "PÓS", params_cdb_100, False, cenario['curva_cdi'], convencao)
+        if "Tesouro Pré Fixo (Projeção)" in cenario['comparativos']:
+            params_tesouro_pre = {'taxa_fixa': cenario['taxa_tesouro_proj']} 
+            final_results["Tesouro Pré Fixo (Projeção)"] = comparativo(BENCHMARK_PRE, calcular_ativo_cache, valor_inicial, dias, "PRÉ", params_tesouro_pre, False, None, convencao)
+
+    tarefa.progredir(0.2, "Curvas do gráfico")
+    with instrumentacao.medir("dataframe.curvas"):
+        df_chart = pd.DataFrame({"Dia": final_results[nome_ativo]['df']["Dia"]})
+        for nome, res in final_results.items():
+            df_chart[nome] = res['df']["Montante Líquido"]
+        # Orçamento fixo de pontos (LTTB): o gráfico não cresce com o prazo
+        df_chart = reduzir_pontos(df_chart)
+
+    resultado_mc = None
+    if cenario['monte_carlo'] is not None:
+        n_trajetorias, volatilidade_mc = cenario['monte_carlo']
+        tarefa.progredir(0.3, "Monte Carlo")
+        with instrumentacao.medir("calculo.monte_carlo"):
+            # Progresso de 30% a 90% ao longo dos blocos de dias simulados
+            # Mesma curva e convenção do Ativo Principal: as bandas ficam em torno da curva determinística
+            resultado_mc = simular_monte_carlo(valor_inicial, dias, tipo_rentabilidade, params, is_isento,
+                                               n_trajetorias=n_trajetorias, volatilidade=volatilidade_mc,
+                                               ao_progredir=lambda fracao: tarefa.progredir(0.3 + 0.6 * fracao),
+                                               curva=cenario['curva_ativo'], convencao=convencao)
+        resultado_mc['n_trajetorias'] = n_trajetorias
+
+    # Equivalências: taxa, prazo e valor que fariam o Ativo Principal empatar com cada comparativo
+    tarefa.progredir(0.9, "Equivalências")
+    with instrumentacao.medir("calculo.equivalencias"):
+        especificacoes = {
+            "Poupança (Benchmark)": {"tipo": "POUPANÇA", "isento": True},
+            "CDB 100% CDI (Pós - Projeção)": {"tipo": "PÓS", "isento": False, "taxa_ref": cenario['taxa_cdi_proj'], "percentual": 100},
+            "Tesouro Pré Fixo (Projeção)": {"tipo": "PRÉ", "isento": False, "taxa_fixa": cenario['taxa_tesouro_proj']},
+        }
+        comparativos = [nome for nome in final_results if nome in especificacoes]
+        # Taxa e prazo de empate são resolvidos sobre taxas constantes: com curva (no ativo ou no
+        # comparativo) não valem para o resultado exibido e ficam de fora
+        com_curva = {nome for nome in comparativos if cenario['curva_ativo'] is not None
+                     or (nome == "CDB 100% CDI (Pós - Projeção)" and cenario['curva_cdi'] is not None)}
+        constantes = [nome for nome in comparativos if nome not in com_curva]
+        linhas_eq = []
+        if constantes:
+            ativo = {"tipo": tipo_rentabilidade, "isento": is_isento, **params}
+            df_pares = pd.DataFrame([
+                {"dias": dias, "convencao": convencao,
+                 **{f"{chave}_a": valor for chave, valor in ativo.items()},
+                 **{f"{chave}_b": valor for chave, valor in especificacoes[nome].items()}}
+                for nome in constantes
+            ])
+            taxas_eq = taxa_equivalente_lote(df_pares)
+            prazos_eq = prazo_equilibrio_lote(df_pares)
+        unidade_taxa = {"PRÉ": "{:.2f}% a.a.", "PÓS": "{:.2f}% do CDI", "IPCA": "IPCA + {:.2f}%"}[tipo_rentabilidade]
+        # O líquido é linear no valor aplicado: o valor que iguala cada comparativo sai dos próprios
+        # resultados exibidos (mesma base, com ou sem curva), sem resolver de novo pela taxa constante
+        for nome in comparativos:
+            if nome in com_curva:
+                taxa_texto = prazo_texto = "— (curva projetada)"
+            else:
+                i = constantes.index(nome)
+                prazo_eq = prazos_eq['prazo_equilibrio'].iloc[i]
+                taxa_texto = unidade_taxa.format(taxas_eq['parametro_equivalente'].iloc[i])
+                prazo_texto = "Não alcança em 30 anos" if np.isnan(prazo_eq) else f"{int(prazo_eq)} dia(s)"
+            linhas_eq.append({
+                "Comparativo": nome,
+                "Taxa para empatar": taxa_texto,
+                "Alcança a partir de": prazo_texto,
+                "Valor inicial para o mesmo líquido": format_br(valor_inicial * final_results[nome]['montante_liquido']
+                                                                / final_results[nome_ativo]['montante_liquido']),
+            })
+
+    return {"final_results": final_results, "nome_ativo": nome_ativo, "df_chart": df_chart,
+            "monte_carlo": resultado_mc, "equivalencias": linhas_eq}
+
+@st.fragment(run_every=0.5)
+def acompanhar_tarefa(id_tarefa):
+    """Mostra o progresso do cálculo em segundo plano; ao terminar, reexecuta a página para exibir o resultado."""
+    tarefa = executor_padrao().obter(id_tarefa)
+    if tarefa is None or tarefa.finalizada:
+        st.rerun()
+    st.progress(tarefa.progresso, text=f"Calculando... {tarefa.etapa}")
+    if st.button("Cancelar cálculo"):
+        tarefa.cancelar()
+        st.session_state['tarefa_id'] = None
+        st.rerun()
+
+def render_painel_desempenho():
+    """Painel (apenas administradores) com o tempo por etapa das últimas execuções e os contadores."""
+    with st.sidebar.expander("⏱️ Desempenho (admin)"):
+        if not instrumentacao.ATIVA:
+            st.caption("Instrumentação desligada: defina SIMULADOR_INSTRUMENTACAO=1 para medir as execuções.")
+        execucoes = instrumentacao.ultimas_execucoes()
+        if execucoes:
+            st.dataframe(pd.DataFrame([
+                {"Início": execucao["inicio"], "Usuário": execucao["usuario"], "Total (ms)": execucao["total_ms"], **execucao["etapas_ms"]}
+                for execucao in execucoes
+            ]), hide_index=True)
+        cache = estatisticas_cache()
+        st.caption(f"Cache de resultados: {cache['hits']} hits, {cache['misses']} misses "
+                   f"({cache['taxa_acerto']:.0%} de acerto), {cache['itens']}/{cache['tamanho_maximo']} itens.")
+        simulacoes = {
+            dict(rotulos).get("usuario"): int(total)
+            for (metrica, rotulos), total in instrumentacao.contadores().items() if metrica == "simulador_simulacoes_total"
+        }
+        if simulacoes:
+            st.dataframe(pd.DataFrame({"Usuário": list(simulacoes), "Simulações": list(simulacoes.values())}), hide_index=True)
+        st.download_button("Exportar métricas (Prometheus)", instrumentacao.exportar_prometheus(),
+                           file_name="simulador_metricas.prom", mime="text/plain")
 
 # ==========================================
 # 3. LÓGICA PRINCIPAL (ROTEAMENTO)
 # ==========================================
 
 # ROTEADOR: Se logado, roda o simulador. Se não, roda a página de login.
-if st.session_state['authenticated']: # Usa 'authenticated' que foi inicializado no db_manager
+# A sessão é um token com validade renovada a cada uso (ver autenticacao.py); expirado, volta ao login
+if db_manager.sessao_valida():
     
     # 1. Recuperar Limite e Status Premium
-    # Estes dados já estão em st.session_state, atualizados pelo login_user
-    sim_restantes = st.session_state['simulacoes_restantes']
-    is_premium = st.session_state['is_premium']
+    # A cota é diária: relê o saldo a cada execução (leitura em memória via cotas.py)
+    sim_restantes, is_premium = db_manager.get_simulacoes_restantes(st.session_state['user_email'])
+    st.session_state['simulacoes_restantes'] = sim_restantes
+    st.session_state['is_premium'] = is_premium
     
     # 2. Lógica do Paywall Freemium (Verifica se o usuário pode usar o simulador)
     if is_premium or sim_restantes > 0:
@@ -207,6 +269,8 @@ if st.session_state['authenticated']: # Usa 'authenticated' que foi inicializado
         if st.sidebar.button("Logout"):
             db_manager.logout_user() # Usa a nova função de logout
             st.rerun()
+        if instrumentacao.eh_administrador(st.session_state['user_email']):
+            render_painel_desempenho()
             
         # ----------------------------------------------------------------------
         # INÍCIO DO SIMULADOR
@@ -216,15 +280,48 @@ if st.session_state['authenticated']: # Usa 'authenticated' que foi inicializado
         st.markdown("Configure o cenário exato e compare o resultado líquido contra benchmarks dinâmicos, garantindo a **visão contábil do seu retorno**.")
 
         # BARRA LATERAL (INPUTS)
+        instrumentacao.etapa("interface.parametros")
         st.sidebar.header("⚙️ Parâmetros Globais")
         valor_inicial = parse_br_currency(st.sidebar.text_input("Valor Inicial (R$)", "10.000,00"))
         dias = st.sidebar.number_input("Prazo (Dias)", min_value=1, value=360, step=30)
+        # CDI e Tesouro rendem por dias úteis (base 252, calendário ANBIMA); o prazo e o IR seguem em dias corridos
+        convencao_selecao = st.sidebar.radio("Contagem de dias", ("Corridos (365)", "Úteis (252)"), horizontal=True)
+        convencao = CONVENCAO_UTEIS if convencao_selecao == "Úteis (252)" else CONVENCAO_CORRIDOS
         st.sidebar.markdown("---")
 
         st.sidebar.header("📈 Projeções de Mercado")
+        # Snapshot de mercado do servidor (ver simulador/dados_mercado.py): só vale se o usuário escolher
+        mercado = snapshot_atual()
+        usar_snapshot = mercado is not None and st.sidebar.checkbox(
+            f"Usar curva do snapshot de mercado ({mercado.data_referencia:%d/%m/%Y})", key='usar_snapshot'
+        )
         col_proj1, col_proj2 = st.sidebar.columns(2)
-        taxa_cdi_proj = parse_br_currency(col_proj1.text_input("CDI/Selic Anual (%)", "13,65", key='proj_cdi'))
-        taxa_tesouro_proj = parse_br_currency(col_proj2.text_input("Tesouro Pré Fixo (%)", "12,00", key='proj_tesouro_pre'))
+        taxa_cdi_proj = parse_br_currency(col_proj1.text_input("CDI/Selic Anual (%)", "13,65", key='proj_cdi', disabled=usar_snapshot))
+        taxa_tesouro_proj = parse_br_currency(col_proj2.text_input("Tesouro Pré Fixo (%)", "12,00", key='proj_tesouro_pre', disabled=usar_snapshot))
+        if usar_snapshot:
+            # CDI, IPCA e Tesouro Pré passam a ser os do snapshot (as taxas digitadas ficam de lado)
+            taxa_cdi_proj, taxa_tesouro_proj = mercado.taxa_cdi_aa, mercado.taxa_pre_aa
+            st.sidebar.caption(
+                f"Snapshot de {mercado.data_referencia:%d/%m/%Y}: CDI e IPCA seguem a curva projetada "
+                f"(CDI inicial {mercado.taxa_cdi_aa:.2f}%, IPCA inicial {mercado.taxa_ipca_aa:.2f}%) "
+                f"e o Tesouro Pré rende {mercado.taxa_pre_aa:.2f}%."
+            )
+
+        # Curva projetada (opcional): substitui o CDI/IPCA constante por taxas que mudam ao longo do prazo
+        curva_cdi = None
+        curva_ipca = None
+        if st.sidebar.checkbox("Usar curva de juros projetada (por mês)"):
+            df_curva = st.sidebar.data_editor(
+                pd.DataFrame({"Mês inicial": [0], "CDI/Selic (%)": [taxa_cdi_proj], "IPCA (%)": [5.0]}),
+                num_rows="dynamic", hide_index=True, key="curva_juros"
+            )
+            df_curva = df_curva.dropna()
+            if not df_curva.empty:
+                curva_cdi = curva_mensal(zip(df_curva["Mês inicial"], df_curva["CDI/Selic (%)"]))
+                curva_ipca = curva_mensal(zip(df_curva["Mês inicial"], df_curva["IPCA (%)"]))
+        # Sem curva própria, o snapshot escolhido fornece a curva (a mesma para todas as sessões)
+        if usar_snapshot and curva_cdi is None:
+            curva_cdi = mercado.curva_cdi
         st.sidebar.markdown("---")
 
         st.sidebar.subheader("Configuração do Ativo Principal")
@@ -254,10 +351,12 @@ if st.session_state['authenticated']: # Usa 'authenticated' que foi inicializado
             params['taxa_fixa'] = parse_br_currency(taxa_fixa_str)
         elif tipo_rentabilidade == "IPCA":
             col_ipca1, col_ipca2 = st.sidebar.columns(2)
-            ipca_proj_str = col_ipca1.text_input("IPCA Projetado (%)", "5,00")
+            ipca_proj_str = col_ipca1.text_input("IPCA Projetado (%)", "5,00", disabled=usar_snapshot)
             taxa_real_str = col_ipca2.text_input("Juro Real (Taxa Fixa %)", "6,00")
-            params['ipca_proj'] = parse_br_currency(ipca_proj_str)
+            params['ipca_proj'] = mercado.taxa_ipca_aa if usar_snapshot else parse_br_currency(ipca_proj_str)
             params['taxa_fixa'] = parse_br_currency(taxa_real_str)
+            if usar_snapshot and curva_ipca is None:
+                curva_ipca = mercado.curva_ipca
 
         st.sidebar.markdown("---")
 
@@ -268,35 +367,84 @@ if st.session_state['authenticated']: # Usa 'authenticated' que foi inicializado
             benchmarks_list,
             default=["Poupança (Benchmark)", "CDB 100% CDI (Pós - Projeção)"]
         )
+        # Comparativos servidos pelas tabelas pré-calculadas do snapshot (a Poupança não depende das projeções)
+        comparativos_mercado = set()
+        if mercado is not None:
+            comparativos_mercado.add(BENCHMARK_POUPANCA)
+            if usar_snapshot:
+                comparativos_mercado.add(BENCHMARK_PRE)
+                if curva_cdi is mercado.curva_cdi:
+                    comparativos_mercado.add(BENCHMARK_CDI)
+
+        # Monte Carlo: só faz sentido para ativos indexados (CDI/IPCA variam ao longo do prazo)
+        usar_monte_carlo = False
+        n_trajetorias, volatilidade_mc = N_TRAJETORIAS_PADRAO, VOLATILIDADE_PADRAO
+        if tipo_rentabilidade in ("PÓS", "IPCA"):
+            usar_monte_carlo = st.sidebar.checkbox("Simulação Monte Carlo (bandas P5–P95)")
+            if usar_monte_carlo:
+                col_mc1, col_mc2 = st.sidebar.columns(2)
+                n_trajetorias = col_mc1.number_input("Trajetórias", 100, 20000, N_TRAJETORIAS_PADRAO, 1000)
+                volatilidade_mc = parse_br_currency(col_mc2.text_input("Volatilidade da Taxa (p.p. a.a.)", f"{VOLATILIDADE_PADRAO:.2f}".replace(".", ",")))
+
+        # Execução e Resultados (em segundo plano, ver simulador/tarefas.py)
+        executor = executor_padrao()
+        email_usuario = st.session_state['user_email']
+        # Assinatura dos parâmetros: se mudarem, o cálculo em andamento é cancelado e o resultado descartado
+        assinatura = (
+            valor_inicial, dias, convencao, taxa_cdi_proj, taxa_tesouro_proj,
+            curva_cdi.chave if curva_cdi is not None else None, curva_ipca.chave if curva_ipca is not None else None,
+            tipo_ativo_selecao, tipo_rentabilidade, tuple(sorted(params.items())), tuple(comparativos_selecionados),
+            usar_monte_carlo, n_trajetorias if usar_monte_carlo else None, volatilidade_mc if usar_monte_carlo else None,
+            mercado.versao if usar_snapshot else None
+        )
+        tarefa = executor.obter(st.session_state.get('tarefa_id'))
+        if tarefa is not None and st.session_state.get('tarefa_assinatura') != assinatura:
+            tarefa.cancelar()
+            tarefa = None
+            st.session_state['tarefa_id'] = None
 
-        # Execução e Resultados
         if st.sidebar.button("Calcular Cenário 🚀"):
             
             if valor_inicial <= 0:
                 st.warning("Insira um valor inicial positivo.")
                 st.stop() 
 
-            nome_ativo = f"{tipo_ativo_selecao} ({tipo_rentabilidade})"
-            final_results = {}
-            
+            # Um novo clique substitui o cálculo anterior desta sessão
+            if tarefa is not None:
+                tarefa.cancelar()
+            cenario = {
+                "valor_inicial": valor_inicial, "dias": dias, "convencao": convencao,
+                "tipo_rentabilidade": tipo_rentabilidade, "params": params, "is_isento": is_isento,
+                "nome_ativo": f"{tipo_ativo_selecao} ({tipo_rentabilidade})",
+                "curva_ativo": {"PÓS": curva_cdi, "IPCA": curva_ipca}.get(tipo_rentabilidade), "curva_cdi": curva_cdi,
+                "taxa_cdi_proj": taxa_cdi_proj, "taxa_tesouro_proj": taxa_tesouro_proj,
+                "comparativos": comparativos_selecionados,
+                "mercado": mercado, "comparativos_mercado": comparativos_mercado,
+                "monte_carlo": (n_trajetorias, volatilidade_mc) if usar_monte_carlo else None,
+            }
             try:
-                resultado_ativo = calcular_ativo_geral(valor_inicial, dias, tipo_rentabilidade, params, is_isento)
-                final_results[nome_ativo] = resultado_ativo
-            except Exception as e:
-                st.error(f"Erro nos parâmetros de cálculo do Ativo Principal: {e}"); 
-                st.stop() 
-
-            # Cálculos de Benchmarks
-            if "Poupança (Benchmark)" in comparativos_selecionados:
-                final_results["Poupança (Benchmark)"] = calcular_poupanca(valor_inicial, dias)
-            if "CDB 100% CDI (Pós - Projeção)" in comparativos_selecionados:
-                params_cdb_100 = {'taxa_ref': taxa_cdi_proj, 'percentual': 100} 
-                final_results["CDB 100% CDI (Pós - Projeção)"] = calcular_ativo_geral(valor_inicial, dias, "PÓS", params_cdb_100, False)
-            if "Tesouro Pré Fixo (Projeção)" in comparativos_selecionados:
-                params_tesouro_pre = {'taxa_fixa': taxa_tesouro_proj} 
-                final_results["Tesouro Pré Fixo (Projeção)"] = calcular_ativo_geral(valor_inicial, dias, "PRÉ", params_tesouro_pre, False)
+                tarefa = executor.submeter(email_usuario, calcular_cenario, cenario,
+                                           limite_usuario=limite_por_usuario(st.session_state['is_premium']))
+                st.session_state['tarefa_id'] = tarefa.id
+                st.session_state['tarefa_assinatura'] = assinatura
+                st.session_state['tarefa_consumida'] = False
+            except LimiteTarefasExcedido as e:
+                st.warning(str(e))
+                tarefa = None
+
+        if tarefa is not None and not tarefa.finalizada:
+            acompanhar_tarefa(tarefa.id)
+        elif tarefa is not None and tarefa.estado == ERRO:
+            st.error(tarefa.erro)
+        elif tarefa is not None and tarefa.estado == CONCLUIDA:
+            final_results = tarefa.resultado['final_results']
+            nome_ativo = tarefa.resultado['nome_ativo']
+            df_chart = tarefa.resultado['df_chart']
+            resultado_mc = tarefa.resultado['monte_carlo']
+            linhas_eq = tarefa.resultado['equivalencias']
 
             # Dashboard (Renderização dos resultados)
+            instrumentacao.etapa("grafico.barras")
             
             st.header("1. Montante Líquido Final 💰")
             df_barras = pd.DataFrame({
@@ -312,6 +460,7 @@ if st.session_state['authenticated']: # Usa 'authenticated' que foi inicializado
             st.plotly_chart(fig, use_container_width=True)
 
             # Tabela Detalhada
+            instrumentacao.etapa("tabela.detalhamento")
             st.subheader("2. Detalhamento Financeiro (Visão Contábil)")
             dados_tabela = []
             metricas = ["Valor Inicial", "Montante BRUTO", "Rendimento Total", "Imposto de Renda", "Rendimento LÍQUIDO", "Taxa Anual Nominal (Estimada)"]
@@ -331,13 +480,38 @@ if st.session_state['authenticated']: # Usa 'authenticated' que foi inicializado
             st.table(df_exibicao.set_index("Métrica"))
 
             # Gráfico de Evolução (Linhas)
+            instrumentacao.etapa("grafico.curva")
             st.header("3. Curva de Crescimento Patrimonial")
-            df_chart = pd.DataFrame({"Dia": final_results[nome_ativo]['df']["Dia"]})
-            for nome, res in final_results.items():
-                df_chart[nome] = res['df']["Montante Líquido"]
-            st.line_chart(df_chart.set_index("Dia"), height=400)
+            if resultado_mc is not None:
+                # Bandas P5–P95 do montante líquido do Ativo Principal, sobre as curvas determinísticas
+                fig_curva = go.Figure()
+                fig_curva.add_trace(go.Scatter(x=resultado_mc['dias'], y=resultado_mc['percentis'][95],
+                                               mode="lines", line=dict(width=0), name="P95", showlegend=False))
+                fig_curva.add_trace(go.Scatter(x=resultado_mc['dias'], y=resultado_mc['percentis'][5],
+                                               mode="lines", line=dict(width=0), fill="tonexty",
+                                               fillcolor="rgba(99, 110, 250, 0.2)", name=f"{nome_ativo} (P5–P95)"))
+                fig_curva.add_trace(go.Scatter(x=resultado_mc['dias'], y=resultado_mc['percentis'][50],
+                                               mode="lines", line=dict(dash="dash"), name=f"{nome_ativo} (P50)"))
+                for nome in final_results:
+                    fig_curva.add_trace(go.Scatter(x=df_chart["Dia"], y=df_chart[nome], mode="lines", name=nome))
+                fig_curva.update_layout(height=400, xaxis_title="Dia", yaxis_title="Montante Líquido")
+                st.plotly_chart(fig_curva, use_container_width=True)
+                st.caption(
+                    f"Monte Carlo ({resultado_mc['n_trajetorias']} trajetórias): montante líquido final entre "
+                    f"{format_br(resultado_mc['montante_liquido'][5])} (P5) e {format_br(resultado_mc['montante_liquido'][95])} (P95), "
+                    f"mediana {format_br(resultado_mc['montante_liquido'][50])}."
+                )
+            else:
+                st.line_chart(df_chart.set_index("Dia"), height=400)
             
+            if linhas_eq:
+                st.header("4. Equivalências com os Comparativos")
+                st.table(pd.DataFrame(linhas_eq).set_index("Comparativo"))
+                st.caption("Taxa e prazo de empate usam as taxas projetadas constantes e não se aplicam com curva projetada; "
+                           "o valor inicial sai dos resultados acima. Nada disso consome novas simulações.")
+
             # Mensagem Final
+            instrumentacao.etapa("interface.resultado")
             melhor_ativo_nome = max(final_results, key=lambda k: final_results[k]['montante_liquido'])
             melhor_ativo_valor = final_results[melhor_ativo_nome]['montante_liquido']
             st.success(f"🏆 Decisão Validada: O melhor **resultado líquido** é de **{melhor_ativo_nome}**, com um Montante Final de **{format_br(melhor_ativo_valor)}**.")
@@ -347,15 +521,20 @@ if st.session_state['authenticated']: # Usa 'authenticated' que foi inicializado
                 f"Criado por **Adrian Cardoso**, Analista de Dados e FP&A."
             )
             
-            # 4. Decrementar o Limite APÓS o cálculo (se não for premium)
-            if not is_premium:
-                 db_manager.decrement_simulacoes(st.session_state['user_email'])
+            # 4. Decrementar o Limite APÓS o cálculo (se não for premium), uma única vez por cálculo
+            if not st.session_state.get('tarefa_consumida'):
+                st.session_state['tarefa_consumida'] = True
+                # Tempos do cálculo (medidos na thread da tarefa) entram nesta reexecução
+                instrumentacao.mesclar_etapas(tarefa.etapas)
+                if not is_premium:
+                     db_manager.decrement_simulacoes(email_usuario)
+                instrumentacao.contar("simulador_simulacoes_total", usuario=email_usuario)
                  
     else:
         # Usuário logado, mas limite esgotado
         st.error("Seu limite de simulações gratuitas acabou. 😢")
         st.subheader("Para continuar simulando, considere o plano Premium.")
-        st.info("Para este ambiente de teste, faça **Logout** e **Login** novamente para resetar o limite de 5 simulações.")
+        st.info("O limite de 5 simulações gratuitas é renovado diariamente. Volte amanhã ou assine o Premium.")
         
         if st.button("Logout"):
             db_manager.logout_user()
@@ -365,6 +544,8 @@ else:
     # --- 🔓 RENDERIZA A TELA DE LOGIN/CADASTRO (USUÁRIO NÃO AUTENTICADO) ---
     render_login_page()
 
+instrumentacao.finalizar_execucao(usuario=st.session_state.get('user_email'))
+
 
 
 
@@ -0,0 +1,177 @@
+import atexit
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import bcrypt
+except ImportError:  # bcrypt é opcional: sem ele, usa-se o scrypt da biblioteca padrão
+    bcrypt = None
+
+# Hash de senhas e sessões, sem dependência do Streamlit nem do banco.
+# - Hash lento (bcrypt ou scrypt) com custo configurável. O formato fica no próprio
+#   hash ("$2b$12$..." ou "$scrypt$14$8$1$sal$hash"), então hashes de custos e
+#   algoritmos diferentes convivem no banco.
+# - O cálculo do hash roda em um pool de threads limitado (bcrypt e scrypt liberam
+#   o GIL): logins simultâneos não disputam a CPU além de TRABALHADORES_HASH.
+#   O pool só limita a concorrência: quem chama (a thread do script no login e
+#   no cadastro) espera o resultado, e o login continua levando o tempo do hash.
+# - A comparação é em tempo constante (hmac.compare_digest / bcrypt.checkpw).
+# - Hashes SHA-256 antigos continuam aceitos e precisa_rehash() indica a troca
+#   pelo formato atual no próximo login.
+# - Depois do login, a sessão é um token em memória com validade renovada a cada
+#   uso: as reexecuções do script conferem o token, sem hash de senha nem banco.
+
+ALGORITMO = os.environ.get("SIMULADOR_SENHA_ALGORITMO", "bcrypt" if bcrypt is not None else "scrypt")
+# bcrypt: log2 das rodadas (12 ~ 250-400 ms por hash); scrypt: log2 de N, com r=8 e p=1
+CUSTO_BCRYPT = int(os.environ.get("SIMULADOR_BCRYPT_CUSTO", "12"))
+CUSTO_SCRYPT = int(os.environ.get("SIMULADOR_SCRYPT_CUSTO", "14"))
+SCRYPT_R = 8
+SCRYPT_P = 1
+TRABALHADORES_HASH = int(os.environ.get("SIMULADOR_HASH_TRABALHADORES", str(os.cpu_count() or 1)))
+SESSAO_TTL_SEGUNDOS = float(os.environ.get("SIMULADOR_SESSAO_TTL_SEGUNDOS", "1800"))
+
+ALGORITMOS = ("bcrypt", "scrypt")
+
+# ==========================================
+# 1. HASH DE SENHAS
+# ==========================================
+
+def _senha_bcrypt(senha):
+    # O bcrypt aceita até 72 bytes; senhas maiores entram pelo seu SHA-256 (base64)
+    dados = senha.encode()
+    return dados if len(dados) <= 72 else base64.b64encode(hashlib.sha256(dados).digest())
+
+def _scrypt(senha, sal, custo, r, p):
+    # maxmem com folga para o custo pedido (128 * r * N bytes)
+    return hashlib.scrypt(senha.encode(), salt=sal, n=2**custo, r=r, p=p, maxmem=256 * r * 2**custo)
+
+def _b64(dados):
+    return base64.b64encode(dados).decode()
+
+def gerar_hash(senha, algoritmo=None, custo=None):
+    """Hash lento da senha no formato do algoritmo (o custo e o sal ficam no próprio texto)."""
+    algoritmo = algoritmo or ALGORITMO
+    if algoritmo == "bcrypt":
+        if bcrypt is None:
+            raise RuntimeError("O pacote 'bcrypt' não está instalado (use SIMULADOR_SENHA_ALGORITMO=scrypt).")
+        return bcrypt.hashpw(_senha_bcrypt(senha), bcrypt.gensalt(custo or CUSTO_BCRYPT)).decode()
+    if algoritmo == "scrypt":
+        custo = custo or CUSTO_SCRYPT
+        sal = os.urandom(16)
+        return f"$scrypt${custo}${SCRYPT_R}${SCRYPT_P}${_b64(sal)}${_b64(_scrypt(senha, sal, custo, SCRYPT_R, SCRYPT_P))}"
+    raise ValueError(f"Algoritmo de senha inválido: {algoritmo} (use {' ou '.join(ALGORITMOS)})")
+
+def _eh_legado(armazenado):
+    return not armazenado.startswith("$")
+
+def verificar_hash(senha, armazenado):
+    """Confere a senha contra o hash guardado, em tempo constante (aceita o SHA-256 legado)."""
+    if armazenado.startswith("$scrypt$"):
+        _, _, custo, r, p, sal, esperado = armazenado.split("$")
+        calculado = _scrypt(senha, base64.b64decode(sal), int(custo), int(r), int(p))
+        return hmac.compare_digest(calculado, base64.b64decode(esperado))
+    if armazenado.startswith("$2"):
+        if bcrypt is None:
+            raise RuntimeError("Hash bcrypt no banco, mas o pacote 'bcrypt' não está instalado.")
+        return bcrypt.checkpw(_senha_bcrypt(senha), armazenado.encode())
+    # Legado: SHA-256 simples em hexadecimal
+    return hmac.compare_digest(hashlib.sha256(senha.encode()).hexdigest(), armazenado)
+
+def precisa_rehash(armazenado):
+    """True se o hash é legado ou de outro algoritmo/custo que os configurados."""
+    if _eh_legado(armazenado):
+        return True
+    if armazenado.startswith("$scrypt$"):
+        return ALGORITMO != "scrypt" or int(armazenado.split("$")[2]) != CUSTO_SCRYPT
+    return ALGORITMO != "bcrypt" or int(armazenado.split("$")[2]) != CUSTO_BCRYPT
+
+# ==========================================
+# 2. POOL DE HASH (FORA DA THREAD DO APP)
+# ==========================================
+
+_pool = None
+_pool_lock = threading.Lock()
+_hash_ficticio = None
+
+def _executor():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=TRABALHADORES_HASH, thread_name_prefix="simulador-hash")
+                atexit.register(_pool.shutdown, wait=False)
+    return _pool
+
+def hash_senha(senha):
+    """gerar_hash executado no pool de hash (limita os hashes simultâneos do processo; bloqueia até o fim)."""
+    return _executor().submit(gerar_hash, senha).result()
+
+def verificar_senha(senha, armazenado):
+    """verificar_hash executado no pool de hash (bloqueia até o fim)."""
+    return _executor().submit(verificar_hash, senha, armazenado).result()
+
+def hash_ficticio():
+    """Hash de uma senha aleatória, para verificar logins de emails inexistentes no mesmo tempo."""
+    global _hash_ficticio
+    if _hash_ficticio is None or precisa_rehash(_hash_ficticio):
+        _hash_ficticio = hash_senha(secrets.token_urlsafe(16))
+    return _hash_ficticio
+
+# ==========================================
+# 3. SESSÕES (TOKENS EM MEMÓRIA)
+# ==========================================
+
+class CacheSessoes:
+    """Tokens de sessão -> email, com validade renovada a cada uso. Seguro entre threads."""
+
+    def __init__(self, ttl_segundos=SESSAO_TTL_SEGUNDOS):
+        self.ttl_segundos = ttl_segundos
+        self._sessoes = {}
+        self._lock = threading.Lock()
+
+    def abrir(self, email):
+        token = secrets.token_urlsafe(32)
+        agora = time.monotonic()
+        with self._lock:
+            # Descarta as expiradas (abertura é rara; a validação fica O(1))
+            for expirado in [t for t, (_, expira_em) in self._sessoes.items() if expira_em <= agora]:
+                del self._sessoes[expirado]
+            self._sessoes[token] = (email, agora + self.ttl_segundos)
+        return token
+
+    def validar(self, token):
+        """Email da sessão, ou None se o token não existe ou expirou."""
+        if not token:
+            return None
+        agora = time.monotonic()
+        with self._lock:
+            sessao = self._sessoes.get(token)
+            if sessao is None:
+                return None
+            email, expira_em = sessao
+            if expira_em <= agora:
+                del self._sessoes[token]
+                return None
+            self._sessoes[token] = (email, agora + self.ttl_segundos)
+            return email
+
+    def encerrar(self, token):
+        with self._lock:
+            self._sessoes.pop(token, None)
+
+_sessoes = CacheSessoes()
+
+def abrir_sessao(email):
+    return _sessoes.abrir(email)
+
+def validar_sessao(token):
+    return _sessoes.validar(token)
+
+def encerrar_sessao(token):
+    _sessoes.encerrar(token)
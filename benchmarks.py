@@ -0,0 +1,703 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+# Benchmarks, verificações de carga e valores de referência do simulador.
+#
+#   python benchmarks.py                        # mede tudo e compara com a baseline
+#   python benchmarks.py --apenas motor lote    # só os benchmarks cujo nome contém 'motor' ou 'lote'
+#   python benchmarks.py --atualizar-baseline   # grava as medições atuais como nova baseline
+#   python benchmarks.py --atualizar-golden     # regrava os valores de referência (mudança intencional)
+#   python benchmarks.py --estrito              # regressões de tempo também falham (máquina dedicada)
+#
+# Cada benchmark devolve métricas "quanto menor, melhor" (ms, KiB). Uma métrica
+# acima de baseline * (1 + tolerância), e também acima da folga absoluta da sua
+# unidade, é regressão. Os tempos da baseline são de outra máquina (ou de outro
+# momento da mesma): antes da comparação, eles são escalados pela razão entre um
+# laço de calibração medido agora e o gravado com a baseline. Mesmo assim, tempos
+# variam com a carga da máquina, então regressões de tempo são só avisos, a menos
+# que se use --estrito. O código de saída 1 vem dos valores de referência (golden),
+# que fixam os resultados numéricos do motor, e das regressões de memória (KiB),
+# que são determinísticas.
+# Roda contra um banco SQLite temporário (não toca no simulador.db local).
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["SIMULADOR_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="simulador_bench_"), "bench.db")
+
+import conexao_db
+import cotas
+from simulador.carteira import calcular_carteira, gerar_lotes
+from simulador.equivalencia import prazo_equilibrio_lote, taxa_equivalente_lote
+from simulador.motor_calculo import calcular_ativo_geral, calcular_cenarios_lote, calcular_poupanca
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_BASELINE = os.path.join(DIRETORIO, "benchmarks_baseline.json")
+ARQUIVO_GOLDEN = os.path.join(DIRETORIO, "benchmarks_golden.json")
+
+# Regressão: mais de 50% acima da baseline (medições de tempo variam entre execuções)
+TOLERANCIA_PADRAO = 0.5
+# Diferenças abaixo destas folgas são ruído de medição, qualquer que seja a razão
+FOLGA_ABSOLUTA = {"ms": 1.0, "kib": 16.0}
+# Chave da baseline com o tempo do laço de calibração da máquina que a gravou
+CHAVE_CALIBRACAO = "_calibracao_ms"
+
+def _melhor_tempo_ms(funcao, repeticoes=5):
+    """Menor tempo (ms) de 'repeticoes' execuções: o mínimo é a medida menos sujeita a ruído."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos) * 1000
+
+def _carga_calibracao():
+    # Mistura de Python puro e NumPy, como os benchmarks
+    import numpy as np
+    total = 0
+    for i in range(200_000):
+        total += i % 7
+    valores = np.linspace(0.0, 1.0, 500_000)
+    return total + float(np.exp(np.log1p(valores)).sum())
+
+def medir_calibracao():
+    """Tempo (ms) de um laço fixo: mede a velocidade da máquina no momento da execução."""
+    return _melhor_tempo_ms(_carga_calibracao, 7)
+
+# ==========================================
+# 1. COTAS (CONCORRÊNCIA)
+# ==========================================
+
+def _criar_usuario(email, franquia):
+    with conexao_db.cursor_db() as cursor:
+        cursor.execute(conexao_db.sql("DELETE FROM cotas_diarias WHERE email = ?"), (email,))
+        cursor.execute(conexao_db.sql("DELETE FROM usuarios WHERE email = ?"), (email,))
+        cursor.execute(
+            conexao_db.sql("INSERT INTO usuarios (email, password_hash, is_premium, simulacoes_restantes) VALUES (?, ?, ?, ?)"),
+            (email, "-", False, franquia)
+        )
+
+def _martelar(consumir, email, threads, tentativas):
+    """Dispara 'threads' x 'tentativas' consumos simultâneos. Retorna (sucessos, segundos)."""
+    sucessos = [0] * threads
+    largada = threading.Barrier(threads)
+
+    def trabalhador(indice):
+        largada.wait()
+        for _ in range(tentativas):
+            if consumir(email):
+                sucessos[indice] += 1
+
+    # Flushes concorrentes com os consumos, para exercitar a ressincronização do saldo
+    parar = threading.Event()
+
+    def flusher():
+        while not parar.wait(0.001):
+            cotas.flush_cotas()
+
+    inicio = time.perf_counter()
+    workers = [threading.Thread(target=trabalhador, args=(i,)) for i in range(threads)]
+    thread_flush = threading.Thread(target=flusher)
+    thread_flush.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    segundos = time.perf_counter() - inicio
+    parar.set()
+    thread_flush.join()
+    return sum(sucessos), segundos
+
+def bench_cota_concorrente(threads=16, tentativas=200):
+    """Várias threads consumindo a cota de uma mesma conta: sem contagem a mais nem a menos."""
+    total = threads * tentativas
+    caminhos = {
+        "banco (atômico)": lambda email: cotas.consumir_no_banco(email) == 1,
+        "write-behind": cotas._contador.consumir,
+    }
+    for nome, consumir in caminhos.items():
+        # Franquia menor que a demanda: exatamente 'franquia' consumos devem passar
+        # Franquia maior que a demanda: nenhum decremento pode se perder
+        for franquia in (total // 3, total * 2):
+            email = f"stress-{franquia}@bench"
+            _criar_usuario(email, franquia)
+            cotas._contador.invalidar(email)
+            sucessos, segundos = _martelar(consumir, email, threads, tentativas)
+            cotas.flush_cotas()
+            esperado = min(franquia, total)
+            saldo = cotas.restantes_no_banco(email)
+            assert sucessos == esperado, f"{nome}: {sucessos} consumos, esperado {esperado}"
+            assert saldo == franquia - esperado, f"{nome}: saldo {saldo}, esperado {franquia - esperado}"
+            print(f"cota [{nome}] franquia={franquia}: {sucessos}/{total} consumos em {segundos * 1000:.1f} ms "
+                  f"({total / segundos:,.0f} op/s), saldo final {saldo} ✅")
+    # Sem métricas de baseline: o tempo com 16 threads depende do escalonador, não do código
+
+# ==========================================
+# 2. MEMÓRIA POR CENÁRIO
+# ==========================================
+
+def _pico_memoria_kib(funcao):
+    """Pico de memória alocada (KiB) durante a chamada, medido com tracemalloc."""
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / 1024
+
+def bench_memoria_resultado(prazos=(360, 3600, 18250)):
+    """Memória de um resultado: dicionário com DataFrame vs ResultadoCompacto (float64/float32)."""
+    params = {'taxa_ref': 13.65, 'percentual': 100}
+    metricas = {}
+    for dias in prazos:
+        pico = _pico_memoria_kib(lambda: calcular_ativo_geral(10000.0, dias, "PÓS", params, False))
+        pico_compacto = _pico_memoria_kib(lambda: calcular_ativo_geral(10000.0, dias, "PÓS", params, False, compacto=True))
+        completo = calcular_ativo_geral(10000.0, dias, "PÓS", params, False)
+        bytes_completo = int(completo['df'].memory_usage(index=True, deep=True).sum()) + sys.getsizeof(completo)
+        compacto = calcular_ativo_geral(10000.0, dias, "PÓS", params, False, compacto=True)
+        compacto32 = calcular_ativo_geral(10000.0, dias, "PÓS", params, False, compacto=True, float32=True)
+        assert compacto['montante_liquido'] == completo['montante_liquido']
+        assert (compacto['df']['Montante Líquido'] == completo['df']['Montante Líquido']).all()
+        print(f"memória [{dias} dias]: DataFrame {bytes_completo / 1024:,.1f} KiB | "
+              f"compacto {compacto.nbytes / 1024:,.1f} KiB ({bytes_completo / compacto.nbytes:.1f}x) | "
+              f"float32 {compacto32.nbytes / 1024:,.1f} KiB ({bytes_completo / compacto32.nbytes:.1f}x) | "
+              f"pico {pico:,.1f} KiB (compacto {pico_compacto:,.1f} KiB)")
+        metricas[f"memoria.{dias}d.dataframe_kib"] = bytes_completo / 1024
+        metricas[f"memoria.{dias}d.compacto_kib"] = compacto.nbytes / 1024
+        metricas[f"memoria.{dias}d.pico_kib"] = pico
+        metricas[f"memoria.{dias}d.pico_compacto_kib"] = pico_compacto
+    return metricas
+
+# ==========================================
+# 3. TEMPO DE IMPORTAÇÃO DO MOTOR
+# ==========================================
+
+ORCAMENTO_IMPORTACAO_SEGUNDOS = 0.5
+MODULOS_PROIBIDOS = ("streamlit", "plotly", "pandas", "db_manager")
+
+def bench_tempo_importacao(repeticoes=3):
+    """O pacote 'simulador' deve importar rápido e sem carregar a interface web."""
+    codigo = (
+        "import sys, time; inicio = time.perf_counter(); "
+        "from simulador.cache_simulacao import calcular_ativo_cache; "
+        "print(time.perf_counter() - inicio); "
+        f"print(','.join(m for m in {MODULOS_PROIBIDOS!r} if m in sys.modules))"
+    )
+    tempos = []
+    for _ in range(repeticoes):
+        # Processo novo a cada medição (sem módulos já carregados)
+        saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, cwd=DIRETORIO, check=True)
+        tempo, carregados = (saida.stdout.splitlines() + [""])[:2]
+        assert not carregados, f"Importar o motor carregou: {carregados}"
+        tempos.append(float(tempo))
+    melhor = min(tempos)
+    assert melhor <= ORCAMENTO_IMPORTACAO_SEGUNDOS, f"Importação levou {melhor:.3f}s (orçamento {ORCAMENTO_IMPORTACAO_SEGUNDOS}s)"
+    print(f"importação do motor: {melhor * 1000:.0f} ms (orçamento {ORCAMENTO_IMPORTACAO_SEGUNDOS * 1000:.0f} ms) ✅")
+    return {"importacao.motor_ms": melhor * 1000}
+
+# ==========================================
+# 4. CARTEIRA COM APORTES (LOTES)
+# ==========================================
+
+def bench_carteira_lotes(n_posicoes=50, anos=20):
+    """Carteira vetorizada vs um calcular_ativo_geral por lote (mesmo resultado final)."""
+    dias = 365 * anos
+    posicoes = [
+        {"nome": f"Posição {i}", "tipo": "PRÉ", "params": {"taxa_fixa": 9.0 + i % 5}, "isento": i % 4 == 0,
+         "valor_inicial": 10000.0, "aporte_mensal": 500.0}
+        for i in range(n_posicoes)
+    ]
+    carteira = calcular_carteira(posicoes, dias)
+    tempo_vetorizado = _melhor_tempo_ms(lambda: calcular_carteira(posicoes, dias)) / 1000
+
+    inicio = time.perf_counter()
+    montante_liquido = 0.0
+    for indice, dia, valor in zip(*gerar_lotes(posicoes, dias)):
+        pos = posicoes[indice]
+        montante_liquido += calcular_ativo_geral(valor, int(dias - dia), pos["tipo"], pos["params"], pos["isento"],
+                                                 compacto=True)["montante_liquido"]
+    tempo_por_lote = time.perf_counter() - inicio
+
+    assert abs(carteira["montante_liquido"] - montante_liquido) <= 1e-6 * montante_liquido
+    assert abs(carteira["df"]["Montante Líquido"].iloc[-1] - montante_liquido) <= 1e-6 * montante_liquido
+    print(f"carteira [{len(carteira['lotes'])} lotes, {dias} dias]: vetorizado {tempo_vetorizado * 1000:.0f} ms | "
+          f"por lote {tempo_por_lote * 1000:.0f} ms ({tempo_por_lote / tempo_vetorizado:.0f}x)")
+    return {"carteira.vetorizado_ms": tempo_vetorizado * 1000}
+
+# ==========================================
+# 5. EQUIVALÊNCIAS (CÁLCULO INVERSO)
+# ==========================================
+
+def bench_equivalencias(n_pares=100_000):
+    """Taxa equivalente e prazo de equilíbrio para uma tabela de pares CDB x LCI/LCA."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(42)
+    pares = pd.DataFrame({
+        "dias": rng.integers(30, 3650, n_pares),
+        "tipo_a": "PÓS", "isento_a": False, "taxa_ref_a": 13.65, "percentual_a": rng.uniform(90, 130, n_pares),
+        "tipo_b": "PÓS", "isento_b": True, "taxa_ref_b": 13.65, "percentual_b": rng.uniform(80, 100, n_pares),
+    })
+    taxas = taxa_equivalente_lote(pares)
+    prazos = prazo_equilibrio_lote(pares)
+    tempo_taxa = _melhor_tempo_ms(lambda: taxa_equivalente_lote(pares), 3) / 1000
+    tempo_prazo = _melhor_tempo_ms(lambda: prazo_equilibrio_lote(pares), 3) / 1000
+
+    # Ida e volta pelo motor: A com a taxa equivalente empata com B
+    lado_a = pd.DataFrame({"valor_inicial": 1.0, "dias": pares["dias"], "tipo": "PÓS", "isento": False,
+                           "taxa_ref": 13.65, "percentual": taxas["parametro_equivalente"]})
+    lado_b = pd.DataFrame({"valor_inicial": 1.0, "dias": pares["dias"], "tipo": "PÓS", "isento": True,
+                           "taxa_ref": 13.65, "percentual": pares["percentual_b"]})
+    diferenca = calcular_cenarios_lote(lado_a)["montante_liquido"] - calcular_cenarios_lote(lado_b)["montante_liquido"]
+    assert diferenca.abs().max() < 1e-9, diferenca.abs().max()
+    print(f"equivalências [{n_pares} pares]: taxa {tempo_taxa * 1000:.0f} ms | prazo de equilíbrio {tempo_prazo * 1000:.0f} ms "
+          f"({prazos['prazo_equilibrio'].notna().mean():.0%} com equilíbrio em 30 anos)")
+    return {"equivalencias.taxa_ms": tempo_taxa * 1000, "equivalencias.prazo_ms": tempo_prazo * 1000}
+
+# ==========================================
+# 6. LATÊNCIA DO MOTOR (30 DIAS A 50 ANOS)
+# ==========================================
+
+PRAZOS_LATENCIA = (30, 360, 3650, 18250)
+
+def bench_latencia_motor(prazos=PRAZOS_LATENCIA):
+    """Latência de um cenário em prazos típicos e extremos (resultado completo, com DataFrame)."""
+    params = {'taxa_ref': 13.65, 'percentual': 110}
+    metricas = {}
+    for dias in prazos:
+        ativo = _melhor_tempo_ms(lambda: calcular_ativo_geral(10000.0, dias, "PÓS", params, False), 20)
+        compacto = _melhor_tempo_ms(lambda: calcular_ativo_geral(10000.0, dias, "PÓS", params, False, compacto=True), 20)
+        poupanca = _melhor_tempo_ms(lambda: calcular_poupanca(10000.0, dias), 20)
+        print(f"latência [{dias} dias]: ativo {ativo:.3f} ms | compacto {compacto:.3f} ms | poupança {poupanca:.3f} ms")
+        metricas[f"latencia.ativo_{dias}d_ms"] = ativo
+        metricas[f"latencia.compacto_{dias}d_ms"] = compacto
+        metricas[f"latencia.poupanca_{dias}d_ms"] = poupanca
+    return metricas
+
+def bench_prazo_incremental(prazo_base=18000, passos=200):
+    """Mudar só o prazo (ex.: slider de dias): curva do cache truncada/estendida vs cálculo do zero."""
+    from simulador import cache_simulacao
+    params = {'taxa_ref': 13.65, 'percentual': 110}
+    prazos = [prazo_base + (passo * 37) % 500 - 250 for passo in range(passos)]
+    metricas = {}
+    for convencao in ("DC365", "DU252"):
+        def incremental():
+            cache_simulacao.limpar_cache()
+            for dias in prazos:
+                cache_simulacao.calcular_ativo_cache(10000.0, dias, "PÓS", params, False, None, convencao)
+
+        def do_zero():
+            for dias in prazos:
+                calcular_ativo_geral(10000.0, dias, "PÓS", params, False, None, convencao, compacto=True)
+
+        tempo_incremental = _melhor_tempo_ms(incremental, 5)
+        tempo_do_zero = _melhor_tempo_ms(do_zero, 5)
+        print(f"prazo incremental [{convencao}, {passos} prazos perto de {prazo_base} dias]: {tempo_incremental:.1f} ms | "
+              f"do zero {tempo_do_zero:.1f} ms ({tempo_do_zero / tempo_incremental:.1f}x)")
+        metricas[f"latencia.prazo_incremental_{convencao.lower()}_ms"] = tempo_incremental
+    cache_simulacao.limpar_cache()
+    return metricas
+
+# ==========================================
+# 7. VAZÃO EM LOTE
+# ==========================================
+
+def _cenarios_aleatorios(n_cenarios, semente=7):
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(semente)
+    return pd.DataFrame({
+        "valor_inicial": rng.uniform(1_000, 1_000_000, n_cenarios).round(2),
+        "dias": rng.integers(30, 18250, n_cenarios),
+        "tipo": rng.choice(["PRÉ", "PÓS", "IPCA", "POUPANÇA"], n_cenarios),
+        "isento": rng.random(n_cenarios) < 0.3,
+        "taxa_fixa": 6.0, "taxa_ref": 13.65, "percentual": rng.uniform(80, 130, n_cenarios), "ipca_proj": 5.0,
+    })
+
+def bench_lote_cenarios(n_cenarios=200_000):
+    """Vazão de calcular_cenarios_lote em uma varredura de cenários (DC/365 e DU/252)."""
+    cenarios = _cenarios_aleatorios(n_cenarios)
+    corridos = _melhor_tempo_ms(lambda: calcular_cenarios_lote(cenarios), 3)
+    uteis = cenarios.assign(convencao="DU252", data_inicio="2025-01-02")
+    tempo_uteis = _melhor_tempo_ms(lambda: calcular_cenarios_lote(uteis), 3)
+    print(f"lote [{n_cenarios} cenários]: DC/365 {corridos:.0f} ms ({n_cenarios / corridos * 1000:,.0f} cenários/s) | "
+          f"DU/252 {tempo_uteis:.0f} ms ({n_cenarios / tempo_uteis * 1000:,.0f} cenários/s)")
+    return {"lote.dc365_ms": corridos, "lote.du252_ms": tempo_uteis}
+
+# ==========================================
+# 8. LOGIN E COTA (OPERAÇÕES DO USUÁRIO)
+# ==========================================
+
+def bench_login_cota(repeticoes=200):
+    """Latência média da validação de sessão (reexecução), leitura do saldo e consumo de cota pelo db_manager."""
+    import db_manager
+    # Fora do 'streamlit run' o session_state avisa a cada acesso; os avisos não interessam aqui
+    logging.disable(logging.WARNING)
+    email, senha = db_manager.USUARIOS_DEMO[0][:2]
+    db_manager.initialize_db()
+    _criar_usuario("cota@bench", repeticoes * 20)
+    _criar_usuario("cota-banco@bench", repeticoes * 20)
+    cotas._contador.invalidar("cota@bench")
+
+    def media_ms(funcao):
+        return _melhor_tempo_ms(lambda: [funcao() for _ in range(repeticoes)], 3) / repeticoes
+
+    # O login em si (hash lento) é medido em bench_autenticacao; aqui, o que roda a cada reexecução
+    assert db_manager.login_user(email, senha)[0]
+    metricas = {
+        "login.sessao_valida_ms": media_ms(db_manager.sessao_valida),
+        "login.get_simulacoes_restantes_ms": media_ms(lambda: db_manager.get_simulacoes_restantes("cota@bench")),
+        "login.decrement_simulacoes_ms": media_ms(lambda: db_manager.decrement_simulacoes("cota@bench")),
+        "login.consumo_no_banco_ms": media_ms(lambda: cotas.consumir_no_banco("cota-banco@bench")),
+    }
+    cotas.flush_cotas()
+    logging.disable(logging.NOTSET)
+    print("login/cota: " + " | ".join(f"{nome.split('.')[1]} {valor:.3f} ms" for nome, valor in metricas.items()))
+    return metricas
+
+# ==========================================
+# 9. CUSTO DA INSTRUMENTAÇÃO
+# ==========================================
+
+def bench_instrumentacao(chamadas=100_000):
+    """Custo de etapa()/medir() desligados (caminho padrão) e ligados, por lote de chamadas."""
+    from simulador import instrumentacao
+
+    def etapas():
+        instrumentacao.iniciar_execucao()
+        for _ in range(chamadas):
+            instrumentacao.etapa("bench")
+            with instrumentacao.medir("bench.medir"):
+                pass
+        instrumentacao.finalizar_execucao()
+
+    estado_original = instrumentacao.ATIVA
+    nivel_log = instrumentacao.logger.level
+    try:
+        instrumentacao.ativar(False)
+        desligada = _melhor_tempo_ms(etapas, 3)
+        instrumentacao.ativar(True)
+        instrumentacao.logger.setLevel(logging.WARNING)
+        ligada = _melhor_tempo_ms(etapas, 3)
+    finally:
+        instrumentacao.ativar(estado_original)
+        instrumentacao.logger.setLevel(nivel_log)
+        instrumentacao.limpar()
+    print(f"instrumentação [{chamadas} etapas + medições]: desligada {desligada:.1f} ms "
+          f"({desligada / chamadas * 1e6:.0f} ns por etapa + medição) | ligada {ligada:.1f} ms ({ligada / chamadas * 1e6:.0f} ns)")
+    return {"instrumentacao.desligada_ms": desligada, "instrumentacao.ligada_ms": ligada}
+
+# ==========================================
+# 10. TAREFAS EM SEGUNDO PLANO
+# ==========================================
+
+def bench_tarefas(n_tarefas=500, trajetorias=20000, dias=3650):
+    """Custo de enfileirar e concluir tarefas e demora para um Monte Carlo longo parar após o cancelamento."""
+    from simulador.monte_carlo import simular_monte_carlo
+    from simulador.tarefas import CANCELADA, ExecutorTarefas
+
+    executor = ExecutorTarefas(trabalhadores=2, fila_maxima=n_tarefas)
+    try:
+        def enfileirar():
+            tarefas = [executor.submeter(f"u{i}", lambda tarefa: tarefa.progredir(1.0)) for i in range(n_tarefas)]
+            for tarefa in tarefas:
+                tarefa.esperar()
+        sobrecarga = _melhor_tempo_ms(enfileirar, 3)
+
+        def monte_carlo(tarefa):
+            return simular_monte_carlo(10000, dias, "PRÉ", {'taxa_fixa': 12.5}, False, n_trajetorias=trajetorias,
+                                       semente=1, ao_progredir=tarefa.progredir)
+        tarefa = executor.submeter("mc", monte_carlo)
+        while tarefa.progresso == 0.0 and not tarefa.finalizada:
+            time.sleep(0.001)
+        inicio = time.perf_counter()
+        tarefa.cancelar()
+        tarefa.esperar()
+        cancelamento = (time.perf_counter() - inicio) * 1000
+        assert tarefa.estado == CANCELADA, tarefa.estado
+    finally:
+        executor.encerrar()
+    print(f"tarefas: {n_tarefas} enfileiradas e concluídas em {sobrecarga:.1f} ms "
+          f"({sobrecarga / n_tarefas * 1000:.0f} µs cada) | Monte Carlo {trajetorias}x{dias} parou "
+          f"{cancelamento:.1f} ms após o cancelamento")
+    return {"tarefas.enfileirar_ms": sobrecarga, "tarefas.cancelamento_ms": cancelamento}
+
+# ==========================================
+# 11. SNAPSHOT DE MERCADO (TABELAS PRÉ-CALCULADAS)
+# ==========================================
+
+def bench_dados_mercado(consultas=100_000):
+    """Montagem das tabelas de um snapshot, abertura em memory-map, consulta O(1) e recarga a quente."""
+    from simulador import dados_mercado
+    from simulador.cache_simulacao import calcular_ativo_cache
+
+    diretorio = tempfile.mkdtemp(prefix="simulador_mercado_")
+    caminho = os.path.join(diretorio, "projecoes.csv")
+    with open(dados_mercado.CAMINHO_PADRAO, encoding="utf-8") as origem, open(caminho, "w", encoding="utf-8") as destino:
+        destino.write(origem.read())
+
+    inicio = time.perf_counter()
+    snapshot = dados_mercado.carregar_snapshot(caminho, diretorio)
+    montagem = (time.perf_counter() - inicio) * 1000
+    abertura = _melhor_tempo_ms(lambda: dados_mercado.carregar_snapshot(caminho, diretorio))
+
+    inicio = time.perf_counter()
+    for dia in range(consultas):
+        snapshot.fator(dados_mercado.BENCHMARK_CDI, dia % snapshot.horizonte_dias)
+    consulta = (time.perf_counter() - inicio) * 1000
+
+    # Mesmos números do motor com a mesma curva
+    for dias in (1, 360, 721, snapshot.horizonte_dias):
+        tabela = snapshot.resultado(dados_mercado.BENCHMARK_CDI, 10000.0, dias)
+        motor = calcular_ativo_cache(10000.0, dias, "PÓS", {'taxa_ref': snapshot.taxa_cdi_aa, 'percentual': 100}, False,
+                                     snapshot.curva_cdi)
+        assert tabela['montante_liquido'] == motor['montante_liquido'], dias
+
+    # Recarga a quente: um novo arquivo troca o snapshot sem reiniciar o processo
+    intervalo_original = dados_mercado.INTERVALO_VERIFICACAO_SEGUNDOS
+    try:
+        dados_mercado.INTERVALO_VERIFICACAO_SEGUNDOS = 0
+        dados_mercado.recarregar()
+        anterior = dados_mercado.snapshot_atual(caminho)
+        with open(caminho, "a", encoding="utf-8") as arquivo:
+            arquivo.write(f"{anterior.data_referencia},PRE,1,{anterior.taxa_pre_aa + 1}\n")
+        os.utime(caminho, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+        atual = dados_mercado.snapshot_atual(caminho)
+        assert atual is not anterior and atual.versao != anterior.versao
+    finally:
+        dados_mercado.INTERVALO_VERIFICACAO_SEGUNDOS = intervalo_original
+        dados_mercado.recarregar()
+
+    print(f"snapshot de mercado: tabelas de {snapshot.horizonte_dias} dias montadas em {montagem:.1f} ms, "
+          f"reabertas (memory-map) em {abertura:.2f} ms | {consultas} consultas em {consulta:.1f} ms "
+          f"({consulta / consultas * 1e6:.0f} ns cada) | recarga a quente ok")
+    return {"mercado.montagem_ms": montagem, "mercado.abertura_ms": abertura, "mercado.consultas_ms": consulta}
+
+# ==========================================
+# 12. AUTENTICAÇÃO (HASH LENTO DE SENHAS)
+# ==========================================
+
+CUSTOS_AUTENTICACAO = (("bcrypt", 4), ("bcrypt", 10), ("bcrypt", 12), ("scrypt", 12), ("scrypt", 14))
+
+def bench_autenticacao(custos=CUSTOS_AUTENTICACAO, duracao_alvo=1.0):
+    """Logins por segundo em cada custo de hash, com as verificações disputando o pool de hash."""
+    import autenticacao
+
+    # Correção: SHA-256 legado aceito e marcado para rehash; senha errada recusada
+    legado = hashlib.sha256(b"senha-antiga").hexdigest()
+    assert autenticacao.verificar_hash("senha-antiga", legado) and autenticacao.precisa_rehash(legado)
+    assert not autenticacao.verificar_hash("outra", legado)
+
+    metricas = {}
+    linhas = []
+    for algoritmo, custo in custos:
+        armazenado = autenticacao.gerar_hash("senha-bench", algoritmo, custo)
+        assert autenticacao.verificar_hash("senha-bench", armazenado)
+        assert not autenticacao.verificar_hash("senha-errada", armazenado)
+        # Quantidade de logins para ~duracao_alvo segundos, estimada por uma verificação isolada
+        inicio = time.perf_counter()
+        autenticacao.verificar_senha("senha-bench", armazenado)
+        logins = max(4, min(500, int(duracao_alvo / (time.perf_counter() - inicio))))
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as sessoes:
+            assert all(sessoes.map(lambda _: autenticacao.verificar_senha("senha-bench", armazenado), range(logins)))
+        decorrido = time.perf_counter() - inicio
+        metricas[f"autenticacao.{algoritmo}_{custo}_ms"] = decorrido * 1000 / logins
+        linhas.append(f"{algoritmo} {custo}: {logins / decorrido:.1f} logins/s")
+
+    print(f"autenticação [{autenticacao.TRABALHADORES_HASH} thread(s) de hash]: " + " | ".join(linhas))
+    return metricas
+
+# ==========================================
+# 13. VALORES DE REFERÊNCIA (GOLDEN)
+# ==========================================
+
+PRAZOS_GOLDEN = (1, 30, 180, 181, 360, 361, 720, 721, 3650, 18250)
+PARAMS_GOLDEN = {
+    "PRÉ": {'taxa_fixa': 12.5},
+    "PÓS": {'taxa_ref': 13.65, 'percentual': 110},
+    "IPCA": {'ipca_proj': 5.0, 'taxa_fixa': 6.0},
+}
+DATA_INICIO_GOLDEN = "2025-01-02"
+TOLERANCIA_GOLDEN = 1e-9
+
+def _resumo(resultado):
+    """Métricas finais e pontos da curva líquida (início, quartis e fim) de um resultado."""
+    curva = resultado['df']["Montante Líquido"].to_numpy()
+    pontos = [0, len(curva) // 4, len(curva) // 2, 3 * len(curva) // 4, len(curva) - 1]
+    resumo = {chave: float(resultado[chave]) for chave in
+              ("montante_liquido", "rendimento_liquido", "rendimento_bruto", "ir_devido", "aliquota", "taxa_nominal_aa")}
+    resumo["curva_liquida"] = [float(curva[ponto]) for ponto in pontos]
+    return resumo
+
+def calcular_golden():
+    """Resultados dos cenários de referência: tipos, isenção, limites das faixas de IR, DU/252, curvas, lote."""
+    from datetime import date
+    import pandas as pd
+    from simulador.curvas_juros import curva_mensal
+    from simulador.equivalencia import valor_necessario_lote
+
+    data_inicio = date.fromisoformat(DATA_INICIO_GOLDEN)
+    curva_cdi = curva_mensal([(0, 13.65), (6, 12.0), (18, 10.5)])
+    golden = {}
+    for dias in PRAZOS_GOLDEN:
+        golden[f"poupanca.{dias}d"] = _resumo(calcular_poupanca(10000.0, dias))
+        for tipo, params in PARAMS_GOLDEN.items():
+            for is_isento in (False, True):
+                nome = f"{tipo}.{'isento' if is_isento else 'tributado'}.{dias}d"
+                golden[nome] = _resumo(calcular_ativo_geral(10000.0, dias, tipo, params, is_isento))
+            golden[f"{tipo}.du252.{dias}d"] = _resumo(calcular_ativo_geral(
+                10000.0, dias, tipo, params, False, convencao="DU252", data_inicio=data_inicio))
+        golden[f"PÓS.curva.{dias}d"] = _resumo(calcular_ativo_geral(10000.0, dias, "PÓS", PARAMS_GOLDEN["PÓS"], False, curva_cdi))
+        golden[f"PÓS.curva.du252.{dias}d"] = _resumo(calcular_ativo_geral(
+            10000.0, dias, "PÓS", PARAMS_GOLDEN["PÓS"], False, curva_cdi, "DU252", data_inicio))
+
+    cenarios = _cenarios_aleatorios(50).assign(
+        convencao=["DU252" if i % 2 else "DC365" for i in range(50)], data_inicio=DATA_INICIO_GOLDEN)
+    lote = calcular_cenarios_lote(cenarios)
+    golden["lote"] = {coluna: [float(valor) for valor in lote[coluna]] for coluna in lote.columns}
+
+    carteira = calcular_carteira([
+        {"tipo": "PÓS", "params": PARAMS_GOLDEN["PÓS"], "isento": False, "valor_inicial": 10000.0, "aporte_mensal": 500.0, "curva": curva_cdi},
+        {"tipo": "PÓS", "params": {'taxa_ref': 13.65, 'percentual': 95}, "isento": True, "valor_inicial": 5000.0, "aporte_mensal": 250.0},
+        {"tipo": "POUPANÇA", "params": {}, "isento": True, "valor_inicial": 1000.0},
+    ], 1800)
+    golden["carteira"] = _resumo(carteira)
+
+    pares = pd.DataFrame({
+        "dias": list(PRAZOS_GOLDEN),
+        "tipo_a": "PÓS", "isento_a": False, "taxa_ref_a": 13.65, "percentual_a": 100.0,
+        "tipo_b": "PÓS", "isento_b": True, "taxa_ref_b": 13.65, "percentual_b": 90.0,
+    })
+    golden["equivalencia.taxa"] = [float(valor) for valor in taxa_equivalente_lote(pares)["parametro_equivalente"]]
+    golden["equivalencia.prazo"] = [float(valor) for valor in prazo_equilibrio_lote(pares.assign(percentual_a=110.0))["prazo_equilibrio"]]
+    golden["equivalencia.valor"] = [float(valor) for valor in valor_necessario_lote(pd.DataFrame({
+        "dias": list(PRAZOS_GOLDEN), "tipo": "PÓS", "isento": False, "taxa_ref": 13.65, "percentual": 110.0,
+        "valor_alvo": 50000.0}))["valor_necessario"]]
+    return golden
+
+def _divergencias(esperado, atual, caminho=""):
+    """Lista os valores de 'atual' fora da tolerância relativa em relação a 'esperado'."""
+    if isinstance(esperado, dict):
+        if set(esperado) != set(atual):
+            return [f"{caminho}: chaves {sorted(set(esperado) ^ set(atual))}"]
+        return [erro for chave in esperado for erro in _divergencias(esperado[chave], atual[chave], f"{caminho}.{chave}".lstrip("."))]
+    if isinstance(esperado, list):
+        if len(esperado) != len(atual):
+            return [f"{caminho}: {len(atual)} valores, esperado {len(esperado)}"]
+        return [erro for i, (e, a) in enumerate(zip(esperado, atual)) for erro in _divergencias(e, a, f"{caminho}[{i}]")]
+    if esperado != esperado and atual != atual:  # NaN nos dois
+        return []
+    if abs(atual - esperado) > TOLERANCIA_GOLDEN * max(1.0, abs(esperado)):
+        return [f"{caminho}: {atual!r}, esperado {esperado!r}"]
+    return []
+
+def verificar_golden(atualizar=False):
+    """Compara o motor com os valores de referência gravados (ou os regrava)."""
+    golden = calcular_golden()
+    if atualizar or not os.path.exists(ARQUIVO_GOLDEN):
+        with open(ARQUIVO_GOLDEN, "w", encoding="utf-8") as arquivo:
+            json.dump(golden, arquivo, ensure_ascii=False, indent=1, sort_keys=True)
+        print(f"valores de referência gravados em {os.path.basename(ARQUIVO_GOLDEN)} ({len(golden)} cenários)")
+        return True
+    with open(ARQUIVO_GOLDEN, encoding="utf-8") as arquivo:
+        esperado = json.load(arquivo)
+    erros = _divergencias(esperado, golden)
+    for erro in erros[:20]:
+        print(f"  ❌ {erro}")
+    print(f"valores de referência: {len(esperado)} cenários, {len(erros)} divergência(s) {'✅' if not erros else '❌'}")
+    return not erros
+
+# ==========================================
+# EXECUÇÃO
+# ==========================================
+
+BENCHMARKS = (
+    bench_cota_concorrente,
+    bench_memoria_resultado,
+    bench_tempo_importacao,
+    bench_carteira_lotes,
+    bench_equivalencias,
+    bench_latencia_motor,
+    bench_prazo_incremental,
+    bench_lote_cenarios,
+    bench_login_cota,
+    bench_instrumentacao,
+    bench_tarefas,
+    bench_dados_mercado,
+    bench_autenticacao,
+)
+
+def comparar_baseline(metricas, baseline, tolerancia, escala_tempo=1.0):
+    """Regressões {unidade: [texto]}: métricas acima de baseline * (1 + tolerância) e além da folga da unidade.
+
+    'escala_tempo' (calibração atual / calibração da baseline) ajusta as referências em ms
+    à velocidade da máquina que está medindo.
+    """
+    regressoes = {unidade: [] for unidade in FOLGA_ABSOLUTA}
+    for nome, valor in sorted(metricas.items()):
+        referencia = baseline.get(nome)
+        if referencia is None:
+            continue
+        unidade = nome.rsplit("_", 1)[-1]
+        if unidade == "ms":
+            referencia *= escala_tempo
+        if valor > referencia * (1 + tolerancia) and valor - referencia > FOLGA_ABSOLUTA[unidade]:
+            regressoes[unidade].append(f"{nome}: {valor:,.3f} (baseline {referencia:,.3f}, {valor / referencia:.2f}x)")
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks, baseline de desempenho e valores de referência do simulador.")
+    parser.add_argument("--apenas", nargs="+", metavar="NOME", help="roda só os benchmarks cujo nome contém algum destes trechos")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO,
+                        help=f"piora relativa aceita antes de falhar (padrão: {TOLERANCIA_PADRAO})")
+    parser.add_argument("--atualizar-baseline", action="store_true", help="grava as medições atuais em " + os.path.basename(ARQUIVO_BASELINE))
+    parser.add_argument("--atualizar-golden", action="store_true", help="regrava os valores de referência")
+    parser.add_argument("--estrito", action="store_true", help="regressões de tempo também falham (padrão: só aviso)")
+    args = parser.parse_args(argv)
+
+    ok = verificar_golden(args.atualizar_golden)
+    calibracao = medir_calibracao()
+    metricas = {}
+    for bench in BENCHMARKS:
+        if args.apenas and not any(trecho in bench.__name__ for trecho in args.apenas):
+            continue
+        metricas.update(bench() or {})
+
+    baseline = {}
+    if os.path.exists(ARQUIVO_BASELINE):
+        with open(ARQUIVO_BASELINE, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+    if args.atualizar_baseline:
+        baseline[CHAVE_CALIBRACAO] = round(calibracao, 4)
+        baseline.update({nome: round(valor, 4) for nome, valor in metricas.items()})
+        with open(ARQUIVO_BASELINE, "w", encoding="utf-8") as arquivo:
+            json.dump(baseline, arquivo, indent=1, sort_keys=True)
+        print(f"baseline gravada em {os.path.basename(ARQUIVO_BASELINE)} ({len(metricas)} métricas)")
+    else:
+        escala = calibracao / baseline[CHAVE_CALIBRACAO] if CHAVE_CALIBRACAO in baseline else 1.0
+        regressoes = comparar_baseline(metricas, baseline, args.tolerancia, escala)
+        for regressao in regressoes["kib"]:
+            print(f"  ❌ regressão de memória: {regressao}")
+        for regressao in regressoes["ms"]:
+            print(f"  {'❌' if args.estrito else '⚠️'} regressão de tempo: {regressao}")
+        falhas = regressoes["kib"] + (regressoes["ms"] if args.estrito else [])
+        comparadas = sum(1 for nome in metricas if nome in baseline)
+        print(f"baseline: {comparadas}/{len(metricas)} métricas comparadas (tempos escalados por {escala:.2f}x pela calibração), "
+              f"{len(regressoes['kib'])} regressão(ões) de memória e {len(regressoes['ms'])} de tempo"
+              f"{'' if args.estrito else ' (aviso)'} (tolerância {args.tolerancia:.0%}) {'✅' if not falhas else '❌'}")
+        ok = ok and not falhas
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Camada de conexão com o banco de dados, sem dependência do Streamlit.
+# - DATABASE_URL definido (postgresql://...): PostgreSQL com pool do psycopg2.
+# - Caso contrário: SQLite local em SIMULADOR_DB_PATH (padrão: simulador.db).
+# As conexões são reaproveitadas por um pool, evitando abrir uma conexão por chamada.
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "")
+SQLITE_PATH = os.environ.get("SIMULADOR_DB_PATH", "simulador.db")
+POOL_MIN_CONEXOES = int(os.environ.get("SIMULADOR_DB_POOL_MIN", "1"))
+POOL_MAX_CONEXOES = int(os.environ.get("SIMULADOR_DB_POOL_MAX", "10"))
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS usuarios (
+        email TEXT PRIMARY KEY,
+        password_hash TEXT NOT NULL,
+        is_premium BOOLEAN NOT NULL DEFAULT FALSE,
+        simulacoes_restantes INTEGER NOT NULL DEFAULT 5
+    )
+    """,
+    # Cota diária de simulações: uma linha por usuário e dia, iniciada com
+    # usuarios.simulacoes_restantes (a franquia diária do usuário)
+    """
+    CREATE TABLE IF NOT EXISTS cotas_diarias (
+        email TEXT NOT NULL,
+        dia TEXT NOT NULL,
+        restantes INTEGER NOT NULL,
+        PRIMARY KEY (email, dia)
+    )
+    """,
+)
+
+# ==========================================
+# 1. POOLS DE CONEXÃO
+# ==========================================
+
+class PoolSQLite:
+    """Pool simples de conexões SQLite compartilhadas entre threads."""
+
+    def __init__(self, caminho, max_conexoes):
+        self.caminho = caminho
+        self._livres = queue.LifoQueue()
+        self._semaforo = threading.BoundedSemaphore(max_conexoes)
+
+    def _nova_conexao(self):
+        conn = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False)
+        # WAL permite leituras concorrentes enquanto uma escrita acontece
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def getconn(self):
+        self._semaforo.acquire()
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            try:
+                return self._nova_conexao()
+            except Exception:
+                self._semaforo.release()
+                raise
+
+    def putconn(self, conn):
+        self._livres.put(conn)
+        self._semaforo.release()
+
+class PoolPostgres:
+    """Pool do psycopg2 que bloqueia (em vez de falhar) quando todas as conexões estão em uso."""
+
+    def __init__(self, url, min_conexoes, max_conexoes):
+        from psycopg2 import pool  # Dependência opcional: só necessária com DATABASE_URL
+        self._pool = pool.ThreadedConnectionPool(min_conexoes, max_conexoes, url)
+        self._semaforo = threading.BoundedSemaphore(max_conexoes)
+
+    def getconn(self):
+        self._semaforo.acquire()
+        try:
+            return self._pool.getconn()
+        except Exception:
+            self._semaforo.release()
+            raise
+
+    def putconn(self, conn):
+        self._pool.putconn(conn)
+        self._semaforo.release()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def is_postgres():
+    return DATABASE_URL.startswith(("postgres://", "postgresql://"))
+
+def _obter_pool():
+    """Cria o pool (e o schema) na primeira utilização."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if is_postgres():
+                    novo_pool = PoolPostgres(DATABASE_URL, POOL_MIN_CONEXOES, POOL_MAX_CONEXOES)
+                else:
+                    novo_pool = PoolSQLite(SQLITE_PATH, POOL_MAX_CONEXOES)
+                _criar_schema(novo_pool)
+                _pool = novo_pool
+    return _pool
+
+def _criar_schema(pool):
+    conn = pool.getconn()
+    try:
+        cursor = conn.cursor()
+        for comando in SCHEMA:
+            cursor.execute(comando)
+        conn.commit()
+    finally:
+        pool.putconn(conn)
+
+# ==========================================
+# 2. EXECUÇÃO DE COMANDOS
+# ==========================================
+
+def sql(comando):
+    """Adapta os placeholders '?' (SQLite) para '%s' (psycopg2) quando necessário."""
+    return comando.replace("?", "%s") if is_postgres() else comando
+
+@contextmanager
+def cursor_db():
+    """Fornece um cursor de uma conexão do pool, com commit/rollback automático."""
+    pool = _obter_pool()
+    conn = pool.getconn()
+    try:
+        cursor = conn.cursor()
+        yield cursor
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+def erros_integridade():
+    """Exceções de violação de chave (ex.: email duplicado) do backend ativo."""
+    if is_postgres():
+        import psycopg2
+        return (psycopg2.IntegrityError,)
+    return (sqlite3.IntegrityError,)
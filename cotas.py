@@ -0,0 +1,202 @@
+import atexit
+import logging
+import os
+import threading
+from datetime import date
+
+import conexao_db
+
+# Cota diária de simulações gratuitas ("5 simulações gratuitas por dia").
+# - A franquia diária de cada usuário é usuarios.simulacoes_restantes.
+# - O saldo do dia fica em cotas_diarias (email, dia); um novo dia começa uma
+#   nova linha, o que implementa o reset diário sem job agendado.
+# - Toda alteração no banco é um único comando condicional (compare-and-swap),
+#   sem leitura-verificação-escrita e sem lock de linha longo.
+# - Por padrão, os consumos passam por um contador local (write-behind) que
+#   valida a cota em memória e envia os decrementos em lote ao banco.
+
+INTERVALO_FLUSH_SEGUNDOS = float(os.environ.get("SIMULADOR_COTA_FLUSH_SEGUNDOS", "2.0"))
+WRITE_BEHIND_ATIVO = os.environ.get("SIMULADOR_COTA_WRITE_BEHIND", "1") != "0"
+
+logger = logging.getLogger("simulador.cotas")
+
+def _hoje():
+    return date.today().isoformat()
+
+# ==========================================
+# 1. OPERAÇÕES ATÔMICAS NO BANCO
+# ==========================================
+
+def _garantir_cota_do_dia(cursor, email, dia):
+    """Cria a linha do dia com a franquia do usuário, se ainda não existir."""
+    cursor.execute(
+        conexao_db.sql(
+            "INSERT INTO cotas_diarias (email, dia, restantes) "
+            "SELECT email, ?, simulacoes_restantes FROM usuarios WHERE email = ? "
+            "ON CONFLICT (email, dia) DO NOTHING"
+        ),
+        (dia, email)
+    )
+
+def restantes_no_banco(email, dia=None):
+    """Saldo do dia gravado no banco (já considerando o reset diário)."""
+    dia = dia or _hoje()
+    with conexao_db.cursor_db() as cursor:
+        _garantir_cota_do_dia(cursor, email, dia)
+        cursor.execute(
+            conexao_db.sql("SELECT restantes FROM cotas_diarias WHERE email = ? AND dia = ?"),
+            (email, dia)
+        )
+        linha = cursor.fetchone()
+    return linha[0] if linha else 0
+
+def consumir_no_banco(email, quantidade=1, dia=None):
+    """Decrementa atomicamente até 'quantidade' simulações. Retorna quantas foram consumidas."""
+    dia = dia or _hoje()
+    with conexao_db.cursor_db() as cursor:
+        _garantir_cota_do_dia(cursor, email, dia)
+        if quantidade == 1:
+            # Caminho comum: decremento condicional em um único comando
+            cursor.execute(
+                conexao_db.sql("UPDATE cotas_diarias SET restantes = restantes - 1 WHERE email = ? AND dia = ? AND restantes > 0"),
+                (email, dia)
+            )
+            return cursor.rowcount
+        # Lote: compare-and-swap sobre o saldo lido. O UPDATE só vale se o saldo ainda
+        # for o lido, então a quantidade consumida é exata mesmo com outra réplica
+        # gravando entre a leitura e a escrita (nesse caso, relê e tenta de novo).
+        while True:
+            cursor.execute(
+                conexao_db.sql("SELECT restantes FROM cotas_diarias WHERE email = ? AND dia = ?"),
+                (email, dia)
+            )
+            linha = cursor.fetchone()
+            if not linha or linha[0] <= 0:
+                return 0
+            consumidas = min(quantidade, linha[0])
+            cursor.execute(
+                conexao_db.sql("UPDATE cotas_diarias SET restantes = ? WHERE email = ? AND dia = ? AND restantes = ?"),
+                (linha[0] - consumidas, email, dia, linha[0])
+            )
+            if cursor.rowcount == 1:
+                return consumidas
+
+# ==========================================
+# 2. CONTADOR LOCAL (WRITE-BEHIND)
+# ==========================================
+
+class ContadorWriteBehind:
+    """Valida consumos em memória e envia os decrementos ao banco em lote.
+
+    Dentro do processo o saldo é exato (todas as operações sob um único lock).
+    Entre réplicas, o saldo local é ressincronizado a cada flush; o banco nunca
+    fica negativo, mas réplicas distintas podem conceder juntas até um intervalo
+    de flush de simulações além da cota.
+    """
+
+    def __init__(self, intervalo_flush=INTERVALO_FLUSH_SEGUNDOS):
+        self.intervalo_flush = intervalo_flush
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._saldos = {}      # (email, dia) -> saldo visto pelo processo
+        self._pendentes = {}   # (email, dia) -> decrementos ainda não enviados
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _iniciar_thread(self):
+        if self._thread is None and self.intervalo_flush > 0:
+            self._thread = threading.Thread(target=self._loop_flush, name="cotas-flush", daemon=True)
+            self._thread.start()
+
+    def _loop_flush(self):
+        while not self._parar.wait(self.intervalo_flush):
+            try:
+                self.flush()
+            except Exception:
+                # Os pendentes voltaram ao lote: a thread segue e tenta no próximo intervalo
+                logger.exception("Falha ao gravar as cotas no banco; nova tentativa em %.1f s", self.intervalo_flush)
+
+    def _saldo(self, chave):
+        """Saldo local; carrega do banco na primeira consulta do dia (fora do lock)."""
+        with self._lock:
+            if chave in self._saldos:
+                return self._saldos[chave]
+        saldo_banco = restantes_no_banco(*chave)
+        with self._lock:
+            # Outra thread pode ter carregado (e consumido) enquanto líamos o banco
+            return self._saldos.setdefault(chave, saldo_banco - self._pendentes.get(chave, 0))
+
+    def restantes(self, email):
+        return max(self._saldo((email, _hoje())), 0)
+
+    def consumir(self, email):
+        """Consome uma simulação se houver saldo. Retorna True se consumiu."""
+        chave = (email, _hoje())
+        saldo = self._saldo(chave)
+        with self._lock:
+            # A chave pode ter saído entre as duas seções (invalidar, troca de dia no flush)
+            saldo = self._saldos.setdefault(chave, saldo)
+            if saldo <= 0:
+                return False
+            self._saldos[chave] = saldo - 1
+            self._pendentes[chave] = self._pendentes.get(chave, 0) + 1
+        self._iniciar_thread()
+        return True
+
+    def flush(self):
+        """Envia os decrementos pendentes ao banco e ressincroniza os saldos locais."""
+        with self._flush_lock:
+            with self._lock:
+                lote, self._pendentes = self._pendentes, {}
+            try:
+                for chave in list(lote):
+                    email, dia = chave
+                    consumir_no_banco(email, lote[chave], dia)
+                    # Gravado: não volta ao lote mesmo se a releitura abaixo falhar
+                    del lote[chave]
+                    saldo_banco = restantes_no_banco(email, dia)
+                    with self._lock:
+                        self._saldos[chave] = saldo_banco - self._pendentes.get(chave, 0)
+            finally:
+                # Em caso de erro, devolve todo o lote não gravado para a próxima tentativa
+                with self._lock:
+                    for chave, quantidade in lote.items():
+                        self._pendentes[chave] = self._pendentes.get(chave, 0) + quantidade
+            with self._lock:
+                # Descarta saldos de dias anteriores já sincronizados
+                hoje = _hoje()
+                for chave in [c for c in self._saldos if c[1] != hoje and c not in self._pendentes]:
+                    del self._saldos[chave]
+
+    def invalidar(self, email):
+        """Força releitura do banco na próxima consulta (ex.: cota alterada externamente)."""
+        with self._lock:
+            for chave in [c for c in self._saldos if c[0] == email and c not in self._pendentes]:
+                del self._saldos[chave]
+
+    def encerrar(self):
+        self._parar.set()
+        self.flush()
+
+_contador = ContadorWriteBehind()
+atexit.register(_contador.encerrar)
+
+# ==========================================
+# 3. API DE COTAS
+# ==========================================
+
+def simulacoes_restantes(email):
+    """Saldo de simulações gratuitas do dia para o usuário."""
+    if WRITE_BEHIND_ATIVO:
+        return _contador.restantes(email)
+    return restantes_no_banco(email)
+
+def consumir_simulacao(email):
+    """Consome uma simulação gratuita do dia. Retorna False se a cota acabou."""
+    if WRITE_BEHIND_ATIVO:
+        return _contador.consumir(email)
+    return consumir_no_banco(email) == 1
+
+def flush_cotas():
+    """Grava imediatamente no banco os consumos pendentes do contador local."""
+    _contador.flush()
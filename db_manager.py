@@ -1,27 +1,49 @@
 import streamlit as st
-import hashlib
-import os
 
-# NOTA: O hash da senha deve ser feito com um algoritmo lento como bcrypt
-# (mas para evitar erros de dependência, mantemos o hashlib por enquanto).
+import autenticacao
+import conexao_db
+import cotas
+from simulador.instrumentacao import medido
+
+# Senhas: hash lento (bcrypt/scrypt) calculado no pool de autenticacao.py.
+# Hashes SHA-256 antigos são aceitos e trocados pelo formato atual no login.
+
+# Usuários de demonstração criados no primeiro uso do banco
+USUARIOS_DEMO = (
+    ("teste@exemplo.com", "123456", False, 5),
+    ("premium@exemplo.com", "premium123", True, 99999),
+)
+
+_db_inicializado = False
 
 # --- FUNÇÃO DE INICIALIZAÇÃO DE ESTADO (CRÍTICA) ---
+@medido("db.initialize_db")
 def initialize_db():
-    """Garante que o banco de dados em memória seja inicializado no Session State."""
-    if 'in_memory_db' not in st.session_state:
-        # Apenas inicializa SE a chave ainda não existir
-        st.session_state['in_memory_db'] = {
-            "teste@exemplo.com": {
-                "password_hash": hash_password("123456"),
-                "is_premium": False,
-                "simulacoes_restantes": 5
-            },
-            "premium@exemplo.com": {
-                "password_hash": hash_password("premium123"),
-                "is_premium": True,
-                "simulacoes_restantes": 99999
-            }
-        }
+    """Garante que o banco de dados (SQLite/PostgreSQL) e o Session State estejam inicializados."""
+    global _db_inicializado
+    if not _db_inicializado:
+        # Apenas uma vez por processo: cria o schema (via pool) e os usuários de demonstração.
+        # Só os que faltam têm a senha passada pelo hash lento (~0,4 s cada com bcrypt 12), fora da transação
+        with conexao_db.cursor_db() as cursor:
+            cursor.execute(
+                conexao_db.sql(f"SELECT email FROM usuarios WHERE email IN ({', '.join('?' for _ in USUARIOS_DEMO)})"),
+                tuple(email for email, _, _, _ in USUARIOS_DEMO)
+            )
+            existentes = {linha[0] for linha in cursor.fetchall()}
+        faltando = [(email, hash_password(senha), is_premium, simulacoes)
+                    for email, senha, is_premium, simulacoes in USUARIOS_DEMO if email not in existentes]
+        if faltando:
+            # ON CONFLICT: sessões simultâneas em um banco novo não colidem ao criar os mesmos usuários
+            with conexao_db.cursor_db() as cursor:
+                for usuario in faltando:
+                    cursor.execute(
+                        conexao_db.sql(
+                            "INSERT INTO usuarios (email, password_hash, is_premium, simulacoes_restantes) VALUES (?, ?, ?, ?) "
+                            "ON CONFLICT (email) DO NOTHING"
+                        ),
+                        usuario
+                    )
+        _db_inicializado = True
     
     # Inicializa o estado de autenticação, se não existir
     if 'authenticated' not in st.session_state:
@@ -32,92 +54,131 @@ def initialize_db():
         st.session_state['simulacoes_restantes'] = 0
     if 'is_premium' not in st.session_state:
         st.session_state['is_premium'] = False
+    if 'auth_token' not in st.session_state:
+        st.session_state['auth_token'] = None
 
 # --- FUNÇÕES AUXILIARES ---
 
 def hash_password(password):
-    """Cria o hash SHA256 da senha."""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Cria o hash lento da senha (algoritmo e custo em autenticacao.py)."""
+    return autenticacao.hash_senha(password)
 
 # ==========================================
-# 1. FUNÇÕES DE AUTENTICAÇÃO (100% SIMULADAS)
+# 1. FUNÇÕES DE AUTENTICAÇÃO
 # ==========================================
 
+def _buscar_usuario(email):
+    """Retorna (password_hash, is_premium, simulacoes_restantes) ou None."""
+    with conexao_db.cursor_db() as cursor:
+        cursor.execute(
+            conexao_db.sql("SELECT password_hash, is_premium, simulacoes_restantes FROM usuarios WHERE email = ?"),
+            (email,)
+        )
+        return cursor.fetchone()
+
+def _atualizar_hash(email, hash_antigo, hash_novo):
+    """Troca o hash legado (ou de custo antigo) pelo atual, se ninguém o alterou desde a leitura."""
+    with conexao_db.cursor_db() as cursor:
+        cursor.execute(
+            conexao_db.sql("UPDATE usuarios SET password_hash = ? WHERE email = ? AND password_hash = ?"),
+            (hash_novo, email, hash_antigo)
+        )
+
+@medido("db.login_user")
 def login_user(email, password):
-    """Tenta autenticar o usuário usando o DB em memória (Session State)."""
-    # Chamamos a inicialização para ter certeza que 'in_memory_db' existe
+    """Tenta autenticar o usuário no banco de dados."""
+    # Chamamos a inicialização para ter certeza que o banco existe
     # Isso pode ser feito no arquivo principal (Simulador_Investimentos.py) também,
     # mas mantemos aqui para segurança.
     initialize_db()
     
-    hashed_password = hash_password(password)
-    # Acessa o dicionário dentro do session_state
-    user_data = st.session_state['in_memory_db'].get(email) 
+    user_data = _buscar_usuario(email)
+    # Email inexistente também passa por uma verificação: o tempo de resposta não revela se a conta existe
+    password_hash = user_data[0] if user_data else autenticacao.hash_ficticio()
+    senha_correta = autenticacao.verificar_senha(password, password_hash)
     
-    if user_data and user_data['password_hash'] == hashed_password:
+    if user_data and senha_correta:
+        if autenticacao.precisa_rehash(password_hash):
+            _atualizar_hash(email, password_hash, hash_password(password))
         
         # Atualiza o estado de sessão do Streamlit após o login
+        st.session_state['auth_token'] = autenticacao.abrir_sessao(email)
         st.session_state['authenticated'] = True
         st.session_state['user_email'] = email
-        st.session_state['is_premium'] = user_data['is_premium']
-        st.session_state['simulacoes_restantes'] = user_data['simulacoes_restantes']
+        st.session_state['is_premium'] = bool(user_data[1])
+        st.session_state['simulacoes_restantes'], _ = get_simulacoes_restantes(email)
         
-        return True, "Login bem-sucedido (Simulado)!"
+        return True, "Login bem-sucedido!"
     else:
         return False, "Email ou senha incorretos."
 
+@medido("db.register_user")
 def register_user(email, password):
-    """Tenta cadastrar um novo usuário usando o DB em memória (Session State)."""
+    """Tenta cadastrar um novo usuário no banco de dados."""
     initialize_db() # Garante o DB
-    
-    # Verifica se o email já existe
-    if email in st.session_state['in_memory_db']: 
-        return False, "Este email já está cadastrado."
         
     hashed_password = hash_password(password)
     
-    # Insere o novo usuário com limite inicial de 5 simulações
-    st.session_state['in_memory_db'][email] = {
-        'password_hash': hashed_password, 
-        'is_premium': False, 
-        'simulacoes_restantes': 5
-    }
+    # Insere o novo usuário com limite inicial de 5 simulações.
+    # A chave primária em 'email' rejeita cadastros duplicados (inclusive concorrentes).
+    try:
+        with conexao_db.cursor_db() as cursor:
+            cursor.execute(
+                conexao_db.sql("INSERT INTO usuarios (email, password_hash, is_premium, simulacoes_restantes) VALUES (?, ?, ?, ?)"),
+                (email, hashed_password, False, 5)
+            )
+    except conexao_db.erros_integridade():
+        return False, "Este email já está cadastrado."
     
-    return True, "Cadastro realizado com sucesso (Simulado)!"
+    return True, "Cadastro realizado com sucesso!"
 
 # ==========================================
-# 2. FUNÇÕES DE LIMITE E PAYWALL (100% SIMULADAS)
+# 2. FUNÇÕES DE LIMITE E PAYWALL
 # ==========================================
 
+@medido("db.get_simulacoes_restantes")
 def get_simulacoes_restantes(email):
-    """Retorna o número de simulações restantes e o status Premium do DB em memória."""
+    """Retorna o número de simulações restantes no dia e o status Premium do banco de dados."""
     initialize_db()
-    user_data = st.session_state['in_memory_db'].get(email) 
+    user_data = _buscar_usuario(email)
     
     if user_data:
-        return user_data['simulacoes_restantes'], user_data['is_premium']
+        if user_data[1]:
+            return user_data[2], True # Premium: sem cota diária
+        return cotas.simulacoes_restantes(email), False
     else:
         # Retorna 0 e False se o usuário não for encontrado (segurança)
         return 0, False
 
+@medido("db.decrement_simulacoes")
 def decrement_simulacoes(email):
-    """Decrementa o contador de simulações do usuário no DB em memória."""
+    """Consome uma simulação da cota diária do usuário (decremento atômico, ver cotas.py)."""
     initialize_db()
     
-    if email in st.session_state['in_memory_db']: 
-        user_data = st.session_state['in_memory_db'][email]
+    user_data = _buscar_usuario(email)
+    if user_data is None:
+        return False
+    if user_data[1]:
+        return True # Premium não precisa decrementar
         
-        # Só decrementa se não for premium e se tiver simulações restantes
-        if not user_data['is_premium'] and user_data['simulacoes_restantes'] > 0:
-            st.session_state['in_memory_db'][email]['simulacoes_restantes'] -= 1
-            # Atualiza o contador no Session State principal do Streamlit
-            st.session_state['simulacoes_restantes'] = st.session_state['in_memory_db'][email]['simulacoes_restantes']
-            return True
-        return user_data['is_premium'] # Retorna True se for premium (não precisa decrementar)
-    return False
+    decrementou = cotas.consumir_simulacao(email)
+    # Atualiza o contador no Session State principal do Streamlit
+    st.session_state['simulacoes_restantes'] = cotas.simulacoes_restantes(email)
+    return decrementou
+
+def sessao_valida():
+    """Confere o token da sessão a cada reexecução (em memória, sem banco nem hash); expirado, faz o logout."""
+    if not st.session_state['authenticated']:
+        return False
+    if autenticacao.validar_sessao(st.session_state.get('auth_token')) != st.session_state['user_email']:
+        logout_user()
+        return False
+    return True
 
 def logout_user():
     """Faz o logout, resetando o estado de autenticação."""
+    autenticacao.encerrar_sessao(st.session_state.get('auth_token'))
+    st.session_state['auth_token'] = None
     st.session_state['authenticated'] = False
     st.session_state['user_email'] = None
     st.session_state['simulacoes_restantes'] = 0
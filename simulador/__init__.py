@@ -0,0 +1,48 @@
+"""Motor de cálculo do Simulador de Investimentos, sem dependência do Streamlit.
+
+Uso em scripts e jobs em lote:
+
+    from simulador import calcular_ativo_geral, calcular_cenarios_lote
+
+Os submódulos são carregados sob demanda (import lazy): 'import simulador' não
+importa numpy, pandas, plotly nem streamlit até que uma função seja usada.
+"""
+
+import importlib
+
+# nome público -> submódulo que o define
+_EXPORTS = {
+    "calcular_ativo_geral": "motor_calculo",
+    "calcular_poupanca": "motor_calculo",
+    "calcular_cenarios_lote": "motor_calculo",
+    "aliquota_ir_regressiva": "motor_calculo",
+    "ResultadoCompacto": "motor_calculo",
+    "calcular_carteira": "carteira",
+    "taxa_equivalente_lote": "equivalencia",
+    "prazo_equilibrio_lote": "equivalencia",
+    "valor_necessario_lote": "equivalencia",
+    "calcular_ativo_cache": "cache_simulacao",
+    "calcular_poupanca_cache": "cache_simulacao",
+    "estatisticas_cache": "cache_simulacao",
+    "CurvaJuros": "curvas_juros",
+    "curva_mensal": "curvas_juros",
+    "snapshot_atual": "dados_mercado",
+    "calendario_padrao": "calendario",
+    "simular_monte_carlo": "monte_carlo",
+    "reduzir_pontos": "reamostragem",
+    "parse_br_currency": "formatacao",
+    "format_br": "formatacao",
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(nome):
+    modulo = _EXPORTS.get(nome)
+    if modulo is None:
+        raise AttributeError(f"module 'simulador' has no attribute {nome!r}")
+    valor = getattr(importlib.import_module(f".{modulo}", __name__), nome)
+    globals()[nome] = valor
+    return valor
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
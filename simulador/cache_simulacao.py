@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+
+from .calendario import CONVENCAO_CORRIDOS, CONVENCAO_UTEIS
+from .motor_calculo import fatores_brutos, resultado_do_montante, resultado_poupanca
+
+# Cache de resultados compartilhado por todas as sessões do processo.
+# O Streamlit reexecuta o script inteiro a cada interação; benchmarks como
+# "Poupança (Benchmark)" e "CDB 100% CDI" saem idênticos para todos os usuários
+# e passam a ser servidos daqui em vez de recalculados.
+#
+# Os resultados são guardados como ResultadoCompacto (um array por cenário; o
+# DataFrame em 'df' é montado sob demanda), o que reduz a memória do processo
+# com muitas sessões. Com SIMULADOR_RESULTADO_FLOAT32=1 as curvas ficam em float32.
+#
+# Recalculo incremental: além do resultado pronto, guarda-se a curva de
+# crescimento de R$ 1 de cada rentabilidade (tipo, taxas, curva, convenção),
+# independente do prazo e do valor inicial. Ao mudar só o prazo (ex.: 360 -> 390
+# dias), a curva guardada é truncada ou estendida apenas nos dias novos e o IR é
+# reaplicado na faixa do novo prazo; o valor inicial só multiplica a curva. O
+# resultado é idêntico ao de calcular_ativo_geral. Marcar um comparativo a mais
+# calcula só ele: os demais já estão no cache de resultados.
+
+CACHE_TAMANHO_MAXIMO = 256
+CACHE_TTL_SEGUNDOS = 3600
+# Curvas de R$ 1 guardadas para o recálculo incremental (até ~146 KiB cada, em 50 anos)
+CACHE_FATORES_TAMANHO_MAXIMO = 64
+RESULTADO_FLOAT32 = os.environ.get("SIMULADOR_RESULTADO_FLOAT32", "0") == "1"
+
+# ==========================================
+# 1. CACHE LRU COM TTL
+# ==========================================
+
+class CacheLRU:
+    """Cache LRU limitado em tamanho e tempo de vida, seguro para uso entre threads."""
+
+    def __init__(self, tamanho_maximo=CACHE_TAMANHO_MAXIMO, ttl_segundos=CACHE_TTL_SEGUNDOS):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl_segundos = ttl_segundos
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obter(self, chave):
+        """Retorna o valor guardado ou None (conta hit/miss)."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                expira_em, valor = item
+                if expira_em > time.monotonic():
+                    self._itens.move_to_end(chave)
+                    self.hits += 1
+                    return valor
+                del self._itens[chave]
+            self.misses += 1
+            return None
+
+    def guardar(self, chave, valor):
+        """Guarda o valor, descartando o item menos usado se o cache estiver cheio."""
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl_segundos, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def descartar(self, condicao):
+        """Remove os itens cuja chave satisfaz 'condicao(chave)'. Retorna quantos saíram."""
+        with self._lock:
+            chaves = [chave for chave in self._itens if condicao(chave)]
+            for chave in chaves:
+                del self._itens[chave]
+            return len(chaves)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def estatisticas(self):
+        """Retorna contadores de uso do cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": self.hits / total if total else 0.0,
+                "itens": len(self._itens),
+                "tamanho_maximo": self.tamanho_maximo
+            }
+
+_cache_resultados = CacheLRU()
+_cache_fatores = CacheLRU(CACHE_FATORES_TAMANHO_MAXIMO)
+
+# ==========================================
+# 2. CURVAS DE CRESCIMENTO INCREMENTAIS
+# ==========================================
+
+def _fatores_ate(dias, tipo_rentabilidade, params, curva, convencao, data_inicio):
+    """Fatores brutos (dias 0..dias) da rentabilidade, reaproveitando o prefixo já calculado."""
+    chave = chave_cenario(1.0, 0, tipo_rentabilidade, params, False, curva, convencao, data_inicio)[2:]
+    fatores = _cache_fatores.obter(chave)
+    if fatores is not None and len(fatores) > dias:
+        # Prazo menor ou igual: trunca (view, sem cópia)
+        return fatores[:dias + 1]
+    # Prazo maior: calcula só os dias novos (a poupança usa a taxa fixa de TAXA_POUPANCA_AA)
+    inicio = 0 if fatores is None else len(fatores)
+    novos = fatores_brutos(dias, tipo_rentabilidade, params, curva, convencao, data_inicio, inicio)
+    fatores = novos if inicio == 0 else np.concatenate((fatores, novos))
+    fatores.flags.writeable = False
+    _cache_fatores.guardar(chave, fatores)
+    return fatores
+
+# ==========================================
+# 3. CHAVES NORMALIZADAS E FUNÇÕES COM CACHE
+# ==========================================
+
+def chave_cenario(valor_inicial, dias, tipo_rentabilidade, params, is_isento, curva=None,
+                  convencao=CONVENCAO_CORRIDOS, data_inicio=None):
+    """Normaliza os parâmetros do cenário em uma chave imutável (tuple)."""
+    params_normalizados = tuple(sorted((nome, float(valor)) for nome, valor in params.items()))
+    chave_curva = curva.chave if curva is not None else None
+    return (float(valor_inicial), int(dias), tipo_rentabilidade, params_normalizados, bool(is_isento), chave_curva,
+            convencao, data_inicio)
+
+def calcular_ativo_cache(valor_inicial, dias, tipo_rentabilidade, params, is_isento, curva=None,
+                         convencao=CONVENCAO_CORRIDOS, data_inicio=None):
+    """Mesmo resultado de calcular_ativo_geral, servido do cache quando possível."""
+    if convencao == CONVENCAO_UTEIS:
+        # Em DU/252 o resultado depende da data de início (fixada aqui para a chave)
+        data_inicio = data_inicio or date.today()
+    chave = chave_cenario(valor_inicial, dias, tipo_rentabilidade, params, is_isento, curva, convencao, data_inicio)
+    resultado = _cache_resultados.obter(chave)
+    if resultado is None:
+        montante = valor_inicial * _fatores_ate(dias, tipo_rentabilidade, params, curva, convencao, data_inicio)
+        resultado = resultado_do_montante(valor_inicial, dias, tipo_rentabilidade, params, is_isento, montante, curva,
+                                          convencao, data_inicio, compacto=True, float32=RESULTADO_FLOAT32)
+        _cache_resultados.guardar(chave, resultado)
+    return resultado
+
+def calcular_poupanca_cache(valor_inicial, dias):
+    """Mesmo resultado de calcular_poupanca, servido do cache quando possível."""
+    chave = chave_cenario(valor_inicial, dias, "POUPANÇA", {}, True)
+    resultado = _cache_resultados.obter(chave)
+    if resultado is None:
+        montante = valor_inicial * _fatores_ate(dias, "POUPANÇA", {}, None, CONVENCAO_CORRIDOS, None)
+        resultado = resultado_poupanca(valor_inicial, montante, compacto=True, float32=RESULTADO_FLOAT32)
+        _cache_resultados.guardar(chave, resultado)
+    return resultado
+
+def resultado_em_cache(chave, calcular):
+    """Resultado guardado sob 'chave' no cache compartilhado; se faltar, calcular() e guarda (None não é guardado).
+
+    Para resultados montados fora deste módulo (ex.: tabelas do snapshot de mercado),
+    com chaves que não colidem com as de chave_cenario.
+    """
+    resultado = _cache_resultados.obter(chave)
+    if resultado is None:
+        resultado = calcular()
+        if resultado is not None:
+            _cache_resultados.guardar(chave, resultado)
+    return resultado
+
+def descartar_do_cache(condicao):
+    """Remove do cache de resultados as chaves que satisfazem 'condicao(chave)' (ex.: de um snapshot substituído)."""
+    return _cache_resultados.descartar(condicao)
+
+def estatisticas_cache():
+    """Contadores de hit/miss do cache de resultados do processo."""
+    return _cache_resultados.estatisticas()
+
+def limpar_cache():
+    _cache_resultados.limpar()
+    _cache_fatores.limpar()
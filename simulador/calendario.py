@@ -0,0 +1,81 @@
+import os
+import threading
+from datetime import date
+
+import numpy as np
+
+# Calendário de dias úteis (feriados nacionais ANBIMA) para a convenção DU/252.
+# O índice é montado uma única vez por processo: um array com a contagem
+# acumulada de dias úteis desde DATA_BASE, de modo que a quantidade de dias
+# úteis entre duas datas é uma subtração O(1).
+
+CONVENCAO_CORRIDOS = "DC365"   # dias corridos, base 365 (padrão do simulador)
+CONVENCAO_UTEIS = "DU252"      # dias úteis, base 252 (CDI, Tesouro)
+BASE_ANUAL = {CONVENCAO_CORRIDOS: 365.0, CONVENCAO_UTEIS: 252.0}
+
+CAMINHO_FERIADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "feriados_anbima.csv")
+
+def carregar_feriados(caminho=CAMINHO_FERIADOS):
+    """Lê a lista de feriados (coluna 'data', formato AAAA-MM-DD) empacotada com o simulador."""
+    with open(caminho, encoding="utf-8") as arquivo:
+        next(arquivo)  # cabeçalho
+        return np.array([linha.split(",", 1)[0] for linha in arquivo if linha.strip()], dtype="datetime64[D]")
+
+class CalendarioDiasUteis:
+    """Índice de dias úteis (contagem acumulada) para consultas O(1)."""
+
+    def __init__(self, feriados):
+        feriados = np.asarray(feriados, dtype="datetime64[D]")
+        self.data_base = feriados.min().astype("datetime64[Y]").astype("datetime64[D]")
+        self.data_limite = (feriados.max().astype("datetime64[Y]") + 1).astype("datetime64[D]") - 1
+        dias = np.arange(self.data_base, self.data_limite + 1)
+        uteis = np.is_busday(dias, holidays=feriados)
+        # acumulado[i] = dias úteis em (data_base, data_base + i]
+        self._acumulado = np.concatenate(([0], np.cumsum(uteis[1:], dtype=np.int32)))
+        self._uteis = uteis
+
+    def _indice(self, data):
+        indice = (np.asarray(data, dtype="datetime64[D]") - self.data_base).astype(np.int64)
+        if np.any(indice < 0) or np.any(indice >= len(self._acumulado)):
+            raise ValueError(f"Data fora do calendário de feriados ({self.data_base} a {self.data_limite}).")
+        return indice
+
+    def eh_dia_util(self, data):
+        return bool(self._uteis[self._indice(data)])
+
+    def dias_uteis_entre(self, inicio, fim):
+        """Dias úteis em (inicio, fim], como na contagem de DU de CDI/Tesouro."""
+        return int(self._acumulado[self._indice(fim)] - self._acumulado[self._indice(inicio)])
+
+    def dias_uteis_acumulados(self, data_inicio, dias):
+        """Array com os dias úteis decorridos entre data_inicio e cada dia corrido 0..dias."""
+        indice = int(self._indice(data_inicio))
+        self._indice(np.datetime64(data_inicio, "D") + dias)  # valida o fim do prazo
+        return self._acumulado[indice:indice + dias + 1] - self._acumulado[indice]
+
+    def dias_uteis_por_prazo(self, datas_inicio, dias):
+        """Versão vetorizada: dias úteis de cada (data_inicio, prazo em dias corridos)."""
+        indice = self._indice(datas_inicio)
+        fim = indice + np.asarray(dias, dtype=np.int64)
+        if np.any(fim >= len(self._acumulado)):
+            raise ValueError(f"Prazo ultrapassa o calendário de feriados (até {self.data_limite}).")
+        return self._acumulado[fim] - self._acumulado[indice]
+
+_calendario = None
+_calendario_lock = threading.Lock()
+
+def calendario_padrao():
+    """Calendário ANBIMA do processo (montado na primeira utilização)."""
+    global _calendario
+    if _calendario is None:
+        with _calendario_lock:
+            if _calendario is None:
+                _calendario = CalendarioDiasUteis(carregar_feriados())
+    return _calendario
+
+def expoentes_prazo(dias, convencao=CONVENCAO_CORRIDOS, data_inicio=None):
+    """Expoente (em anos) de cada dia corrido 0..dias na convenção informada."""
+    if convencao == CONVENCAO_UTEIS:
+        data_inicio = data_inicio or date.today()
+        return calendario_padrao().dias_uteis_acumulados(data_inicio, dias) / BASE_ANUAL[CONVENCAO_UTEIS]
+    return np.arange(dias + 1) / BASE_ANUAL[CONVENCAO_CORRIDOS]
@@ -0,0 +1,199 @@
+import numpy as np
+
+from .calendario import CONVENCAO_CORRIDOS
+from .curvas_juros import DIAS_POR_MES
+from .motor_calculo import FAIXAS_IR, ALIQUOTA_IR_MINIMA, aliquota_ir_regressiva, calcular_ativo_geral, calcular_poupanca
+
+# Carteira com várias posições e aportes mensais.
+#
+# Cada aporte é um lote separado, com prazo próprio e, portanto, alíquota própria
+# na tabela regressiva de IR. Lotes de posições com a mesma rentabilidade
+# compartilham o mesmo fator acumulado F (dias 0..N): o bruto de um lote
+# aplicado no dia s vale v * F[t] / F[s] no dia t. Assim a soma dos lotes é
+#
+#     F[t] * soma(v / F[s]) - soma(v)       (rendimento bruto)
+#
+# e, com somas acumuladas por dia de aplicação, o rendimento dos lotes de cada
+# faixa de IR (idade entre dois limites) sai por diferença de prefixos. A curva
+# da carteira custa O(dias x faixas) por grupo de rentabilidade, sem laço por
+# lote nem por dia.
+
+# Faixas de idade (dias corridos) da tabela regressiva: (idade mínima, idade máxima, alíquota %)
+_FAIXAS_IDADE = tuple(
+    (anterior + 1 if anterior else 0, limite, aliquota)
+    for anterior, (limite, aliquota) in zip((0,) + tuple(limite for limite, _ in FAIXAS_IR), FAIXAS_IR)
+) + ((FAIXAS_IR[-1][0] + 1, None, ALIQUOTA_IR_MINIMA),)
+
+# ==========================================
+# 1. LOTES
+# ==========================================
+
+def dias_aportes(dias, intervalo_meses=1):
+    """Dias dos aportes periódicos (mês 1, 2, ...) anteriores ao fim do prazo."""
+    meses = np.arange(intervalo_meses, int(dias / DIAS_POR_MES) + 1, intervalo_meses)
+    dias_aporte = np.round(meses * DIAS_POR_MES).astype(np.int64)
+    return dias_aporte[dias_aporte < dias]
+
+def gerar_lotes(posicoes, dias, intervalo_meses=1):
+    """Lotes (posicao, dia_aporte, valor) das posições: o valor inicial no dia 0 e os aportes mensais.
+
+    Cada posição é um dicionário com 'valor_inicial' e, opcionalmente, 'aporte_mensal'.
+    """
+    agenda = dias_aportes(dias, intervalo_meses)
+    posicao, dia, valor = [], [], []
+    for indice, pos in enumerate(posicoes):
+        if pos.get('valor_inicial', 0.0):
+            posicao.append(np.array([indice]))
+            dia.append(np.array([0]))
+            valor.append(np.array([float(pos['valor_inicial'])]))
+        if pos.get('aporte_mensal', 0.0) and len(agenda):
+            posicao.append(np.full(len(agenda), indice))
+            dia.append(agenda)
+            valor.append(np.full(len(agenda), float(pos['aporte_mensal'])))
+    if not posicao:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    return np.concatenate(posicao), np.concatenate(dia).astype(np.int64), np.concatenate(valor)
+
+# ==========================================
+# 2. FATORES POR GRUPO DE RENTABILIDADE
+# ==========================================
+
+def _chave_rentabilidade(pos):
+    curva = pos.get('curva')
+    return (
+        pos['tipo'],
+        tuple(sorted(pos.get('params', {}).items())),
+        bool(pos.get('isento', False)) or pos['tipo'] == "POUPANÇA",
+        curva.chave if curva is not None else None,
+    )
+
+def _fatores_grupo(pos, dias, convencao, data_inicio):
+    """Fator acumulado (dias 0..N) e taxa nominal % de uma rentabilidade, pelo motor de ativo único."""
+    if pos['tipo'] == "POUPANÇA":
+        resultado = calcular_poupanca(1.0, dias, compacto=True)
+    else:
+        resultado = calcular_ativo_geral(1.0, dias, pos['tipo'], pos.get('params', {}), pos.get('isento', False),
+                                         pos.get('curva'), convencao, data_inicio, compacto=True)
+    return resultado.montante, resultado['taxa_nominal_aa']
+
+def _curvas_grupo(fatores, dia_lote, valor_lote, dias, is_isento):
+    """Curvas diárias (bruto, IR) da soma dos lotes de um grupo, por somas de prefixo."""
+    # Prefixos por dia de aplicação: P[k] = soma(v / F[s]) e V[k] = soma(v) para s < k
+    peso = np.bincount(dia_lote, weights=valor_lote / fatores[dia_lote], minlength=dias + 1)
+    aplicado = np.bincount(dia_lote, weights=valor_lote, minlength=dias + 1)
+    prefixo_peso = np.concatenate(([0.0], np.cumsum(peso)))
+    prefixo_aplicado = np.concatenate(([0.0], np.cumsum(aplicado)))
+
+    t = np.arange(dias + 1)
+    bruto = fatores * prefixo_peso[t + 1]
+    ir = np.zeros(dias + 1)
+    if not is_isento:
+        for idade_min, idade_max, aliquota in _FAIXAS_IDADE:
+            # Lotes com idade em [idade_min, idade_max] no dia t: aplicados em [t - idade_max, t - idade_min]
+            fim = np.clip(t - idade_min + 1, 0, dias + 1)
+            inicio = np.zeros(dias + 1, dtype=np.int64) if idade_max is None else np.clip(t - idade_max, 0, dias + 1)
+            inicio = np.minimum(inicio, fim)
+            rendimento = (fatores * (prefixo_peso[fim] - prefixo_peso[inicio])
+                          - (prefixo_aplicado[fim] - prefixo_aplicado[inicio]))
+            ir += rendimento * (aliquota / 100.0)
+    return bruto, prefixo_aplicado[t + 1], ir
+
+# ==========================================
+# 3. CARTEIRA
+# ==========================================
+
+def _df_carteira(aplicado, bruto, ir):
+    import pandas as pd
+    return pd.DataFrame({
+        "Dia": np.arange(len(bruto)),
+        "Total Aplicado": aplicado,
+        "Montante Bruto": bruto,
+        "Rendimento Bruto": bruto - aplicado,
+        "Montante Líquido": bruto - ir
+    })
+
+def _df_lotes(posicoes, posicao, dia_lote, valor_lote, bruto_lote, aliquota_lote, ir_lote):
+    import pandas as pd
+    nomes = np.array([pos.get('nome', f"Posição {indice + 1}") for indice, pos in enumerate(posicoes)], dtype=object)
+    return pd.DataFrame({
+        "posicao": nomes[posicao] if len(posicao) else np.zeros(0, dtype=object),
+        "dia_aporte": dia_lote,
+        "valor": valor_lote,
+        "montante_bruto": bruto_lote,
+        "aliquota": aliquota_lote,
+        "ir_devido": ir_lote,
+        "montante_liquido": bruto_lote - ir_lote
+    })
+
+def calcular_carteira(posicoes, dias, intervalo_meses=1, lotes=None, convencao=CONVENCAO_CORRIDOS, data_inicio=None):
+    """Simula uma carteira de várias posições com aportes, cada aporte tributado como lote próprio.
+
+    'posicoes' é uma lista de dicionários com 'tipo', 'params' e 'isento' (como em
+    calcular_ativo_geral), 'valor_inicial', 'aporte_mensal' e, opcionalmente,
+    'nome' e 'curva' (CurvaJuros da referência de PÓS/IPCA).
+    'lotes' (opcional) substitui a geração automática: tupla de arrays
+    (índice da posição, dia do aporte, valor).
+
+    Retorna as mesmas chaves de calcular_ativo_geral — 'df' com a curva diária
+    agregada (Dia, Total Aplicado, Montante Bruto, Rendimento Bruto, Montante
+    Líquido), montante/rendimento líquido, rendimento bruto, IR devido, alíquota
+    efetiva e taxa nominal média ponderada — mais 'valor_inicial' (total
+    aplicado) e 'lotes' (DataFrame com o resultado de cada lote).
+    """
+    if lotes is None:
+        lotes = gerar_lotes(posicoes, dias, intervalo_meses)
+    posicao, dia_lote, valor_lote = (np.asarray(coluna) for coluna in lotes)
+    posicao = posicao.astype(np.int64)
+    dia_lote = dia_lote.astype(np.int64)
+    valor_lote = valor_lote.astype(float)
+    if len(dia_lote) and (dia_lote.min() < 0 or dia_lote.max() > dias):
+        raise ValueError("Os aportes devem ocorrer entre o dia 0 e o fim do prazo.")
+
+    # Posições com a mesma rentabilidade formam um único grupo (um só fator acumulado)
+    grupos = {}
+    grupo_posicao = np.array([grupos.setdefault(_chave_rentabilidade(pos), len(grupos)) for pos in posicoes], dtype=np.int64)
+    representantes = {}
+    for indice, grupo in enumerate(grupo_posicao):
+        representantes.setdefault(grupo, posicoes[indice])
+    grupo_lote = grupo_posicao[posicao] if len(posicao) else np.zeros(0, dtype=np.int64)
+
+    bruto = np.zeros(dias + 1)
+    aplicado = np.zeros(dias + 1)
+    ir = np.zeros(dias + 1)
+    bruto_lote = np.zeros(len(valor_lote))
+    taxa_ponderada = 0.0
+    for grupo, pos in representantes.items():
+        no_grupo = grupo_lote == grupo
+        if not no_grupo.any():
+            continue
+        is_isento = _chave_rentabilidade(pos)[2]
+        fatores, taxa_nominal = _fatores_grupo(pos, dias, convencao, data_inicio)
+        fatores = np.asarray(fatores, dtype=float)
+        bruto_grupo, aplicado_grupo, ir_grupo = _curvas_grupo(fatores, dia_lote[no_grupo], valor_lote[no_grupo], dias, is_isento)
+        bruto += bruto_grupo
+        aplicado += aplicado_grupo
+        ir += ir_grupo
+        bruto_lote[no_grupo] = valor_lote[no_grupo] * fatores[dias] / fatores[dia_lote[no_grupo]]
+        taxa_ponderada += taxa_nominal * valor_lote[no_grupo].sum()
+
+    # Resultado final de cada lote: alíquota pela idade do lote no fim do prazo
+    isento_lote = np.array([_chave_rentabilidade(pos)[2] for pos in posicoes], dtype=bool)[posicao] if len(posicao) else np.zeros(0, dtype=bool)
+    aliquota_lote = np.atleast_1d(aliquota_ir_regressiva(dias - dia_lote, isento_lote)).astype(float)
+    ir_lote = (bruto_lote - valor_lote) * (aliquota_lote / 100.0)
+
+    total_aplicado = float(valor_lote.sum())
+    rendimento_bruto = float(bruto_lote.sum()) - total_aplicado
+    ir_devido = float(ir_lote.sum())
+    rendimento_liquido = rendimento_bruto - ir_devido
+    return {
+        "df": _df_carteira(aplicado, bruto, ir),
+        "lotes": _df_lotes(posicoes, posicao, dia_lote, valor_lote, bruto_lote, aliquota_lote, ir_lote),
+        "valor_inicial": total_aplicado,
+        "montante_liquido": total_aplicado + rendimento_liquido,
+        "rendimento_liquido": rendimento_liquido,
+        "rendimento_bruto": rendimento_bruto,
+        "ir_devido": ir_devido,
+        # Alíquota efetiva da carteira (lotes em faixas diferentes)
+        "aliquota": round(ir_devido / rendimento_bruto * 100, 2) if rendimento_bruto > 0 and ir_devido else 0.0,
+        "taxa_nominal_aa": taxa_ponderada / total_aplicado if total_aplicado else 0.0
+    }
@@ -0,0 +1,176 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .motor_calculo import calcular_cenarios_lote
+
+# Execução em lote, sem a interface web:
+#
+#   python -m simulador cenarios.csv resultados.csv --linhas-por-bloco 100000 --processos 4
+#
+# A entrada (CSV ou Parquet) é lida em blocos; cada bloco passa por
+# calcular_cenarios_lote e é gravado na saída assim que fica pronto, então a
+# memória não cresce com o tamanho do arquivo. Com --processos > 1, os blocos
+# são distribuídos entre processos, mantendo a ordem original na saída.
+
+LINHAS_POR_BLOCO_PADRAO = 100_000
+COLUNAS_RESULTADO = ("montante_liquido", "rendimento_liquido", "rendimento_bruto", "ir_devido", "aliquota", "taxa_nominal_aa")
+# Tipos fixos das colunas de entrada do CSV: sem eles, o pandas infere cada bloco à parte
+# (ex.: isento "sim" em um bloco e vazio no outro) e o esquema do Parquet de saída muda
+TIPOS_ENTRADA_CSV = {
+    "valor_inicial": "float64", "dias": "Int64", "tipo": "string", "isento": "string",
+    "taxa_fixa": "float64", "taxa_ref": "float64", "percentual": "float64", "ipca_proj": "float64",
+    "convencao": "string", "data_inicio": "string",
+}
+
+def _formato(caminho, formato=None):
+    if formato:
+        return formato
+    return "parquet" if caminho.lower().endswith((".parquet", ".pq")) else "csv"
+
+def _importar_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        sys.exit("Arquivos Parquet exigem o pacote 'pyarrow' (pip install pyarrow).")
+    return pyarrow
+
+# ==========================================
+# 1. LEITURA E ESCRITA EM BLOCOS
+# ==========================================
+
+def ler_blocos(caminho, linhas_por_bloco, formato=None):
+    """Gera DataFrames de até 'linhas_por_bloco' linhas a partir de um CSV ou Parquet."""
+    import pandas as pd
+    if _formato(caminho, formato) == "parquet":
+        pyarrow = _importar_pyarrow()
+        arquivo = pyarrow.parquet.ParquetFile(caminho)
+        for lote in arquivo.iter_batches(batch_size=linhas_por_bloco):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(caminho, chunksize=linhas_por_bloco, dtype=TIPOS_ENTRADA_CSV)
+
+class EscritorResultados:
+    """Grava os blocos de resultado de forma incremental (CSV com cabeçalho único ou Parquet)."""
+
+    def __init__(self, caminho, formato=None):
+        self.caminho = caminho
+        self.formato = _formato(caminho, formato)
+        self._parquet = None
+        self._primeiro_bloco = True
+
+    def gravar(self, bloco):
+        """Grava um bloco: DataFrame (Parquet) ou texto CSV já serializado por serializar_bloco."""
+        if self.formato == "parquet":
+            pyarrow = _importar_pyarrow()
+            tabela = pyarrow.Table.from_pandas(bloco, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pyarrow.parquet.ParquetWriter(self.caminho, tabela.schema)
+            elif not tabela.schema.equals(self._parquet.schema):
+                # Colunas extras da entrada ainda podem variar de tipo entre blocos: vale o do primeiro
+                tabela = tabela.cast(self._parquet.schema)
+            self._parquet.write_table(tabela)
+        else:
+            with open(self.caminho, "w" if self._primeiro_bloco else "a", encoding="utf-8", newline="") as arquivo:
+                arquivo.write(bloco)
+        self._primeiro_bloco = False
+
+    def fechar(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+# ==========================================
+# 2. PROCESSAMENTO
+# ==========================================
+
+def processar_bloco(bloco):
+    """Calcula um bloco de cenários e devolve as colunas de entrada + resultados."""
+    resultado = calcular_cenarios_lote(bloco)
+    saida = bloco.copy()
+    for coluna in COLUNAS_RESULTADO:
+        saida[coluna] = resultado[coluna].to_numpy()
+    return saida
+
+def serializar_bloco(bloco, formato, com_cabecalho, primeira_linha=1):
+    """Calcula o bloco e já o converte para o formato de saída.
+
+    A conversão para CSV (formatação dos floats) custa mais que o cálculo; feita
+    aqui, ela também é distribuída entre os processos. Um erro nos dados vira um
+    ValueError com as linhas do bloco ('primeira_linha' é a 1ª linha de dados do bloco).
+    """
+    try:
+        resultado = processar_bloco(bloco)
+    except ValueError as e:
+        raise ValueError(f"{e} (linhas {primeira_linha} a {primeira_linha + len(bloco) - 1} da entrada)") from e
+    if formato == "parquet":
+        return len(resultado), resultado
+    return len(resultado), resultado.to_csv(index=False, header=com_cabecalho)
+
+def executar_lote(entrada, saida, linhas_por_bloco=LINHAS_POR_BLOCO_PADRAO, processos=1,
+                  formato_entrada=None, formato_saida=None):
+    """Processa o arquivo de cenários inteiro. Retorna o número de linhas gravadas."""
+    escritor = EscritorResultados(saida, formato_saida)
+    blocos = ler_blocos(entrada, linhas_por_bloco, formato_entrada)
+    total = 0
+    try:
+        if processos <= 1:
+            for indice, bloco in enumerate(blocos):
+                linhas, serializado = serializar_bloco(bloco, escritor.formato, indice == 0, total + 1)
+                escritor.gravar(serializado)
+                total += linhas
+        else:
+            # Janela limitada de blocos em andamento: a memória fica em ~2x processos blocos
+            with ProcessPoolExecutor(max_workers=processos) as executor:
+                pendentes = deque()
+                lidas = 0
+                for indice, bloco in enumerate(blocos):
+                    pendentes.append(executor.submit(serializar_bloco, bloco, escritor.formato, indice == 0, lidas + 1))
+                    lidas += len(bloco)
+                    if len(pendentes) >= 2 * processos:
+                        linhas, serializado = pendentes.popleft().result()
+                        escritor.gravar(serializado)
+                        total += linhas
+                while pendentes:
+                    linhas, serializado = pendentes.popleft().result()
+                    escritor.gravar(serializado)
+                    total += linhas
+    finally:
+        escritor.fechar()
+    return total
+
+# ==========================================
+# 3. LINHA DE COMANDO
+# ==========================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m simulador",
+        description="Calcula em lote cenários de renda fixa (montante líquido, IR, alíquota, taxa nominal)."
+    )
+    parser.add_argument("entrada", help="CSV ou Parquet com as colunas valor_inicial, dias, tipo, isento, "
+                                        "taxa_fixa, taxa_ref, percentual, ipca_proj (e opcionalmente convencao, data_inicio)")
+    parser.add_argument("saida", help="arquivo de resultados (.csv ou .parquet)")
+    parser.add_argument("--linhas-por-bloco", type=int, default=LINHAS_POR_BLOCO_PADRAO,
+                        help=f"linhas lidas por vez (padrão: {LINHAS_POR_BLOCO_PADRAO})")
+    parser.add_argument("--processos", type=int, default=1,
+                        help="processos em paralelo (0 = todos os núcleos; padrão: 1)")
+    parser.add_argument("--formato-entrada", choices=("csv", "parquet"), help="força o formato da entrada")
+    parser.add_argument("--formato-saida", choices=("csv", "parquet"), help="força o formato da saída")
+    args = parser.parse_args(argv)
+
+    processos = args.processos or os.cpu_count() or 1
+    inicio = time.perf_counter()
+    try:
+        total = executar_lote(args.entrada, args.saida, args.linhas_por_bloco, processos,
+                              args.formato_entrada, args.formato_saida)
+    except ValueError as e:
+        # Dados inválidos (ex.: tipo fora de PRÉ/PÓS/IPCA/POUPANÇA): mensagem e código de saída 1, sem traceback
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    segundos = time.perf_counter() - inicio
+    print(f"{total} cenários processados em {segundos:.2f}s ({total / max(segundos, 1e-9):,.0f} cenários/s) -> {args.saida}")
+    return 0
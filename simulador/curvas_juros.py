@@ -0,0 +1,112 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+
+# Curvas de juros projetadas (estrutura a termo) para CDI/Selic e IPCA.
+# Uma curva é definida por vértices (dia inicial, taxa anual %) e vale por partes:
+# cada taxa vigora do seu dia inicial até o próximo vértice.
+#
+# Os fatores acumulados são pré-calculados (soma acumulada dos logs diários)
+# para todo o horizonte, de modo que o fator de qualquer dia é um acesso O(1)
+# ao array. Cada transformação da referência (ex.: 110% do CDI, IPCA + 6%)
+# é calculada uma única vez e reaproveitada por todos os ativos e benchmarks.
+
+HORIZONTE_PADRAO_DIAS = 365 * 50
+# Curvas reaproveitadas entre sessões (LRU). Cada uma guarda ~146 KiB de fatores por
+# transformação usada; as menos usadas (edições antigas da tabela, snapshots
+# substituídos) saem do registro e são liberadas quando ninguém mais as referencia.
+CURVAS_TAMANHO_MAXIMO = int(os.environ.get("SIMULADOR_CURVAS_TAMANHO_MAXIMO", "32"))
+# Transformações (multiplicador, adicional) guardadas por curva (LRU): uma curva que vive
+# com o processo (ex.: a do snapshot de mercado) não acumula um array por % do CDI digitado
+FATORES_POR_CURVA_MAXIMO = int(os.environ.get("SIMULADOR_FATORES_POR_CURVA_MAXIMO", "8"))
+DIAS_POR_MES = 365 / 12.0
+
+class CurvaJuros:
+    """Curva de taxas anuais por partes com fatores acumulados pré-calculados."""
+
+    def __init__(self, vertices, horizonte_dias=HORIZONTE_PADRAO_DIAS):
+        # Dias negativos (ex.: reuniões já ocorridas) valem desde o dia 0; no mesmo dia, vale o último
+        vertices = sorted(dict((max(int(dia), 0), float(taxa)) for dia, taxa in vertices).items())
+        if not vertices:
+            raise ValueError("A curva de juros precisa de pelo menos um vértice.")
+        # O primeiro vértice sempre começa no dia 0
+        vertices[0] = (0, vertices[0][1])
+        self.vertices = tuple(vertices)
+        self.chave = self.vertices
+        self.horizonte_dias = horizonte_dias
+        self._fatores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def taxas_diarias(self, dias):
+        """Taxa anual (decimal) vigente em cada dia 1..dias."""
+        inicios = np.array([dia for dia, _ in self.vertices])
+        taxas = np.array([taxa for _, taxa in self.vertices]) / 100.0
+        # A taxa do dia d é a do último vértice com início < d
+        indice = np.searchsorted(inicios, np.arange(dias), side="right") - 1
+        return taxas[indice]
+
+    def fatores_acumulados(self, multiplicador=1.0, adicional=0.0, dias=None):
+        """Fatores acumulados (dias 0..N) da taxa multiplicador * referência + adicional.
+
+        O array retornado é compartilhado (somente leitura); cobre pelo menos 'dias'.
+        """
+        dias = self.horizonte_dias if dias is None else dias
+        chave = (float(multiplicador), float(adicional))
+        with self._lock:
+            fatores = self._fatores.get(chave)
+            if fatores is not None and len(fatores) > dias:
+                self._fatores.move_to_end(chave)
+                return fatores
+        # Calculado fora do lock; se duas threads calcularem a mesma chave, os arrays são iguais
+        horizonte = max(dias, self.horizonte_dias)
+        taxa_nominal = np.maximum(multiplicador * self.taxas_diarias(horizonte) + adicional, 0.0)
+        log_acumulado = np.concatenate(([0.0], np.cumsum(np.log1p(taxa_nominal) / 365.0)))
+        fatores = np.exp(log_acumulado)
+        fatores.flags.writeable = False
+        with self._lock:
+            self._fatores[chave] = fatores
+            self._fatores.move_to_end(chave)
+            while len(self._fatores) > FATORES_POR_CURVA_MAXIMO:
+                self._fatores.popitem(last=False)
+        return fatores
+
+    def fator(self, dia, multiplicador=1.0, adicional=0.0):
+        """Fator acumulado do dia 0 até 'dia' (O(1) após o pré-cálculo)."""
+        return self.fatores_acumulados(multiplicador, adicional, dia)[dia]
+
+    def taxa_equivalente_aa(self, dias, multiplicador=1.0, adicional=0.0):
+        """Taxa anual constante que produziria o mesmo fator acumulado no prazo."""
+        if dias <= 0:
+            return multiplicador * self.vertices[0][1] / 100.0 + adicional
+        return self.fator(dias, multiplicador, adicional)**(365.0 / dias) - 1
+
+# ==========================================
+# CONSTRUÇÃO DE CURVAS
+# ==========================================
+
+_curvas = OrderedDict()
+_curvas_lock = threading.Lock()
+
+def obter_curva(vertices):
+    """Retorna a curva para os vértices, reaproveitando a instância (e seus fatores) já criada."""
+    nova = CurvaJuros(vertices)
+    with _curvas_lock:
+        curva = _curvas.setdefault(nova.chave, nova)
+        _curvas.move_to_end(nova.chave)
+        while len(_curvas) > CURVAS_TAMANHO_MAXIMO:
+            _curvas.popitem(last=False)
+    return curva
+
+def curva_mensal(taxas_por_mes):
+    """Curva a partir de pares (mês inicial, taxa anual %), ex.: [(0, 13.65), (6, 12.0)]."""
+    return obter_curva((round(mes * DIAS_POR_MES), taxa) for mes, taxa in taxas_por_mes)
+
+def curva_por_reunioes(data_base, reunioes):
+    """Curva a partir de pares (data da reunião do COPOM, nova taxa %) e da taxa vigente.
+
+    'reunioes' deve incluir a taxa vigente na data_base como primeiro item.
+    """
+    return obter_curva(((data - data_base).days if isinstance(data, date) else int(data), taxa) for data, taxa in reunioes)
@@ -0,0 +1,220 @@
+import csv
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+
+import numpy as np
+
+from .cache_simulacao import RESULTADO_FLOAT32, descartar_do_cache, resultado_em_cache
+from .calendario import CONVENCAO_CORRIDOS, CONVENCAO_UTEIS, calendario_padrao
+from .curvas_juros import HORIZONTE_PADRAO_DIAS, curva_mensal
+from .motor_calculo import fatores_brutos, resultado_do_montante, resultado_poupanca
+
+# Projeções de mercado compartilhadas pelo servidor, lidas de um snapshot local
+# (ex.: Focus/ANBIMA do dia exportado em CSV; nada é baixado da rede):
+#
+#   data_referencia,indicador,mes_inicial,taxa_aa
+#   2026-10-16,CDI,0,13.65
+#   2026-10-16,CDI,6,12.75
+#   2026-10-16,IPCA,0,5.00
+#   2026-10-16,PRE,0,12.00
+#
+# CDI e IPCA viram curvas por mês (curva_mensal); PRE é a taxa do Tesouro Pré.
+# Para cada snapshot, os fatores acumulados dos comparativos padrão (Poupança,
+# 100% do CDI e Tesouro Pré) são calculados uma única vez para todo o horizonte,
+# gravados em um .npy e abertos com memory-map: os processos do servidor
+# compartilham as mesmas páginas e o fator de qualquer prazo é um acesso O(1).
+# Os fatores vêm de fatores_brutos, então os resultados são idênticos aos de
+# calcular_ativo_cache com a mesma curva.
+#
+# Recarga a quente: snapshot_atual() confere a data de modificação do arquivo
+# (no máximo a cada SIMULADOR_DADOS_MERCADO_VERIFICAR_SEGUNDOS) e troca o
+# snapshot quando ele muda, sem reiniciar o servidor. Um arquivo inválido (ex.:
+# ainda sendo copiado) é ignorado e o snapshot anterior continua valendo.
+
+CAMINHO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "projecoes_mercado.csv")
+# Vazio desliga o snapshot (cada sessão usa só as taxas digitadas)
+CAMINHO_SNAPSHOT = os.environ.get("SIMULADOR_DADOS_MERCADO", CAMINHO_PADRAO)
+DIRETORIO_TABELAS = os.environ.get(
+    "SIMULADOR_DADOS_MERCADO_TABELAS", os.path.join(tempfile.gettempdir(), "simulador_tabelas_mercado")
+)
+INTERVALO_VERIFICACAO_SEGUNDOS = float(os.environ.get("SIMULADOR_DADOS_MERCADO_VERIFICAR_SEGUNDOS", "5"))
+# Muda quando o layout do .npy muda (invalida as tabelas já gravadas)
+VERSAO_TABELAS = 1
+
+BENCHMARK_POUPANCA = "poupanca"
+BENCHMARK_CDI = "cdi_100"
+BENCHMARK_PRE = "tesouro_pre"
+
+INDICADORES = ("CDI", "IPCA", "PRE")
+
+logger = logging.getLogger("simulador.dados_mercado")
+
+# ==========================================
+# 1. SNAPSHOT E TABELAS DE FATORES
+# ==========================================
+
+def ler_snapshot(caminho):
+    """Lê o CSV do snapshot: (data de referência, {indicador: [(mês inicial, taxa % a.a.)]})."""
+    vertices = {indicador: [] for indicador in INDICADORES}
+    datas = set()
+    with open(caminho, encoding="utf-8", newline="") as arquivo:
+        for linha in csv.DictReader(arquivo):
+            indicador = linha["indicador"].strip().upper()
+            if indicador not in vertices:
+                raise ValueError(f"Indicador desconhecido no snapshot de mercado: {indicador}")
+            datas.add(date.fromisoformat(linha["data_referencia"].strip()))
+            vertices[indicador].append((int(linha["mes_inicial"]), float(linha["taxa_aa"])))
+    if len(datas) != 1:
+        raise ValueError("O snapshot de mercado deve ter uma única data_referencia.")
+    faltando = [indicador for indicador, lista in vertices.items() if not lista]
+    if faltando:
+        raise ValueError(f"Snapshot de mercado sem os indicadores: {', '.join(faltando)}")
+    return datas.pop(), vertices
+
+class SnapshotMercado:
+    """Projeções de um snapshot e os fatores acumulados dos comparativos padrão (memory-mapped)."""
+
+    def __init__(self, data_referencia, vertices, versao, diretorio_tabelas=DIRETORIO_TABELAS):
+        self.data_referencia = data_referencia
+        self.versao = versao
+        self.curva_cdi = curva_mensal(vertices["CDI"])
+        self.curva_ipca = curva_mensal(vertices["IPCA"])
+        self.taxa_cdi_aa = self.curva_cdi.vertices[0][1]
+        self.taxa_ipca_aa = self.curva_ipca.vertices[0][1]
+        self.taxa_pre_aa = min(vertices["PRE"])[1]
+        # DU/252 usa o calendário a partir da data de referência: o horizonte não passa do calendário
+        limite_calendario = (calendario_padrao().data_limite.astype(object) - data_referencia).days
+        self.horizonte_dias = min(HORIZONTE_PADRAO_DIAS, limite_calendario)
+
+        self.especificacoes = {
+            BENCHMARK_POUPANCA: ("POUPANÇA", {}, True, None),
+            BENCHMARK_CDI: ("PÓS", {'taxa_ref': self.taxa_cdi_aa, 'percentual': 100}, False, self.curva_cdi),
+            BENCHMARK_PRE: ("PRÉ", {'taxa_fixa': self.taxa_pre_aa}, False, None),
+        }
+        # Poupança rende por dias corridos em qualquer convenção
+        self._linhas = {}
+        for benchmark in self.especificacoes:
+            convencoes = (CONVENCAO_CORRIDOS,) if benchmark == BENCHMARK_POUPANCA else (CONVENCAO_CORRIDOS, CONVENCAO_UTEIS)
+            for convencao in convencoes:
+                self._linhas[(benchmark, convencao)] = len(self._linhas)
+        self.tabelas = self._abrir_tabelas(diretorio_tabelas)
+        # Mesmo mapeamento como ndarray comum: fatiar um np.memmap cria outro objeto memmap, bem mais lento
+        self._tabelas = self.tabelas.view(np.ndarray)
+
+    def _calcular_tabelas(self):
+        tabelas = np.empty((len(self._linhas), self.horizonte_dias + 1))
+        for (benchmark, convencao), linha in self._linhas.items():
+            tipo, params, _, curva = self.especificacoes[benchmark]
+            tabelas[linha] = fatores_brutos(self.horizonte_dias, tipo, params, curva, convencao, self.data_referencia)
+        return tabelas
+
+    def _abrir_tabelas(self, diretorio):
+        """Abre o .npy do snapshot em memory-map, calculando e gravando na primeira vez."""
+        caminho = os.path.join(diretorio, f"fatores_{self.versao}.npy")
+        if not os.path.exists(caminho):
+            os.makedirs(diretorio, exist_ok=True)
+            # Grava em arquivo temporário e renomeia: outro processo nunca lê um .npy pela metade
+            descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix=".npy.tmp")
+            try:
+                with os.fdopen(descritor, "wb") as arquivo:
+                    np.save(arquivo, self._calcular_tabelas())
+                os.replace(temporario, caminho)
+            except BaseException:
+                os.unlink(temporario)
+                raise
+        return np.load(caminho, mmap_mode="r")
+
+    def _linha(self, benchmark, dias, convencao):
+        if convencao == CONVENCAO_UTEIS and benchmark != BENCHMARK_POUPANCA and date.today() != self.data_referencia:
+            # Em DU/252 a tabela vale para aplicações iniciadas na data de referência
+            return None
+        linha = self._linhas.get((benchmark, CONVENCAO_CORRIDOS if benchmark == BENCHMARK_POUPANCA else convencao))
+        return None if dias > self.horizonte_dias else linha
+
+    def fatores(self, benchmark, dias, convencao=CONVENCAO_CORRIDOS):
+        """Fatores brutos de R$ 1 nos dias 0..dias (view somente leitura), ou None se fora da tabela."""
+        linha = self._linha(benchmark, dias, convencao)
+        return None if linha is None else self._tabelas[linha, :dias + 1]
+
+    def fator(self, benchmark, dias, convencao=CONVENCAO_CORRIDOS):
+        """Fator bruto acumulado de R$ 1 no prazo (O(1)), ou None se fora da tabela."""
+        linha = self._linha(benchmark, dias, convencao)
+        return None if linha is None else float(self._tabelas[linha, dias])
+
+    def resultado(self, benchmark, valor_inicial, dias, convencao=CONVENCAO_CORRIDOS):
+        """Resultado do comparativo (mesmas chaves de calcular_ativo_cache), ou None se fora da tabela."""
+        def calcular():
+            fatores = self.fatores(benchmark, dias, convencao)
+            if fatores is None:
+                return None
+            montante = valor_inicial * fatores
+            tipo, params, is_isento, curva = self.especificacoes[benchmark]
+            if benchmark == BENCHMARK_POUPANCA:
+                return resultado_poupanca(valor_inicial, montante, compacto=True, float32=RESULTADO_FLOAT32)
+            return resultado_do_montante(valor_inicial, dias, tipo, params, is_isento, montante, curva, convencao,
+                                         self.data_referencia if convencao == CONVENCAO_UTEIS else None,
+                                         compacto=True, float32=RESULTADO_FLOAT32)
+
+        return resultado_em_cache(("mercado", self.versao, benchmark, float(valor_inicial), int(dias), convencao), calcular)
+
+def carregar_snapshot(caminho, diretorio_tabelas=DIRETORIO_TABELAS):
+    """Lê o CSV e abre (ou calcula) as tabelas de fatores do snapshot."""
+    with open(caminho, "rb") as arquivo:
+        conteudo = arquivo.read()
+    # A versão identifica o conteúdo: o mesmo snapshot reaproveita o .npy já gravado
+    versao = hashlib.sha256(conteudo + f"|v{VERSAO_TABELAS}|{HORIZONTE_PADRAO_DIAS}".encode()).hexdigest()[:16]
+    data_referencia, vertices = ler_snapshot(caminho)
+    return SnapshotMercado(data_referencia, vertices, versao, diretorio_tabelas)
+
+# ==========================================
+# 2. SNAPSHOT VIGENTE (RECARGA A QUENTE)
+# ==========================================
+
+_atual = None
+_assinatura_arquivo = None
+_verificado_em = None
+_lock = threading.Lock()
+
+def snapshot_atual(caminho=None):
+    """Snapshot vigente do processo, recarregado se o arquivo mudou; None se não houver snapshot."""
+    global _atual, _assinatura_arquivo, _verificado_em
+    caminho = CAMINHO_SNAPSHOT if caminho is None else caminho
+    if not caminho:
+        return None
+    agora = time.monotonic()
+    if _verificado_em is not None and agora - _verificado_em < INTERVALO_VERIFICACAO_SEGUNDOS:
+        return _atual
+    with _lock:
+        if _verificado_em is not None and agora - _verificado_em < INTERVALO_VERIFICACAO_SEGUNDOS:
+            return _atual
+        _verificado_em = agora
+        try:
+            estado = os.stat(caminho)
+        except FileNotFoundError:
+            _atual, _assinatura_arquivo = None, None
+            return None
+        assinatura = (estado.st_mtime_ns, estado.st_size)
+        if assinatura != _assinatura_arquivo:
+            try:
+                anterior, _atual = _atual, carregar_snapshot(caminho)
+                _assinatura_arquivo = assinatura
+                if anterior is not None and anterior.versao != _atual.versao:
+                    # Resultados do snapshot substituído não serão mais consultados
+                    descartar_do_cache(lambda chave: chave[:2] == ("mercado", anterior.versao))
+                logger.info("Snapshot de mercado carregado: %s (%s)", caminho, _atual.data_referencia)
+            except (OSError, ValueError, KeyError) as e:
+                # Mantém o snapshot anterior; a próxima verificação tenta de novo
+                logger.warning("Snapshot de mercado inválido em %s: %s", caminho, e)
+        return _atual
+
+def recarregar():
+    """Força a releitura do snapshot na próxima chamada de snapshot_atual()."""
+    global _assinatura_arquivo, _verificado_em
+    with _lock:
+        _assinatura_arquivo = None
+        _verificado_em = None
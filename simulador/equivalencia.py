@@ -0,0 +1,169 @@
+import numpy as np
+
+from .calendario import BASE_ANUAL, CONVENCAO_UTEIS, calendario_padrao
+from .motor_calculo import FAIXAS_IR, aliquota_ir_regressiva, coluna_lote, convencao_lote, fatores_brutos_lote, taxas_lote
+
+# Cálculos inversos sobre o motor, para uma tabela inteira de pares de ativos:
+#
+#   - taxa_equivalente_lote: taxa que o ativo A precisa para empatar (líquido) com o ativo B
+#     (ex.: qual CDB empata com esta LCI depois do IR);
+#   - prazo_equilibrio_lote: a partir de quantos dias o líquido de A supera o de B;
+#   - valor_necessario_lote: valor inicial para atingir um montante líquido alvo.
+#
+# Pares: mesmas colunas de calcular_cenarios_lote com sufixo _a / _b (tipo_a,
+# taxa_fixa_a, isento_a, ..., tipo_b, ...), mais dias e, opcionalmente,
+# convencao/data_inicio (comuns aos dois ativos). As taxas são as projeções
+# constantes informadas (sem curva de juros).
+#
+# Taxa e valor têm forma fechada: dentro de um prazo a alíquota de IR é fixa e o
+# líquido por R$ 1 é 1 + (fator_bruto - 1) * (1 - alíquota). O prazo de equilíbrio
+# usa bisseção em dias inteiros, faixa a faixa do IR (180/360/720 dias), com
+# todas as linhas avançando juntas.
+
+PRAZO_MAXIMO_PADRAO = 365 * 30
+
+def _lado(pares, sufixo):
+    """Tipo, taxa anual, isenção e máscara DU/252 de um dos ativos do par."""
+    tipo, taxa_anual, is_isento = taxas_lote(pares, sufixo)
+    uteis, datas_inicio = convencao_lote(pares)
+    # Poupança rende por dias corridos também em DU/252 (como em calcular_cenarios_lote)
+    return tipo, taxa_anual, is_isento, uteis & (tipo != "POUPANÇA"), datas_inicio
+
+def _liquido_por_real(taxa_anual, is_isento, dias, uteis, datas_inicio):
+    """Montante líquido de R$ 1 aplicado por 'dias' dias corridos."""
+    fator = fatores_brutos_lote(taxa_anual, dias, uteis, datas_inicio)
+    aliquota = np.atleast_1d(aliquota_ir_regressiva(dias, is_isento))
+    return 1 + (fator - 1) * (1 - aliquota / 100.0)
+
+def _prazo_em_anos(dias, uteis, datas_inicio):
+    """Expoente anual do fator bruto: dias/365 ou dias úteis/252."""
+    anos = dias / 365.0
+    if uteis.any():
+        dias_uteis = calendario_padrao().dias_uteis_por_prazo(datas_inicio[uteis], dias[uteis])
+        anos[uteis] = dias_uteis / BASE_ANUAL[CONVENCAO_UTEIS]
+    return anos
+
+# ==========================================
+# 1. TAXA EQUIVALENTE
+# ==========================================
+
+def taxa_equivalente_lote(pares):
+    """Taxa que o ativo A precisa para render, líquido, o mesmo que o ativo B no prazo.
+
+    Retorna um DataFrame com taxa_nominal_equivalente_aa (taxa nominal anual de A, %)
+    e parametro_equivalente (na unidade do tipo de A: taxa fixa para PRÉ, % do CDI
+    para PÓS, juro real para IPCA), além do rendimento líquido de B no prazo (%).
+    Poupança como ativo A (taxa não ajustável) resulta em NaN.
+    """
+    import pandas as pd
+    pares = pd.DataFrame(pares)
+    dias = coluna_lote(pares, "dias", 0.0).astype(np.int64)
+    _, taxa_b, isento_b, uteis_b, datas_inicio = _lado(pares, "_b")
+    liquido_b = _liquido_por_real(taxa_b, isento_b, dias, uteis_b, datas_inicio)
+
+    tipo_a, _, isento_a, uteis_a, _ = _lado(pares, "_a")
+    aliquota_a = np.atleast_1d(aliquota_ir_regressiva(dias, isento_a))
+    anos_a = _prazo_em_anos(dias, uteis_a, datas_inicio)
+    # 1 + (fator - 1) * (1 - alíquota) = líquido de B  =>  fator bruto que A precisa
+    fator_a = 1 + (liquido_b - 1) / (1 - aliquota_a / 100.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taxa_a = np.where(anos_a > 0, np.power(fator_a, 1 / anos_a) - 1, np.nan)
+
+    taxa_ref = coluna_lote(pares, "taxa_ref_a", 0.0) / 100.0
+    ipca = coluna_lote(pares, "ipca_proj_a", 0.0) / 100.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        parametro = np.select(
+            [tipo_a == "PRÉ", tipo_a == "PÓS", tipo_a == "IPCA"],
+            [taxa_a, taxa_a / taxa_ref, (1 + taxa_a) / (1 + ipca) - 1],
+            default=np.nan
+        )
+    taxa_a = np.where(tipo_a == "POUPANÇA", np.nan, taxa_a)
+
+    return pd.DataFrame({
+        "rendimento_liquido_b_pct": (liquido_b - 1) * 100,
+        "taxa_nominal_equivalente_aa": taxa_a * 100,
+        "parametro_equivalente": parametro * 100
+    }, index=pares.index)
+
+# ==========================================
+# 2. PRAZO DE EQUILÍBRIO
+# ==========================================
+
+def _faixas_prazo(prazo_maximo):
+    """Intervalos de dias [início, fim] em que as alíquotas de IR são constantes."""
+    inicio = 1
+    for limite, _ in FAIXAS_IR:
+        if inicio > prazo_maximo:
+            return
+        yield inicio, min(limite, prazo_maximo)
+        inicio = limite + 1
+    if inicio <= prazo_maximo:
+        yield inicio, prazo_maximo
+
+def prazo_equilibrio_lote(pares, prazo_maximo=PRAZO_MAXIMO_PADRAO):
+    """Menor prazo (dias corridos) em que o líquido do ativo A alcança o do ativo B.
+
+    Dentro de cada faixa do IR as alíquotas são fixas e a diferença entre os
+    líquidos cruza o zero no máximo uma vez; a bisseção roda faixa a faixa, para
+    todas as linhas ao mesmo tempo. Linhas sem equilíbrio até 'prazo_maximo'
+    resultam em NaN. Retorna também as alíquotas de A e B nesse prazo.
+    """
+    import pandas as pd
+    pares = pd.DataFrame(pares)
+    _, taxa_a, isento_a, uteis_a, datas_inicio = _lado(pares, "_a")
+    _, taxa_b, isento_b, uteis_b, _ = _lado(pares, "_b")
+    if datas_inicio is None:
+        datas_inicio = np.full(len(pares), np.datetime64("today", "D"))
+
+    def vantagem(linhas, dias):
+        """Líquido de A menos líquido de B (por R$ 1) no prazo 'dias' de cada linha."""
+        return (_liquido_por_real(taxa_a[linhas], isento_a[linhas], dias, uteis_a[linhas], datas_inicio[linhas])
+                - _liquido_por_real(taxa_b[linhas], isento_b[linhas], dias, uteis_b[linhas], datas_inicio[linhas]))
+
+    prazo = np.full(len(pares), np.nan)
+    for inicio, fim in _faixas_prazo(prazo_maximo):
+        pendentes = np.flatnonzero(np.isnan(prazo))
+        if not len(pendentes):
+            break
+        baixo = np.full(len(pendentes), inicio, dtype=np.int64)
+        alto = np.full(len(pendentes), fim, dtype=np.int64)
+        # A já vence no início da faixa
+        ja_vence = vantagem(pendentes, baixo) >= 0
+        prazo[pendentes[ja_vence]] = inicio
+        # Cruzamento dentro da faixa: vantagem < 0 no início e >= 0 no fim
+        cruza = ~ja_vence & (vantagem(pendentes, alto) >= 0)
+        linhas, baixo, alto = pendentes[cruza], baixo[cruza], alto[cruza]
+        while len(linhas) and (alto - baixo > 1).any():
+            meio = (baixo + alto) // 2
+            vence = vantagem(linhas, meio) >= 0
+            alto = np.where(vence, meio, alto)
+            baixo = np.where(vence, baixo, meio)
+        prazo[linhas] = alto
+
+    dias = np.nan_to_num(prazo, nan=prazo_maximo).astype(np.int64)
+    return pd.DataFrame({
+        "prazo_equilibrio": prazo,
+        "aliquota_a": np.where(np.isnan(prazo), np.nan, aliquota_ir_regressiva(dias, isento_a)),
+        "aliquota_b": np.where(np.isnan(prazo), np.nan, aliquota_ir_regressiva(dias, isento_b))
+    }, index=pares.index)
+
+# ==========================================
+# 3. VALOR INICIAL NECESSÁRIO
+# ==========================================
+
+def valor_necessario_lote(cenarios):
+    """Valor inicial que atinge o montante líquido 'valor_alvo' no prazo de cada cenário.
+
+    Mesmas colunas de calcular_cenarios_lote (sem valor_inicial) mais valor_alvo.
+    O líquido é linear no valor aplicado, então a solução é exata: alvo / líquido por R$ 1.
+    """
+    import pandas as pd
+    cenarios = pd.DataFrame(cenarios)
+    dias = coluna_lote(cenarios, "dias", 0.0).astype(np.int64)
+    _, taxa_anual, is_isento, uteis, datas_inicio = _lado(cenarios, "")
+    liquido = _liquido_por_real(taxa_anual, is_isento, dias, uteis, datas_inicio)
+    valor_alvo = coluna_lote(cenarios, "valor_alvo", 0.0)
+    return pd.DataFrame({
+        "valor_necessario": valor_alvo / liquido,
+        "montante_liquido_por_real": liquido
+    }, index=cenarios.index)
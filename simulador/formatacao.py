@@ -0,0 +1,13 @@
+# Conversão e formatação de valores no padrão brasileiro (R$ 1.000,00).
+
+def parse_br_currency(text_input):
+    """Converte string BR (ex: 1.000,00) para float."""
+    try:
+        cleaned_text = text_input.replace(".", "").replace(",", ".")
+        return float(cleaned_text)
+    except:
+        return 0.0
+
+def format_br(value):
+    """Formata float para R$"""
+    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -0,0 +1,252 @@
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# Instrumentação leve dos caminhos quentes (reexecução do script, banco, cálculo,
+# DataFrames, gráficos e tabelas), sem dependência do Streamlit.
+#
+# Desligada por padrão: com SIMULADOR_INSTRUMENTACAO=1 os tempos são medidos.
+# Desligada, medir() devolve um contexto nulo compartilhado e etapa()/medido()
+# retornam logo na primeira linha, então o custo é de uma checagem de flag.
+#
+# Uma execução (rerun) do Streamlit é linear; em vez de aninhar blocos 'with'
+# no script, etapa("nome") fecha a etapa anterior e abre a próxima:
+#
+#     iniciar_execucao()
+#     etapa("calculo.ativo_principal")
+#     ...
+#     finalizar_execucao(usuario=email)
+#
+# Tarefas em segundo plano rodam em outra thread, sem a execução do rerun:
+# coletar_etapas() junta os tempos medidos nela em um dicionário (guardado na
+# tarefa) e mesclar_etapas() os soma à reexecução que exibe o resultado.
+#
+# As últimas execuções ficam em memória para o painel de administração e cada
+# uma é registrada como uma linha JSON no logger "simulador.instrumentacao".
+# Os contadores (simulações por usuário, tempo acumulado por etapa, cache de
+# resultados) podem ser exportados no formato texto do Prometheus.
+
+ATIVA = os.environ.get("SIMULADOR_INSTRUMENTACAO", "0") == "1"
+EXECUCOES_GUARDADAS = int(os.environ.get("SIMULADOR_INSTRUMENTACAO_EXECUCOES", "20"))
+# Emails (separados por vírgula) que veem o painel de desempenho
+ADMINISTRADORES = frozenset(
+    email.strip().lower() for email in os.environ.get("SIMULADOR_ADMINS", "").split(",") if email.strip()
+)
+
+logger = logging.getLogger("simulador.instrumentacao")
+
+_NADA = nullcontext()
+_local = threading.local()
+_historico = deque(maxlen=EXECUCOES_GUARDADAS)
+_contadores = defaultdict(float)
+_lock = threading.Lock()
+
+def ativar(ativa=True):
+    """Liga/desliga a medição de tempos em tempo de execução (os contadores ficam sempre ligados)."""
+    global ATIVA
+    ATIVA = ativa
+    if ativa and not logger.handlers:
+        # Linhas JSON no stderr, a menos que a aplicação já tenha configurado o logger
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+def eh_administrador(email):
+    return bool(email) and email.strip().lower() in ADMINISTRADORES
+
+# ==========================================
+# 1. CONTADORES
+# ==========================================
+
+def contar(metrica, valor=1, **rotulos):
+    """Soma 'valor' ao contador 'metrica' com os rótulos dados (ex.: usuario=email)."""
+    chave = (metrica, tuple(sorted(rotulos.items())))
+    with _lock:
+        _contadores[chave] += valor
+
+def contadores():
+    """Cópia dos contadores: {(metrica, ((rotulo, valor), ...)): total}."""
+    with _lock:
+        return dict(_contadores)
+
+def _registrar_tempo(nome, segundos):
+    execucao = getattr(_local, "execucao", None)
+    if execucao is not None:
+        execucao.registrar(nome, segundos)
+    with _lock:
+        _contadores[("simulador_etapa_segundos_total", (("etapa", nome),))] += segundos
+        _contadores[("simulador_etapa_chamadas_total", (("etapa", nome),))] += 1
+
+# ==========================================
+# 2. EXECUÇÕES E ETAPAS
+# ==========================================
+
+class Execucao:
+    """Tempos de uma reexecução do script, somados por etapa."""
+
+    __slots__ = ("inicio", "relogio", "etapas", "usuario", "total_ms", "_etapa_atual", "_etapa_inicio")
+
+    def __init__(self):
+        self.inicio = datetime.now()
+        self.relogio = time.perf_counter()
+        self.etapas = {}
+        self.usuario = None
+        self.total_ms = None
+        self._etapa_atual = None
+        self._etapa_inicio = self.relogio
+
+    def registrar(self, nome, segundos):
+        self.etapas[nome] = self.etapas.get(nome, 0.0) + segundos * 1000
+
+    def como_dict(self):
+        return {
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "usuario": self.usuario,
+            "total_ms": round(self.total_ms, 3) if self.total_ms is not None else None,
+            "etapas_ms": {nome: round(ms, 3) for nome, ms in self.etapas.items()},
+        }
+
+def iniciar_execucao():
+    """Abre o registro de uma reexecução na thread atual (o Streamlit roda cada sessão em sua thread)."""
+    if not ATIVA:
+        return None
+    _local.execucao = Execucao()
+    return _local.execucao
+
+def etapa(nome):
+    """Fecha a etapa em andamento da execução atual e abre 'nome' (None apenas fecha)."""
+    if not ATIVA:
+        return
+    execucao = getattr(_local, "execucao", None)
+    if execucao is None:
+        return
+    agora = time.perf_counter()
+    if execucao._etapa_atual is not None:
+        _registrar_tempo(execucao._etapa_atual, agora - execucao._etapa_inicio)
+    execucao._etapa_atual = nome
+    execucao._etapa_inicio = agora
+
+def finalizar_execucao(usuario=None):
+    """Fecha a execução atual: guarda no histórico, soma nos contadores e registra no log."""
+    if not ATIVA:
+        return None
+    execucao = getattr(_local, "execucao", None)
+    if execucao is None:
+        return None
+    etapa(None)
+    _local.execucao = None
+    execucao.usuario = usuario
+    execucao.total_ms = (time.perf_counter() - execucao.relogio) * 1000
+    with _lock:
+        _historico.append(execucao)
+    contar("simulador_execucoes_total")
+    contar("simulador_execucao_segundos_total", execucao.total_ms / 1000)
+    logger.info(json.dumps({"evento": "execucao", **execucao.como_dict()}, ensure_ascii=False))
+    return execucao
+
+@contextmanager
+def coletar_etapas(destino):
+    """Soma em 'destino' ({etapa: ms}) as etapas medidas na thread atual durante o bloco."""
+    if not ATIVA:
+        yield destino
+        return
+    anterior = getattr(_local, "execucao", None)
+    coleta = Execucao()
+    coleta.etapas = destino
+    _local.execucao = coleta
+    try:
+        yield destino
+    finally:
+        _local.execucao = anterior
+
+def mesclar_etapas(etapas):
+    """Soma na execução atual etapas medidas em outra thread (os contadores já as registraram)."""
+    if not ATIVA or not etapas:
+        return
+    execucao = getattr(_local, "execucao", None)
+    if execucao is None:
+        return
+    for nome, ms in etapas.items():
+        execucao.etapas[nome] = execucao.etapas.get(nome, 0.0) + ms
+
+class _Medicao:
+    __slots__ = ("nome", "inicio")
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _registrar_tempo(self.nome, time.perf_counter() - self.inicio)
+        return False
+
+def medir(nome):
+    """Contexto que mede o bloco como etapa 'nome' (aninhável, inclusive dentro de uma etapa())."""
+    if not ATIVA:
+        return _NADA
+    return _Medicao(nome)
+
+def medido(nome):
+    """Decorador: mede cada chamada da função como etapa 'nome'."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            if not ATIVA:
+                return funcao(*args, **kwargs)
+            with _Medicao(nome):
+                return funcao(*args, **kwargs)
+        return envoltorio
+    return decorador
+
+def ultimas_execucoes():
+    """Execuções mais recentes primeiro, como dicionários."""
+    with _lock:
+        return [execucao.como_dict() for execucao in reversed(_historico)]
+
+def limpar():
+    with _lock:
+        _historico.clear()
+        _contadores.clear()
+
+# ==========================================
+# 3. EXPORTAÇÃO (PROMETHEUS)
+# ==========================================
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def exportar_prometheus():
+    """Contadores no formato texto de exposição do Prometheus."""
+    linhas_por_metrica = defaultdict(list)
+    for (metrica, rotulos), valor in sorted(contadores().items()):
+        texto_rotulos = ",".join(f'{nome}="{_escapar(rotulo)}"' for nome, rotulo in rotulos)
+        linhas_por_metrica[metrica].append(f"{metrica}{{{texto_rotulos}}} {valor:g}" if rotulos else f"{metrica} {valor:g}")
+
+    # Cache de resultados: só se o módulo já estiver carregado (não força o import do motor)
+    cache = sys.modules.get(__package__ + ".cache_simulacao")
+    if cache is not None:
+        estatisticas = cache.estatisticas_cache()
+        linhas_por_metrica["simulador_cache_hits_total"].append(f"simulador_cache_hits_total {estatisticas['hits']}")
+        linhas_por_metrica["simulador_cache_misses_total"].append(f"simulador_cache_misses_total {estatisticas['misses']}")
+        linhas_por_metrica["simulador_cache_itens"].append(f"simulador_cache_itens {estatisticas['itens']}")
+
+    saida = []
+    for metrica, linhas in linhas_por_metrica.items():
+        saida.append(f"# TYPE {metrica} {'gauge' if metrica == 'simulador_cache_itens' else 'counter'}")
+        saida.extend(linhas)
+    return "\n".join(saida) + "\n"
+
+if ATIVA:
+    ativar()
@@ -0,0 +1,121 @@
+import numpy as np
+
+from .calendario import CONVENCAO_CORRIDOS, CONVENCAO_UTEIS, expoentes_prazo
+from .motor_calculo import aliquota_ir_regressiva, conversao_nominal
+
+# Simulação estocástica (Monte Carlo) das taxas de CDI/IPCA.
+# As taxas anuais seguem um processo de reversão à média (Ornstein-Uhlenbeck /
+# Vasicek) em torno da projeção informada na barra lateral (ou da taxa de cada
+# dia da curva projetada, quando houver uma). Cada trajetória é
+# capitalizada dia a dia na convenção do cenário (em DU/252, só nos dias
+# úteis, como no motor determinístico) e o IR regressivo é aplicado ao final.
+#
+# Memória limitada: os choques são gerados em blocos de dias e, de cada
+# trajetória, só se guarda o acumulado nos dias usados pelo gráfico.
+
+N_TRAJETORIAS_PADRAO = 10000
+REVERSAO_PADRAO = 0.5          # velocidade de reversão à média (por ano)
+VOLATILIDADE_PADRAO = 2.0      # volatilidade anual da taxa, em pontos percentuais
+PONTOS_CURVA_PADRAO = 200
+DIAS_POR_BLOCO = 128
+PERCENTIS = (5, 50, 95)
+
+# ==========================================
+# 1. GERAÇÃO DAS TRAJETÓRIAS
+# ==========================================
+
+def _blocos_choques(rng, n_trajetorias, dias, dias_por_bloco=DIAS_POR_BLOCO):
+    """Gera os choques normais em blocos (dias_bloco, n_trajetorias) para limitar a memória."""
+    for inicio in range(0, dias, dias_por_bloco):
+        yield rng.standard_normal((min(dias_por_bloco, dias - inicio), n_trajetorias))
+
+# ==========================================
+# 2. SIMULAÇÃO
+# ==========================================
+
+def simular_monte_carlo(valor_inicial, dias, tipo_rentabilidade, params, is_isento,
+                        n_trajetorias=N_TRAJETORIAS_PADRAO, volatilidade=VOLATILIDADE_PADRAO,
+                        reversao=REVERSAO_PADRAO, pontos_curva=PONTOS_CURVA_PADRAO, semente=None, ao_progredir=None,
+                        curva=None, convencao=CONVENCAO_CORRIDOS, data_inicio=None):
+    """Simula N trajetórias de taxa e retorna as bandas de percentis do montante líquido.
+
+    PÓS usa o CDI (params['taxa_ref']) como média; IPCA usa params['ipca_proj'].
+    'curva' (opcional, curvas_juros.CurvaJuros) substitui a média constante de PÓS/IPCA
+    pela taxa projetada de cada dia, como em calcular_ativo_geral.
+    'convencao'/'data_inicio' seguem calcular_ativo_geral: em DU/252 a taxa evolui
+    por dia corrido, mas só rende nos dias úteis a partir de 'data_inicio'.
+    PRÉ não tem componente estocástico (todas as trajetórias coincidem).
+    Retorna {"dias", "percentis": {p: array}, "montante_liquido": {p: float}, "aliquota"}.
+    'ao_progredir' (opcional) é chamada ao fim de cada bloco de dias com a fração
+    concluída (0..1); uma exceção levantada por ela interrompe a simulação.
+    """
+    if tipo_rentabilidade == "PÓS":
+        taxa_media = params['taxa_ref'] / 100.0
+    elif tipo_rentabilidade == "IPCA":
+        taxa_media = params['ipca_proj'] / 100.0
+    else:
+        taxa_media = params['taxa_fixa'] / 100.0
+        volatilidade = 0.0
+        curva = None
+    volatilidade = volatilidade / 100.0
+    # Média de cada dia 1..dias: constante ou a taxa vigente na curva
+    medias = curva.taxas_diarias(dias) if curva is not None else np.full(dias, taxa_media)
+
+    rng = np.random.default_rng(semente)
+    dias_curva = np.unique(np.linspace(0, dias, min(pontos_curva, dias + 1)).round().astype(np.int64))
+    multiplicador, adicional = conversao_nominal(tipo_rentabilidade, params)
+
+    # Discretização exata do processo OU para o passo diário
+    dt = 1 / 365.0
+    # Fração de ano capitalizada em cada dia 1..dias (em DU/252: 1/252 nos dias úteis, 0 nos demais)
+    if convencao == CONVENCAO_UTEIS:
+        passos = np.diff(expoentes_prazo(dias, CONVENCAO_UTEIS, data_inicio))
+    else:
+        passos = np.full(dias, dt)
+    a = np.exp(-reversao * dt)
+    if reversao > 0:
+        desvio = volatilidade * np.sqrt((1 - a**2) / (2 * reversao))
+    else:
+        desvio = volatilidade * np.sqrt(dt)
+
+    # Estado por trajetória: desvio da taxa de referência em relação à média e log do fator acumulado.
+    # Só os dias da curva são guardados: (len(dias_curva), n_trajetorias)
+    desvio_taxa = np.zeros(n_trajetorias)
+    log_acumulado = np.zeros(n_trajetorias)
+    log_acumulado_curva = np.zeros((len(dias_curva), n_trajetorias))
+    taxa_nominal = np.empty(n_trajetorias)
+    proximo = 1  # dias_curva[0] == 0 (fator 1)
+    dia = 0
+
+    for choques in _blocos_choques(rng, n_trajetorias, dias):
+        for choque in choques:
+            dia += 1
+            # taxa = media + desvio_taxa, com desvio_taxa = desvio_taxa * a + desvio * choque (in-place)
+            desvio_taxa *= a
+            desvio_taxa += desvio * choque
+            np.add(desvio_taxa, medias[dia - 1], out=taxa_nominal)
+            # Capitalização diária (1 + taxa)^(1/365), somada em log; taxas não ficam negativas
+            taxa_nominal *= multiplicador
+            taxa_nominal += adicional
+            np.maximum(taxa_nominal, 0.0, out=taxa_nominal)
+            np.log1p(taxa_nominal, out=taxa_nominal)
+            taxa_nominal *= passos[dia - 1]
+            log_acumulado += taxa_nominal
+            if dia == dias_curva[proximo]:
+                log_acumulado_curva[proximo] = log_acumulado
+                proximo += 1
+        if ao_progredir is not None:
+            ao_progredir(dia / dias)
+
+    aliquota = aliquota_ir_regressiva(dias, is_isento)
+    montante_bruto = valor_inicial * np.exp(log_acumulado_curva)
+    # Mesma progressão líquida do gráfico de calcular_ativo_geral (alíquota do prazo total)
+    montante_liquido = valor_inicial + (montante_bruto - valor_inicial) * (1 - aliquota / 100.0)
+
+    bandas = np.percentile(montante_liquido, PERCENTIS, axis=1)
+    return {
+        "dias": dias_curva,
+        "percentis": dict(zip(PERCENTIS, bandas)),
+        "montante_liquido": {p: float(banda[-1]) for p, banda in zip(PERCENTIS, bandas)},
+        "aliquota": aliquota
+    }
@@ -0,0 +1,362 @@
+import sys
+from collections.abc import Mapping
+from datetime import date
+
+import numpy as np
+
+from .calendario import BASE_ANUAL, CONVENCAO_CORRIDOS, CONVENCAO_UTEIS, calendario_padrao, expoentes_prazo
+
+# Motor de cálculo do simulador, sem dependência do Streamlit.
+# Pode ser importado por scripts e jobs em lote sem carregar a interface web.
+# O pandas só é importado quando um DataFrame é de fato montado (import lazy).
+
+# Poupança: simplificação de 0.5% ao mês + TR ~ 6.17% a.a. para benchmark.
+TAXA_POUPANCA_AA = 0.0617
+
+# Tabela Regressiva de IR: (prazo máximo em dias corridos, alíquota %)
+FAIXAS_IR = ((180, 22.5), (360, 20.0), (720, 17.5))
+ALIQUOTA_IR_MINIMA = 15.0
+
+TIPOS_RENTABILIDADE = ("PRÉ", "PÓS", "IPCA", "POUPANÇA")
+VALORES_VERDADEIROS = ("1", "1.0", "true", "sim", "s", "yes", "y")
+
+# ==========================================
+# 1. FUNÇÕES BÁSICAS
+# ==========================================
+
+def aliquota_ir_regressiva(dias, is_isento):
+    """Retorna a alíquota (%) da tabela regressiva de IR. Aceita escalares ou arrays."""
+    dias = np.asarray(dias)
+    condicoes = [dias <= limite for limite, _ in FAIXAS_IR]
+    aliquotas = [aliquota for _, aliquota in FAIXAS_IR]
+    aliquota = np.select(condicoes, aliquotas, default=ALIQUOTA_IR_MINIMA)
+    aliquota = np.where(is_isento, 0.0, aliquota)
+    if aliquota.ndim == 0:
+        return float(aliquota)
+    return aliquota
+
+def taxa_anual_nominal(tipo_rentabilidade, params):
+    """Converte os parâmetros do ativo na taxa anual nominal (decimal)."""
+    if tipo_rentabilidade == "PRÉ":
+        return params['taxa_fixa'] / 100.0
+    elif tipo_rentabilidade == "PÓS":
+        taxa_referencia = params['taxa_ref'] / 100.0
+        percentual = params['percentual'] / 100.0
+        return taxa_referencia * percentual
+    elif tipo_rentabilidade == "IPCA":
+        ipca = params['ipca_proj'] / 100.0
+        juro_real = params['taxa_fixa'] / 100.0
+        # Fórmula de Fisher para rentabilidade nominal (aproximada)
+        return ((1 + ipca) * (1 + juro_real)) - 1
+    elif tipo_rentabilidade == "POUPANÇA":
+        return TAXA_POUPANCA_AA
+    return 0.0
+
+def conversao_nominal(tipo_rentabilidade, params):
+    """Coeficientes (multiplicador, adicional) tais que taxa_nominal = multiplicador * referencia + adicional.
+
+    A referência é o CDI/Selic para PÓS e o IPCA para IPCA+; usado quando a
+    referência varia no tempo (curvas de juros, Monte Carlo).
+    """
+    if tipo_rentabilidade == "PÓS":
+        return params['percentual'] / 100.0, 0.0
+    elif tipo_rentabilidade == "IPCA":
+        # Fórmula de Fisher: (1 + ipca) * (1 + juro_real) - 1
+        juro_real = params['taxa_fixa'] / 100.0
+        return 1 + juro_real, juro_real
+    return 1.0, 0.0
+
+def curva_montante(valor_inicial, fator_diario, dias):
+    """Retorna (dias, montante) da capitalização diária, calculados de uma vez com NumPy."""
+    # fator_diario ** d sobre o vetor de dias substitui o laço "montante *= fator_diario"
+    vetor_dias = np.arange(dias + 1)
+    montante = valor_inicial * np.power(fator_diario, vetor_dias)
+    return vetor_dias, montante
+
+# ==========================================
+# 2. RESULTADO COMPACTO
+# ==========================================
+
+CHAVES_RESULTADO = ("df", "montante_liquido", "rendimento_liquido", "rendimento_bruto", "ir_devido", "aliquota", "taxa_nominal_aa")
+
+class ResultadoCompacto(Mapping):
+    """Resultado de um cenário guardado em array, lido como o dicionário de resultado.
+
+    Só a curva do montante bruto é guardada (opcionalmente em float32); as demais
+    colunas são derivadas dela. O DataFrame em 'df' é montado a cada acesso e não
+    fica retido. As métricas finais continuam em float64.
+    """
+
+    __slots__ = ("valor_inicial", "montante", "poupanca", "montante_liquido", "rendimento_liquido",
+                 "rendimento_bruto", "ir_devido", "aliquota", "taxa_nominal_aa")
+
+    def __init__(self, valor_inicial, montante, metricas, poupanca=False, float32=False):
+        self.valor_inicial = valor_inicial
+        self.montante = np.asarray(montante, dtype=np.float32 if float32 else np.float64)
+        self.poupanca = poupanca
+        for chave, valor in metricas.items():
+            setattr(self, chave, valor)
+
+    @property
+    def df(self):
+        montante = self.montante.astype(np.float64, copy=False)
+        if self.poupanca:
+            return _df_poupanca(self.valor_inicial, montante)
+        return _df_ativo(self.valor_inicial, montante, self.aliquota)
+
+    @property
+    def nbytes(self):
+        """Memória aproximada ocupada pelo resultado (objeto + array)."""
+        return sys.getsizeof(self) + self.montante.nbytes
+
+    def __getitem__(self, chave):
+        if chave not in CHAVES_RESULTADO:
+            raise KeyError(chave)
+        return getattr(self, chave)
+
+    def __iter__(self):
+        return iter(CHAVES_RESULTADO)
+
+    def __len__(self):
+        return len(CHAVES_RESULTADO)
+
+# ==========================================
+# 3. CÁLCULO POR ATIVO
+# ==========================================
+
+def _df_poupanca(valor_inicial, montante):
+    import pandas as pd
+    return pd.DataFrame({
+        "Dia": np.arange(len(montante)),
+        "Montante Líquido": montante,
+        "Rendimento Líquido": montante - valor_inicial
+    })
+
+def _df_ativo(valor_inicial, montante, aliquota_ir_fixa):
+    import pandas as pd
+    rendimento_total = montante - valor_inicial
+
+    # Simula o montante líquido apenas para exibição no gráfico de linha
+    # O cálculo líquido final é feito no final, mas aqui simulamos uma progressão
+    ir_parcial = rendimento_total * (aliquota_ir_fixa / 100.0)
+    montante_liquido_simples = valor_inicial + (rendimento_total - ir_parcial)
+
+    return pd.DataFrame({
+        "Dia": np.arange(len(montante)),
+        "Montante Bruto": montante,
+        "Rendimento Bruto": rendimento_total,
+        "Montante Líquido": montante_liquido_simples
+    })
+
+def _montar_resultado(valor_inicial, montante, metricas, poupanca, compacto, float32):
+    """Monta o dicionário de resultado (com DataFrame) ou, se compacto, um ResultadoCompacto."""
+    if compacto:
+        return ResultadoCompacto(valor_inicial, montante, metricas, poupanca, float32)
+    if poupanca:
+        df = _df_poupanca(valor_inicial, montante)
+    else:
+        df = _df_ativo(valor_inicial, montante, metricas["aliquota"])
+    return {"df": df, **metricas}
+
+def resultado_poupanca(valor_inicial, montante, compacto=False, float32=False):
+    """Resultado da poupança (isenta) a partir do montante diário já calculado (dias 0..dias)."""
+    montante_final = float(montante[-1])
+    rendimento_final = montante_final - valor_inicial
+    return _montar_resultado(valor_inicial, montante, {
+        "montante_liquido": montante_final,
+        "rendimento_liquido": rendimento_final,
+        "rendimento_bruto": rendimento_final,
+        "ir_devido": 0.0,
+        "aliquota": 0.0,
+        "taxa_nominal_aa": 6.17
+    }, True, compacto, float32)
+
+def calcular_poupanca(valor_inicial, dias, compacto=False, float32=False):
+    # Taxa da Poupança (TR + 0.5% a.a. ou 70% da Selic)
+    taxa_anual = TAXA_POUPANCA_AA
+    fator_diario = (1 + taxa_anual)**(1 / 365.0)
+    _, montante = curva_montante(valor_inicial, fator_diario, dias)
+    return resultado_poupanca(valor_inicial, montante, compacto, float32)
+
+def fatores_brutos(dias, tipo_rentabilidade, params, curva=None, convencao=CONVENCAO_CORRIDOS, data_inicio=None, inicio=0):
+    """Montante bruto de R$ 1 em cada dia inicio..dias (a curva do cenário, sem o valor inicial).
+
+    Cada dia é calculado sem depender do anterior (potência da taxa ou fator
+    acumulado da curva), então o trecho inicio..dias emendado a um prefixo já
+    calculado é idêntico ao cálculo desde o dia 0. A exceção é DU/252 com curva,
+    que acumula os logs diários e por isso é sempre calculado desde o dia 0.
+    """
+    if convencao not in BASE_ANUAL:
+        raise ValueError(f"Convenção de dias inválida: {convencao}")
+    if convencao == CONVENCAO_UTEIS:
+        if curva is not None and tipo_rentabilidade in ("PÓS", "IPCA"):
+            dias_uteis = expoentes_prazo(dias, CONVENCAO_UTEIS, data_inicio) * BASE_ANUAL[CONVENCAO_UTEIS]
+            multiplicador, adicional = conversao_nominal(tipo_rentabilidade, params)
+            taxa_nominal = np.maximum(multiplicador * curva.taxas_diarias(dias) + adicional, 0.0)
+            # np.diff(dias_uteis) vale 1 nos dias úteis e 0 nos fins de semana/feriados
+            log_diario = np.diff(dias_uteis) * np.log1p(taxa_nominal) / BASE_ANUAL[CONVENCAO_UTEIS]
+            return np.exp(np.concatenate(([0.0], np.cumsum(log_diario))))[inicio:]
+        dias_uteis = expoentes_prazo(dias, CONVENCAO_UTEIS, data_inicio)[inicio:] * BASE_ANUAL[CONVENCAO_UTEIS]
+        return np.power(1 + taxa_anual_nominal(tipo_rentabilidade, params), dias_uteis / BASE_ANUAL[CONVENCAO_UTEIS])
+    if curva is not None and tipo_rentabilidade in ("PÓS", "IPCA"):
+        # Fatores acumulados pré-calculados da curva, compartilhados entre ativos
+        multiplicador, adicional = conversao_nominal(tipo_rentabilidade, params)
+        return curva.fatores_acumulados(multiplicador, adicional, dias)[inicio:dias + 1]
+    fator_diario = (1 + taxa_anual_nominal(tipo_rentabilidade, params))**(1 / 365.0)
+    return np.power(fator_diario, np.arange(inicio, dias + 1))
+
+def _taxa_anual_cenario(dias, tipo_rentabilidade, params, curva, convencao, data_inicio, fator_final):
+    """Taxa nominal anual (decimal) do cenário no prazo; com curva, a taxa constante equivalente."""
+    if curva is None or tipo_rentabilidade not in ("PÓS", "IPCA"):
+        return taxa_anual_nominal(tipo_rentabilidade, params)
+    multiplicador, adicional = conversao_nominal(tipo_rentabilidade, params)
+    if convencao != CONVENCAO_UTEIS:
+        return curva.taxa_equivalente_aa(dias, multiplicador, adicional)
+    dias_uteis = expoentes_prazo(dias, CONVENCAO_UTEIS, data_inicio)[-1] * BASE_ANUAL[CONVENCAO_UTEIS]
+    if dias_uteis > 0:
+        return fator_final**(BASE_ANUAL[CONVENCAO_UTEIS] / dias_uteis) - 1
+    return multiplicador * curva.vertices[0][1] / 100.0 + adicional
+
+def resultado_do_montante(valor_inicial, dias, tipo_rentabilidade, params, is_isento, montante, curva=None,
+                          convencao=CONVENCAO_CORRIDOS, data_inicio=None, compacto=False, float32=False):
+    """Resultado do cenário (IR, líquido, taxa) a partir do montante bruto diário já calculado (dias 0..dias)."""
+    # Tabela Regressiva de IR (Válida para Renda Fixa Não Isenta)
+    aliquota_ir_fixa = aliquota_ir_regressiva(dias, is_isento)
+    taxa_anual = _taxa_anual_cenario(dias, tipo_rentabilidade, params, curva, convencao, data_inicio,
+                                     montante[-1] / valor_inicial if valor_inicial else 1.0)
+
+    # Cálculo Final do Resultado Líquido (Baseado no Montante Bruto Final)
+    bruto_final = float(montante[-1])
+    rendimento_bruto_final = bruto_final - valor_inicial
+    aliquota_ir = aliquota_ir_fixa
+    ir_devido = 0.0
+
+    if not is_isento:
+        ir_devido = rendimento_bruto_final * (aliquota_ir / 100.0)
+
+    rendimento_liquido = rendimento_bruto_final - ir_devido
+
+    return _montar_resultado(valor_inicial, montante, {
+        "montante_liquido": valor_inicial + rendimento_liquido,
+        "rendimento_liquido": rendimento_liquido,
+        "rendimento_bruto": rendimento_bruto_final,
+        "ir_devido": ir_devido,
+        "aliquota": aliquota_ir,
+        "taxa_nominal_aa": taxa_anual * 100
+    }, False, compacto, float32)
+
+def calcular_ativo_geral(valor_inicial, dias, tipo_rentabilidade, params, is_isento, curva=None,
+                         convencao=CONVENCAO_CORRIDOS, data_inicio=None, compacto=False, float32=False):
+    """Calcula a rentabilidade bruta, IR e resultado líquido para diferentes tipos de ativos.
+
+    'curva' (opcional, curvas_juros.CurvaJuros) substitui a taxa de referência
+    constante de PÓS (CDI/Selic) ou IPCA por uma curva projetada.
+    'convencao' escolhe entre dias corridos/365 (padrão) e dias úteis/252 a partir
+    de 'data_inicio' (padrão: hoje). O prazo 'dias' e o IR seguem em dias corridos.
+    'compacto' retorna um ResultadoCompacto (curva em array, opcionalmente float32).
+    """
+    montante = valor_inicial * fatores_brutos(dias, tipo_rentabilidade, params, curva, convencao, data_inicio)
+    return resultado_do_montante(valor_inicial, dias, tipo_rentabilidade, params, is_isento, montante, curva,
+                                 convencao, data_inicio, compacto, float32)
+
+# ==========================================
+# 4. CÁLCULO EM LOTE (VÁRIOS CENÁRIOS)
+# ==========================================
+
+def coluna_lote(cenarios, nome, padrao):
+    """Lê uma coluna numérica da tabela de cenários, preenchendo ausentes com o padrão."""
+    import pandas as pd
+    if nome not in cenarios:
+        return np.full(len(cenarios), padrao, dtype=float)
+    return pd.to_numeric(cenarios[nome], errors="coerce").fillna(padrao).to_numpy(dtype=float)
+
+def _coluna_booleana(cenarios, nome):
+    """Lê uma coluna de flags aceitando bool, 0/1 ou texto (ex.: "sim", "true", "False")."""
+    if nome not in cenarios:
+        return np.zeros(len(cenarios), dtype=bool)
+    coluna = cenarios[nome]
+    if coluna.dtype == object or str(coluna.dtype) in ("string", "str"):
+        return coluna.astype(str).str.strip().str.lower().isin(VALORES_VERDADEIROS).to_numpy()
+    return coluna.fillna(False).astype(bool).to_numpy()
+
+def taxas_lote(cenarios, sufixo=""):
+    """Tipo, taxa anual nominal (decimal) e isenção de cada linha da tabela de cenários.
+
+    'sufixo' seleciona as colunas de um dos ativos de uma tabela de pares (ex.: "_a" lê tipo_a, taxa_fixa_a...).
+    """
+    tipo = cenarios["tipo" + sufixo].astype(str).str.upper().to_numpy()
+    invalidos = ~np.isin(tipo, TIPOS_RENTABILIDADE)
+    if invalidos.any():
+        raise ValueError(f"Tipo de rentabilidade inválido: {sorted(set(tipo[invalidos]))} (use {', '.join(TIPOS_RENTABILIDADE)})")
+
+    taxa_fixa = coluna_lote(cenarios, "taxa_fixa" + sufixo, 0.0) / 100.0
+    taxa_ref = coluna_lote(cenarios, "taxa_ref" + sufixo, 0.0) / 100.0
+    percentual = coluna_lote(cenarios, "percentual" + sufixo, 100.0) / 100.0
+    ipca = coluna_lote(cenarios, "ipca_proj" + sufixo, 0.0) / 100.0
+    is_isento = _coluna_booleana(cenarios, "isento" + sufixo)
+    # Poupança é sempre isenta
+    is_isento = is_isento | (tipo == "POUPANÇA")
+
+    taxa_anual = np.select(
+        [tipo == "PRÉ", tipo == "PÓS", tipo == "IPCA", tipo == "POUPANÇA"],
+        [taxa_fixa, taxa_ref * percentual, (1 + ipca) * (1 + taxa_fixa) - 1, TAXA_POUPANCA_AA],
+        default=0.0
+    )
+    return tipo, taxa_anual, is_isento
+
+def convencao_lote(cenarios):
+    """Máscara das linhas em DU/252 e suas datas de início (colunas opcionais convencao e data_inicio)."""
+    import pandas as pd
+    if "convencao" not in cenarios:
+        return np.zeros(len(cenarios), dtype=bool), None
+    convencao = cenarios["convencao"].fillna(CONVENCAO_CORRIDOS).astype(str).str.upper().to_numpy()
+    uteis = convencao == CONVENCAO_UTEIS
+    if "data_inicio" in cenarios:
+        datas_inicio = pd.to_datetime(cenarios["data_inicio"]).fillna(pd.Timestamp(date.today()))
+        datas_inicio = datas_inicio.to_numpy(dtype="datetime64[D]")
+    else:
+        datas_inicio = np.full(len(cenarios), np.datetime64(date.today(), "D"))
+    return uteis, datas_inicio
+
+def fatores_brutos_lote(taxa_anual, dias, uteis, datas_inicio):
+    """Fator bruto (montante por R$ 1) de cada linha no prazo 'dias' (dias corridos)."""
+    # Mesmo fator diário de calcular_ativo_geral, elevado ao prazo de cada cenário
+    fator_diario = (1 + taxa_anual)**(1 / 365.0)
+    fatores = np.power(fator_diario, dias)
+    if uteis.any():
+        # Dias úteis de cada cenário pelo índice acumulado do calendário (O(1) por linha)
+        dias_uteis = calendario_padrao().dias_uteis_por_prazo(datas_inicio[uteis], dias[uteis])
+        fatores[uteis] = np.power(1 + taxa_anual[uteis], dias_uteis / BASE_ANUAL[CONVENCAO_UTEIS])
+    return fatores
+
+def calcular_cenarios_lote(cenarios):
+    """Calcula o resultado final de uma tabela de cenários com aritmética vetorizada.
+
+    Colunas esperadas: valor_inicial, dias, tipo (PRÉ/PÓS/IPCA/POUPANÇA), isento e,
+    conforme o tipo, taxa_fixa, taxa_ref, percentual e ipca_proj (em %).
+    Opcionais: convencao (DC365/DU252) e data_inicio (para DU252; padrão: hoje).
+    Retorna um DataFrame com uma linha por cenário e as mesmas métricas de
+    calcular_ativo_geral (sem a curva diária).
+    """
+    import pandas as pd
+    cenarios = pd.DataFrame(cenarios)
+    tipo, taxa_anual, is_isento = taxas_lote(cenarios)
+    valor_inicial = coluna_lote(cenarios, "valor_inicial", 0.0)
+    dias = coluna_lote(cenarios, "dias", 0.0).astype(np.int64)
+    uteis, datas_inicio = convencao_lote(cenarios)
+
+    montante_bruto = valor_inicial * fatores_brutos_lote(taxa_anual, dias, uteis & (tipo != "POUPANÇA"), datas_inicio)
+    rendimento_bruto = montante_bruto - valor_inicial
+    aliquota = np.atleast_1d(aliquota_ir_regressiva(dias, is_isento))
+    ir_devido = rendimento_bruto * (aliquota / 100.0)
+    rendimento_liquido = rendimento_bruto - ir_devido
+
+    return pd.DataFrame({
+        "montante_bruto": montante_bruto,
+        "rendimento_bruto": rendimento_bruto,
+        "ir_devido": ir_devido,
+        "aliquota": aliquota,
+        "rendimento_liquido": rendimento_liquido,
+        "montante_liquido": valor_inicial + rendimento_liquido,
+        "taxa_nominal_aa": taxa_anual * 100
+    }, index=cenarios.index)
@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+# Redução de pontos das curvas antes de enviá-las ao navegador.
+# Para prazos longos, uma linha por dia gera dezenas de milhares de pontos por
+# série a cada rerun. O LTTB (Largest-Triangle-Three-Buckets) escolhe os pontos
+# que preservam o formato da curva dentro de um orçamento fixo, de modo que o
+# tamanho do gráfico não cresce com 'dias'.
+
+PONTOS_GRAFICO_PADRAO = int(os.environ.get("SIMULADOR_PONTOS_GRAFICO", "500"))
+
+def indices_lttb(x, y, pontos):
+    """Índices dos pontos escolhidos pelo LTTB (sempre inclui o primeiro e o último)."""
+    n = len(y)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Baldes internos (o primeiro e o último ponto são fixos)
+    limites = np.linspace(1, n - 1, pontos - 1).astype(np.int64)
+    escolhidos = np.empty(pontos, dtype=np.int64)
+    escolhidos[0] = 0
+    escolhidos[-1] = n - 1
+
+    anterior = 0
+    for i in range(pontos - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        # Média do próximo balde (ou o último ponto, no balde final)
+        prox_inicio, prox_fim = fim, limites[i + 2] if i + 2 < len(limites) else n
+        x_medio = x[prox_inicio:prox_fim].mean()
+        y_medio = y[prox_inicio:prox_fim].mean()
+        # Ponto do balde atual que forma o maior triângulo com o anterior e a média seguinte
+        areas = np.abs(
+            (x[anterior] - x_medio) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (y_medio - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        escolhidos[i + 1] = anterior
+    return escolhidos
+
+def reduzir_pontos(df, pontos=PONTOS_GRAFICO_PADRAO, coluna_x="Dia"):
+    """Reduz um DataFrame de curvas (uma coluna por série) a cerca de 'pontos' linhas.
+
+    Os índices escolhidos pelo LTTB em cada série são unidos, para que todas as
+    séries compartilhem o mesmo eixo x.
+    """
+    if len(df) <= pontos:
+        return df
+    series = [coluna for coluna in df.columns if coluna != coluna_x]
+    x = df[coluna_x].to_numpy() if coluna_x in df else np.arange(len(df))
+    # Orçamento dividido entre as séries, para que a união fique próxima de 'pontos'
+    pontos_por_serie = max(pontos // max(len(series), 1), 3)
+    indices = np.unique(np.concatenate(
+        [indices_lttb(x, df[coluna].to_numpy(), pontos_por_serie) for coluna in series] or [np.arange(len(df))]
+    ))
+    return df.iloc[indices].reset_index(drop=True)
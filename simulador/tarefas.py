@@ -0,0 +1,206 @@
+import atexit
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import instrumentacao
+
+# Execução de cálculos pesados em segundo plano, fora da thread do script do
+# Streamlit (que fica livre para redesenhar a tela e acompanhar o progresso).
+#
+# Threads, não processos: o trabalho pesado é NumPy, que libera o GIL nos laços
+# vetorizados, e o resultado (arrays, DataFrames) volta ao painel sem
+# serialização. A fila é limitada (trabalhadores + fila_maxima tarefas no total)
+# e cada usuário tem um limite de tarefas simultâneas, maior no Premium.
+#
+# O cancelamento é cooperativo: a função da tarefa chama tarefa.progredir(...)
+# entre as etapas, e essa chamada levanta TarefaCancelada se o cancelamento foi
+# pedido (ex.: o usuário mudou os parâmetros). Uma tarefa cancelada ocupa a vaga
+# do usuário até a thread realmente sair; um novo envio espera alguns instantes
+# por ela em vez de recusar de imediato.
+#
+# Os tempos medidos com instrumentacao.medir() dentro da tarefa ficam em
+# tarefa.etapas, para o painel somá-los à reexecução que exibe o resultado.
+
+TRABALHADORES_PADRAO = int(os.environ.get("SIMULADOR_TAREFAS_TRABALHADORES", "4"))
+FILA_MAXIMA_PADRAO = int(os.environ.get("SIMULADOR_TAREFAS_FILA", "32"))
+LIMITE_GRATUITO = int(os.environ.get("SIMULADOR_TAREFAS_LIMITE_GRATUITO", "1"))
+LIMITE_PREMIUM = int(os.environ.get("SIMULADOR_TAREFAS_LIMITE_PREMIUM", "3"))
+# Quanto submeter espera as tarefas canceladas do usuário saírem antes de recusar
+ESPERA_CANCELADAS_SEGUNDOS = float(os.environ.get("SIMULADOR_TAREFAS_ESPERA_CANCELADAS_SEGUNDOS", "2"))
+# Tarefas finalizadas ficam disponíveis para o painel por este tempo
+RETENCAO_SEGUNDOS = 600
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+CANCELADA = "cancelada"
+ERRO = "erro"
+
+class TarefaCancelada(Exception):
+    """Levantada por Tarefa.progredir quando o cancelamento foi pedido."""
+
+class LimiteTarefasExcedido(Exception):
+    """O usuário já tem o máximo de tarefas em andamento, ou a fila do servidor está cheia."""
+
+def limite_por_usuario(is_premium):
+    """Tarefas simultâneas permitidas por usuário conforme o plano."""
+    return LIMITE_PREMIUM if is_premium else LIMITE_GRATUITO
+
+# ==========================================
+# 1. TAREFA
+# ==========================================
+
+_ids = itertools.count(1)
+
+class Tarefa:
+    """Estado de uma execução em segundo plano: progresso, resultado ou erro."""
+
+    def __init__(self, usuario):
+        self.id = next(_ids)
+        self.usuario = usuario
+        self.estado = PENDENTE
+        self.progresso = 0.0
+        self.etapa = ""
+        self.resultado = None
+        self.erro = None
+        # {etapa: ms} medidos na thread da tarefa (vazio com a instrumentação desligada)
+        self.etapas = {}
+        self.criada_em = time.monotonic()
+        self.finalizada_em = None
+        self._cancelamento = threading.Event()
+        self._fim = threading.Event()
+
+    def progredir(self, fracao, etapa=None):
+        """Atualiza o progresso (0..1); interrompe a tarefa se o cancelamento foi pedido."""
+        if self._cancelamento.is_set():
+            raise TarefaCancelada()
+        self.progresso = min(max(float(fracao), 0.0), 1.0)
+        if etapa is not None:
+            self.etapa = etapa
+
+    def cancelar(self):
+        self._cancelamento.set()
+
+    @property
+    def cancelamento_pedido(self):
+        return self._cancelamento.is_set()
+
+    @property
+    def finalizada(self):
+        return self._fim.is_set()
+
+    def esperar(self, timeout=None):
+        """Bloqueia até a tarefa terminar (ou o timeout). Retorna True se terminou."""
+        return self._fim.wait(timeout)
+
+    def _finalizar(self, estado):
+        self.estado = estado
+        self.finalizada_em = time.monotonic()
+        self._fim.set()
+
+# ==========================================
+# 2. EXECUTOR COM FILA LIMITADA
+# ==========================================
+
+class ExecutorTarefas:
+    """Pool de threads com fila limitada e limite de tarefas simultâneas por usuário."""
+
+    def __init__(self, trabalhadores=TRABALHADORES_PADRAO, fila_maxima=FILA_MAXIMA_PADRAO):
+        self.trabalhadores = trabalhadores
+        self._executor = None
+        self._vagas = threading.BoundedSemaphore(trabalhadores + fila_maxima)
+        self._tarefas = {}
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Criado no primeiro uso: importar o módulo não inicia threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.trabalhadores, thread_name_prefix="simulador-tarefa")
+        return self._executor
+
+    def _descartar_antigas(self):
+        limite = time.monotonic() - RETENCAO_SEGUNDOS
+        for id_tarefa in [i for i, t in self._tarefas.items() if t.finalizada and t.finalizada_em < limite]:
+            del self._tarefas[id_tarefa]
+
+    def submeter(self, usuario, funcao, *args, limite_usuario=LIMITE_GRATUITO, **kwargs):
+        """Enfileira funcao(tarefa, *args, **kwargs) e retorna a Tarefa.
+
+        Levanta LimiteTarefasExcedido se o usuário já tem 'limite_usuario' tarefas
+        ainda não finalizadas ou se a fila está cheia. As canceladas contam até a
+        thread sair; por elas, espera-se até ESPERA_CANCELADAS_SEGUNDOS.
+        """
+        prazo = time.monotonic() + ESPERA_CANCELADAS_SEGUNDOS
+        while True:
+            with self._lock:
+                self._descartar_antigas()
+                ocupando = [t for t in self._tarefas.values() if t.usuario == usuario and not t.finalizada]
+                if len(ocupando) < limite_usuario:
+                    if not self._vagas.acquire(blocking=False):
+                        raise LimiteTarefasExcedido("Servidor ocupado: muitos cálculos na fila. Tente novamente em instantes.")
+                    tarefa = Tarefa(usuario)
+                    self._tarefas[tarefa.id] = tarefa
+                    break
+                canceladas = [t for t in ocupando if t.cancelamento_pedido]
+            restante = prazo - time.monotonic()
+            if not canceladas or restante <= 0:
+                raise LimiteTarefasExcedido(
+                    f"Limite de {limite_usuario} cálculo(s) simultâneo(s) atingido. Aguarde o cálculo em andamento terminar."
+                )
+            canceladas[0].esperar(restante)
+        self._pool().submit(self._executar, tarefa, funcao, args, kwargs)
+        return tarefa
+
+    def _executar(self, tarefa, funcao, args, kwargs):
+        try:
+            if tarefa.cancelamento_pedido:
+                tarefa._finalizar(CANCELADA)
+                return
+            tarefa.estado = EXECUTANDO
+            with instrumentacao.coletar_etapas(tarefa.etapas):
+                tarefa.resultado = funcao(tarefa, *args, **kwargs)
+            tarefa.progresso = 1.0
+            tarefa._finalizar(CONCLUIDA)
+        except TarefaCancelada:
+            tarefa._finalizar(CANCELADA)
+        except Exception as e:
+            tarefa.erro = str(e)
+            tarefa._finalizar(ERRO)
+        finally:
+            self._vagas.release()
+
+    def obter(self, id_tarefa):
+        with self._lock:
+            return self._tarefas.get(id_tarefa)
+
+    def em_andamento(self, usuario, _com_lock=True):
+        """Tarefas do usuário ainda não finalizadas e sem cancelamento pedido."""
+        if _com_lock:
+            with self._lock:
+                return self.em_andamento(usuario, _com_lock=False)
+        return [t for t in self._tarefas.values()
+                if t.usuario == usuario and not t.finalizada and not t.cancelamento_pedido]
+
+    def cancelar_do_usuario(self, usuario):
+        for tarefa in self.em_andamento(usuario):
+            tarefa.cancelar()
+
+    def encerrar(self):
+        """Cancela as tarefas pendentes e aguarda as threads (na saída do processo)."""
+        with self._lock:
+            for tarefa in self._tarefas.values():
+                tarefa.cancelar()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+_executor_padrao = ExecutorTarefas()
+atexit.register(_executor_padrao.encerrar)
+
+def executor_padrao():
+    """Executor compartilhado por todas as sessões do processo."""
+    return _executor_padrao
@@ -0,0 +1,84 @@
+import pytest
+
+import cotas
+
+# Contador write-behind com o banco substituído por um dicionário em memória:
+# um flush que falha no meio do lote não pode perder decrementos de outras chaves.
+
+DIA = "2026-10-17"
+
+class BancoFalso:
+    def __init__(self, saldos, falhar_em=()):
+        self.saldos = dict(saldos)
+        self.falhar_em = set(falhar_em)
+
+    def consumir(self, email, quantidade=1, dia=None):
+        if email in self.falhar_em:
+            raise RuntimeError(f"falha simulada em {email}")
+        consumidas = min(quantidade, max(self.saldos[email], 0))
+        self.saldos[email] -= consumidas
+        return consumidas
+
+    def restantes(self, email, dia=None):
+        return self.saldos[email]
+
+@pytest.fixture
+def banco(monkeypatch):
+    banco = BancoFalso({"a": 5, "b": 5})
+    monkeypatch.setattr(cotas, "_hoje", lambda: DIA)
+    monkeypatch.setattr(cotas, "consumir_no_banco", banco.consumir)
+    monkeypatch.setattr(cotas, "restantes_no_banco", banco.restantes)
+    return banco
+
+def test_flush_com_falha_devolve_todo_o_lote(banco):
+    contador = cotas.ContadorWriteBehind(intervalo_flush=0)
+    for email in ("a", "a", "b", "b"):
+        assert contador.consumir(email)
+
+    banco.falhar_em = {"a"}
+    with pytest.raises(RuntimeError):
+        contador.flush()
+    # Nada gravado e nada perdido: os dois usuários continuam pendentes
+    assert banco.saldos == {"a": 5, "b": 5}
+    assert contador._pendentes == {("a", DIA): 2, ("b", DIA): 2}
+
+    banco.falhar_em = set()
+    contador.flush()
+    assert banco.saldos == {"a": 3, "b": 3}
+    assert contador._pendentes == {}
+    assert contador.restantes("a") == contador.restantes("b") == 3
+
+def test_flush_com_falha_na_releitura_nao_duplica(banco, monkeypatch):
+    contador = cotas.ContadorWriteBehind(intervalo_flush=0)
+    assert contador.consumir("a")
+    assert contador.consumir("b")
+
+    def releitura_falha(email, dia=None):
+        raise RuntimeError("falha simulada na releitura")
+    monkeypatch.setattr(cotas, "restantes_no_banco", releitura_falha)
+    with pytest.raises(RuntimeError):
+        contador.flush()
+    # O consumo de 'a' já foi gravado; só 'b' volta ao lote
+    assert banco.saldos == {"a": 4, "b": 5}
+    assert contador._pendentes == {("b", DIA): 1}
+
+def test_consumir_apos_invalidar(banco):
+    contador = cotas.ContadorWriteBehind(intervalo_flush=0)
+    contador.restantes("a")
+    contador.invalidar("a")
+    assert contador.consumir("a")
+    assert contador.restantes("a") == 4
+
+def test_thread_de_flush_sobrevive_a_erro(banco):
+    contador = cotas.ContadorWriteBehind(intervalo_flush=0.01)
+    banco.falhar_em = {"a"}
+    assert contador.consumir("a")
+    contador._parar.wait(0.05)
+    assert contador._thread.is_alive()
+    banco.falhar_em = set()
+    for _ in range(100):
+        if banco.saldos["a"] == 4:
+            break
+        contador._parar.wait(0.01)
+    contador._parar.set()
+    assert banco.saldos["a"] == 4
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulador.motor_calculo import calcular_ativo_geral, calcular_poupanca
+
+# Paridade do motor vetorizado com o laço dia a dia original (a implementação de
+# referência abaixo é a versão anterior à vetorização, mantida só para o teste).
+# A potência vetorizada e a multiplicação repetida diferem apenas por
+# arredondamento de ponto flutuante, acumulado ao longo do prazo.
+
+PRAZOS = (1, 30, 180, 181, 360, 361, 720, 721, 3650, 18250)
+PARAMS = {
+    "PRÉ": {'taxa_fixa': 12.5},
+    "PÓS": {'taxa_ref': 13.65, 'percentual': 110},
+    "IPCA": {'ipca_proj': 5.0, 'taxa_fixa': 6.0},
+}
+TOLERANCIA_RELATIVA = 1e-9
+
+def _poupanca_laco(valor_inicial, dias):
+    fator_diario = (1 + 0.0617)**(1 / 365.0)
+    data = []
+    montante = valor_inicial
+    for d in range(0, dias + 1):
+        if d > 0: montante *= fator_diario
+        data.append((d, montante, montante - valor_inicial))
+    df = pd.DataFrame(data, columns=["Dia", "Montante Líquido", "Rendimento Líquido"])
+    rendimento_final = df["Montante Líquido"].iloc[-1] - valor_inicial
+    return {
+        "df": df,
+        "montante_liquido": df["Montante Líquido"].iloc[-1],
+        "rendimento_liquido": rendimento_final,
+        "rendimento_bruto": rendimento_final,
+        "ir_devido": 0.0,
+        "aliquota": 0.0,
+        "taxa_nominal_aa": 6.17
+    }
+
+def _ativo_laco(valor_inicial, dias, tipo_rentabilidade, params, is_isento):
+    if tipo_rentabilidade == "PRÉ":
+        taxa_anual_nominal = params['taxa_fixa'] / 100.0
+    elif tipo_rentabilidade == "PÓS":
+        taxa_anual_nominal = params['taxa_ref'] / 100.0 * params['percentual'] / 100.0
+    else:
+        taxa_anual_nominal = ((1 + params['ipca_proj'] / 100.0) * (1 + params['taxa_fixa'] / 100.0)) - 1
+
+    fator_diario = (1 + taxa_anual_nominal)**(1 / 365.0)
+    aliquota = 0.0
+    if not is_isento:
+        if dias <= 180: aliquota = 22.5
+        elif dias <= 360: aliquota = 20.0
+        elif dias <= 720: aliquota = 17.5
+        else: aliquota = 15.0
+
+    data = []
+    montante = valor_inicial
+    for d in range(0, dias + 1):
+        if d > 0: montante *= fator_diario
+        rendimento_total = montante - valor_inicial
+        montante_liquido = montante
+        if not is_isento:
+            montante_liquido = valor_inicial + rendimento_total * (1 - aliquota / 100.0)
+        data.append((d, montante, rendimento_total, montante_liquido))
+    df = pd.DataFrame(data, columns=["Dia", "Montante Bruto", "Rendimento Bruto", "Montante Líquido"])
+
+    rendimento_bruto = df["Montante Bruto"].iloc[-1] - valor_inicial
+    ir_devido = 0.0 if is_isento else rendimento_bruto * (aliquota / 100.0)
+    return {
+        "df": df,
+        "montante_liquido": valor_inicial + rendimento_bruto - ir_devido,
+        "rendimento_liquido": rendimento_bruto - ir_devido,
+        "rendimento_bruto": rendimento_bruto,
+        "ir_devido": ir_devido,
+        "aliquota": aliquota,
+        "taxa_nominal_aa": taxa_anual_nominal * 100
+    }
+
+def _comparar(atual, esperado):
+    assert list(atual['df'].columns) == list(esperado['df'].columns)
+    for coluna in esperado['df'].columns:
+        np.testing.assert_allclose(atual['df'][coluna].to_numpy(dtype=float), esperado['df'][coluna].to_numpy(dtype=float),
+                                   rtol=TOLERANCIA_RELATIVA, atol=1e-9, err_msg=coluna)
+    for chave in ("montante_liquido", "rendimento_liquido", "rendimento_bruto", "ir_devido", "aliquota", "taxa_nominal_aa"):
+        assert atual[chave] == pytest.approx(esperado[chave], rel=TOLERANCIA_RELATIVA, abs=1e-9), chave
+
+@pytest.mark.parametrize("dias", PRAZOS)
+@pytest.mark.parametrize("is_isento", (False, True))
+@pytest.mark.parametrize("tipo", tuple(PARAMS))
+def test_ativo_geral_igual_ao_laco(tipo, is_isento, dias):
+    _comparar(calcular_ativo_geral(10000.0, dias, tipo, PARAMS[tipo], is_isento),
+              _ativo_laco(10000.0, dias, tipo, PARAMS[tipo], is_isento))
+
+@pytest.mark.parametrize("dias", PRAZOS)
+def test_poupanca_igual_ao_laco(dias):
+    _comparar(calcular_poupanca(10000.0, dias), _poupanca_laco(10000.0, dias))
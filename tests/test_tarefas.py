@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from simulador import tarefas
+from simulador.tarefas import CANCELADA, ExecutorTarefas, LimiteTarefasExcedido
+
+# Vagas por usuário: uma tarefa cancelada só libera a vaga quando a thread sai.
+
+def _lenta(liberar):
+    def funcao(tarefa):
+        while not liberar.wait(0.005):
+            tarefa.progredir(0.5)
+    return funcao
+
+@pytest.fixture
+def executor():
+    executor = ExecutorTarefas(trabalhadores=2, fila_maxima=4)
+    yield executor
+    executor.encerrar()
+
+def test_cancelada_ocupa_a_vaga_ate_sair(executor, monkeypatch):
+    monkeypatch.setattr(tarefas, "ESPERA_CANCELADAS_SEGUNDOS", 0.0)
+    liberar = threading.Event()
+    bloqueada = threading.Event()
+
+    def ignora_cancelamento(tarefa):
+        # Trabalho que ainda não chegou ao próximo progredir()
+        bloqueada.wait(5)
+
+    tarefa = executor.submeter("u", ignora_cancelamento, limite_usuario=1)
+    tarefa.cancelar()
+    with pytest.raises(LimiteTarefasExcedido):
+        executor.submeter("u", _lenta(liberar), limite_usuario=1)
+    bloqueada.set()
+    assert tarefa.esperar(5)
+    nova = executor.submeter("u", _lenta(liberar), limite_usuario=1)
+    liberar.set()
+    assert nova.esperar(5)
+
+def test_novo_envio_espera_a_cancelada_sair(executor):
+    liberar = threading.Event()
+    anterior = executor.submeter("u", _lenta(liberar), limite_usuario=1)
+    anterior.cancelar()
+    nova = executor.submeter("u", _lenta(liberar), limite_usuario=1)
+    assert anterior.finalizada and anterior.estado == CANCELADA
+    liberar.set()
+    assert nova.esperar(5)
+
+def test_limite_sem_cancelamento(executor):
+    liberar = threading.Event()
+    executor.submeter("u", _lenta(liberar), limite_usuario=1)
+    with pytest.raises(LimiteTarefasExcedido):
+        executor.submeter("u", _lenta(liberar), limite_usuario=1)
+    liberar.set()
+
+def test_pool_unico_com_envios_concorrentes(monkeypatch):
+    executor = ExecutorTarefas(trabalhadores=2, fila_maxima=32)
+    pools = []
+    original = tarefas.ThreadPoolExecutor
+
+    def contar_pool(*args, **kwargs):
+        # Criação lenta: sem o lock, os envios simultâneos criariam um pool cada
+        threading.Event().wait(0.02)
+        pools.append(original(*args, **kwargs))
+        return pools[-1]
+
+    monkeypatch.setattr(tarefas, "ThreadPoolExecutor", contar_pool)
+    barreira = threading.Barrier(8)
+
+    def enviar(i):
+        barreira.wait()
+        executor.submeter(f"u{i}", lambda tarefa: None).esperar(5)
+
+    threads = [threading.Thread(target=enviar, args=(i,)) for i in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        executor.encerrar()
+    assert len(pools) == 1